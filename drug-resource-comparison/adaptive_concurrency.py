@@ -0,0 +1,203 @@
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+import requests
+
+from metrics import metrics
+
+# Limits of the number of requests in flight to each upstream API
+INITIAL_LIMIT = 8
+MIN_LIMIT = 1
+MAX_LIMIT = 64
+
+# Latency, as a multiple of the lowest latency observed, up to which
+# the upstream API is considered healthy, and the limit is raised
+LATENCY_TOLERANCE = 2.0
+
+# Factor by which the limit is cut when the upstream API throttles
+DECREASE_FACTOR = 0.5
+
+# Response statuses on which requests are retried
+RETRY_STATUSES = [429, 502, 503, 504]
+
+# Retries of each request, and the base and maximum seconds of the
+# exponential backoff between them, when the response has no
+# Retry-After header
+MAX_RETRIES = 6
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 60
+
+# Seconds to connect, and to read a response, before timing out
+REQUEST_TIMEOUT = (10, 300)
+
+
+class AdaptiveLimiter:
+    """Limits the number of requests in flight to an upstream API,
+    adding one request to the limit for each round of healthy
+    responses, and halving it once for each round of throttled
+    responses, or timeouts. All requests wait while the upstream API
+    asks, using Retry-After, for requests to stop.
+    """
+
+    def __init__(
+        self, initial_limit=INITIAL_LIMIT, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT
+    ):
+        self.condition = threading.Condition()
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.min_latency = None
+        self.decrease_time = 0.0
+        self.resume_time = 0.0
+
+    def acquire(self):
+        """Waits until a request may be sent, and returns the time it
+        was sent.
+        """
+        with self.condition:
+            while True:
+                pause = self.resume_time - time.monotonic()
+                if pause > 0:
+                    self.condition.wait(pause)
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    self.condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self):
+        """Releases a request sent."""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def set_max_limit(self, max_limit):
+        """Sets the maximum limit, cutting the limit to it if above."""
+        with self.condition:
+            self.max_limit = max(self.min_limit, max_limit)
+            self.limit = min(self.limit, self.max_limit)
+
+    def on_success(self, seconds):
+        """Raises the limit if the latency of the response was
+        healthy.
+        """
+        with self.condition:
+            if self.min_latency is None or seconds < self.min_latency:
+                self.min_latency = seconds
+            if seconds <= LATENCY_TOLERANCE * self.min_latency:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.condition.notify_all()
+
+    def on_throttle(self, send_time, retry_after=None):
+        """Cuts the limit, unless it was cut after the throttled request
+        was sent, and pauses all requests for any seconds the upstream
+        API asked.
+        """
+        with self.condition:
+            now = time.monotonic()
+            if send_time >= self.decrease_time:
+                self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                self.decrease_time = now
+            if retry_after is not None:
+                self.resume_time = max(self.resume_time, now + retry_after)
+
+
+# Limiter of each upstream API, shared by all fetchers
+limiters = {}
+limiters_lock = threading.Lock()
+
+
+def get_limiter(upstream):
+    """Returns the limiter of the upstream API, creating it if
+    absent.
+    """
+    with limiters_lock:
+        if upstream not in limiters:
+            limiters[upstream] = AdaptiveLimiter()
+        return limiters[upstream]
+
+
+def get_pool_size(upstream):
+    """Returns the number of worker threads, and of pooled connections,
+    which keeps the limit of requests in flight to the upstream API
+    filled as it rises to its maximum. Workers beyond the limit wait in
+    the limiter, rather than in the pool.
+    """
+    return get_limiter(upstream).max_limit
+
+
+def get_retry_after(response):
+    """Returns the seconds to wait given by the Retry-After header of
+    the response, as seconds or an HTTP date, or None if absent or
+    invalid.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff(attempt):
+    """Returns the seconds to wait before a retry, exponential in the
+    attempt, with full jitter.
+    """
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2**attempt))
+
+
+def send_with_retries(send, upstream, max_retries=MAX_RETRIES):
+    """Calls send, which sends a request to the upstream API and returns
+    the response, within the limit of requests in flight to the API.
+    Throttled responses, and timeouts, are retried after the seconds
+    given by Retry-After, with jitter, or an exponential backoff.
+    Returns the last response, or raises the last timeout, or any
+    other error, which releases the request in flight.
+    """
+    limiter = get_limiter(upstream)
+    for attempt in range(max_retries + 1):
+        send_time = limiter.acquire()
+        try:
+            response = send()
+
+        except requests.exceptions.Timeout:
+            if attempt == max_retries:
+                raise
+            limiter.on_throttle(send_time)
+            delay = get_backoff(attempt)
+            reason = "timed out"
+
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                limiter.on_success(time.monotonic() - send_time)
+                return response
+            if attempt == max_retries:
+                return response
+            retry_after = get_retry_after(response)
+            limiter.on_throttle(send_time, retry_after)
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, BACKOFF_SECONDS)
+            else:
+                delay = get_backoff(attempt)
+            reason = f"responded {response.status_code}"
+
+        finally:
+            limiter.release()
+
+        metrics.record_retry(upstream)
+        print(
+            f"Request to {upstream} {reason}, retrying in {delay:.1f} seconds with at most {int(limiter.limit)} requests in flight"
+        )
+        time.sleep(delay)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+
+import argparse
+import importlib
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark_server import UPSTREAMS, start_server
+from http_transport import CASSETTE_PATH
+
+BENCHMARK_PATH = "../results/benchmark.json"
+
+SIZES = [10, 100]
+
+# Command line utilities, and stages, benchmarked: the module whose
+# main function is run, its arguments, with the list of genes or
+# compounds as {gene_list} or {compound_list}, and which list sets the
+# number of items
+BENCHMARK_CASES = {
+    "open-targets": {
+        "module": "open_targets",
+        "args": ["--gene-list", "{gene_list}", "--no-cache", "-f"],
+        "items": "gene_list",
+    },
+    "open-targets-batched": {
+        "module": "open_targets",
+        "args": ["--gene-list", "{gene_list}", "--alias-batching", "--no-cache", "-f"],
+        "items": "gene_list",
+    },
+    "open-targets-ids": {
+        "module": "open_targets",
+        "args": ["--gene-list", "{gene_list}", "--profile", "ids", "--no-cache", "-f"],
+        "items": "gene_list",
+    },
+    "open-targets-ndjson-gz": {
+        "module": "open_targets",
+        "args": [
+            "--gene-list",
+            "{gene_list}",
+            "--output-format",
+            "ndjson.gz",
+            "--no-cache",
+            "-f",
+        ],
+        "items": "gene_list",
+    },
+    "ncats": {
+        "module": "ncats",
+        "args": ["--compound-list", "{compound_list}", "-f"],
+        "items": "compound_list",
+    },
+    "pipeline": {
+        "module": "pipeline",
+        "args": ["--gene-list", "{gene_list}", "--no-cache", "-f"],
+        "items": "gene_list",
+    },
+}
+
+
+def run_child(module_name, latencies_path, base_url, module_args):
+    """Runs the main function of the module with the arguments, sending
+    requests for each upstream API to the local server instead, and
+    writes the latency of each request.
+    """
+    from http_transport import add_send_wrapper
+
+    # Redirect requests at the transport, so that every client library
+    # is redirected, and time each request
+    latencies = []
+
+    def redirect_and_time(send):
+        def timed_send(self, request, *args, **kwargs):
+            for name, upstream in UPSTREAMS.items():
+                if request.url.startswith(upstream):
+                    request.url = f"{base_url}/{name}{request.url[len(upstream):]}"
+            start_time = time.perf_counter()
+            try:
+                return send(self, request, *args, **kwargs)
+
+            finally:
+                latencies.append(time.perf_counter() - start_time)
+
+        return timed_send
+
+    add_send_wrapper(redirect_and_time)
+
+    # Disable the ChEMBL client cache, so that every request is sent
+    try:
+        from chembl_webresource_client.settings import Settings
+
+        Settings.Instance().CACHING = False
+
+    except ImportError:
+        pass
+
+    sys.argv = [f"{module_name}.py"] + module_args
+    try:
+        importlib.import_module(module_name).main()
+
+    finally:
+        with open(latencies_path, "w") as fp:
+            json.dump(latencies, fp)
+
+
+def run_case(name, case, lists, size, base_url, data_dir):
+    """Runs a benchmark case in a child process, in a scratch working
+    directory, with its own results directory, and returns the wall
+    seconds, throughput, request latency percentiles, and peak resident
+    set size.
+    """
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        scratch_dir = Path(scratch_dir)
+        (scratch_dir / "work").mkdir()
+        (scratch_dir / "results").mkdir()
+        (scratch_dir / "data").symlink_to(Path(data_dir).resolve())
+
+        list_paths = {}
+        for list_name, items in lists.items():
+            list_paths[list_name] = scratch_dir / f"{list_name}.txt"
+            list_paths[list_name].write_text("\n".join(items[:size]) + "\n")
+        module_args = [arg.format(**list_paths) for arg in case["args"]]
+        latencies_path = scratch_dir / "latencies.json"
+
+        start_time = time.perf_counter()
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(__file__).resolve()),
+                "--child",
+                case["module"],
+                str(latencies_path),
+                base_url,
+                "--",
+            ]
+            + module_args,
+            cwd=scratch_dir / "work",
+            stdout=subprocess.DEVNULL,
+        )
+        _, status, rusage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start_time
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        latencies = []
+        if latencies_path.exists():
+            with open(latencies_path, "r") as fp:
+                latencies = json.load(fp)
+
+    items = min(size, len(lists[case["items"]]))
+    return {
+        "case": name,
+        "size": items,
+        "returncode": process.returncode,
+        "seconds": seconds,
+        "items_per_second": items / seconds,
+        "requests": len(latencies),
+        "p50_latency": float(np.percentile(latencies, 50)) if latencies else None,
+        "p99_latency": float(np.percentile(latencies, 99)) if latencies else None,
+        # Linux reports the maximum resident set size in kilobytes
+        "peak_rss_bytes": rusage.ru_maxrss * 1024,
+    }
+
+
+def read_list(list_path):
+    """Reads items, one per line, ignoring blank lines, and lines
+    beginning with "#".
+    """
+    if list_path is None:
+        return []
+    with open(list_path, "r") as fp:
+        return [
+            line.strip().upper()
+            for line in fp
+            if line.strip() != "" and not line.startswith("#")
+        ]
+
+
+def format_value(value, scale=1, digits=3):
+    """Formats a value for the report, or a dash if None."""
+    if value is None:
+        return "-"
+    return f"{value * scale:.{digits}f}"
+
+
+def main():
+    """Benchmarks each command line utility, and stage, against a local
+    server of upstream responses recorded in the HTTP transport
+    cassette, at each gene or compound list size, and reports
+    throughput, request latency, and peak memory.
+    """
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        module_name, latencies_path, base_url, _ = sys.argv[2:6]
+        run_child(module_name, latencies_path, base_url, sys.argv[6:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the utilities against recorded upstream responses"
+    )
+    parser.add_argument(
+        "--gene-list",
+        required=True,
+        help="file containing gene symbols, one per line, from which lists of each size are taken",
+    )
+    parser.add_argument(
+        "--compound-list",
+        help="file containing compound names, one per line, from which lists of each size are taken",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in SIZES),
+        help=f"comma separated list sizes (default: {','.join(str(size) for size in SIZES)})",
+    )
+    parser.add_argument(
+        "--cases",
+        default=",".join(BENCHMARK_CASES),
+        help=f"comma separated cases to run (default: {','.join(BENCHMARK_CASES)})",
+    )
+    parser.add_argument(
+        "--cassette",
+        default=CASSETTE_PATH,
+        help=f"file of requests and responses recorded by the HTTP transport, from which responses are replayed (default: {CASSETTE_PATH})",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="record responses missing from the cassette from the upstream APIs",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.0,
+        help="seconds the server waits before each response (default: 0)",
+    )
+    args = parser.parse_args()
+
+    lists = {
+        "gene_list": read_list(args.gene_list),
+        "compound_list": read_list(args.compound_list),
+    }
+    sizes = [int(size) for size in args.sizes.split(",")]
+    server = start_server(args.cassette, record=args.record, delay=args.delay)
+
+    benchmarks = []
+    print(
+        f"{'case':24} {'size':>6} {'seconds':>9} {'items/s':>9} {'requests':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8}"
+    )
+    for name in args.cases.split(","):
+        case = BENCHMARK_CASES[name]
+        if len(lists[case["items"]]) == 0:
+            print(
+                f"Skipping {name}, which requires --{case['items'].replace('_', '-')}"
+            )
+            continue
+        for size in sizes:
+            benchmark = run_case(name, case, lists, size, server.base_url, "../data")
+            benchmarks.append(benchmark)
+            failed = " (failed)" if benchmark["returncode"] != 0 else ""
+            print(
+                f"{name:24} {benchmark['size']:>6} {format_value(benchmark['seconds']):>9} {format_value(benchmark['items_per_second'], digits=1):>9} {benchmark['requests']:>8} {format_value(benchmark['p50_latency'], 1000, 1):>8} {format_value(benchmark['p99_latency'], 1000, 1):>8} {format_value(benchmark['peak_rss_bytes'], 1 / 2**20, 1):>8}{failed}"
+            )
+    server.shutdown()
+
+    temp_path = Path(BENCHMARK_PATH).with_suffix(".json.tmp")
+    with open(temp_path, "w") as fp:
+        json.dump(benchmarks, fp, indent=4)
+    os.replace(temp_path, BENCHMARK_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import requests
+
+from http_transport import CASSETTE_PATH, TRANSIENT_STATUSES, Cassette, get_request_key
+
+# Upstream APIs, by the first component of the local path under which
+# each is served
+UPSTREAMS = {
+    "chembl": "https://www.ebi.ac.uk",
+    "ncats": "https://drugs.ncats.io",
+    "opentargets": "https://api.platform.opentargets.org",
+}
+
+# Request headers forwarded upstream when recording
+FORWARD_HEADERS = ["Accept", "Content-Type"]
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """Serves upstream responses recorded in the cassette of the HTTP
+    transport, or, when recording, forwards requests without a recorded
+    response upstream, and records the responses in the cassette.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length > 0 else b""
+        upstream, _, path = self.path.lstrip("/").partition("/")
+        if upstream not in UPSTREAMS:
+            self.send_body(404, "text/plain", b"Unknown upstream")
+            return
+
+        server = self.server
+        url = f"{UPSTREAMS[upstream]}/{path}"
+        key = get_request_key(self.command, url, body or None)
+        recorded = server.cassette.get(key)
+        if recorded is not None:
+            status, content_type, content = recorded
+            content_type = content_type or "application/octet-stream"
+            content = bytes(content)
+
+        elif server.record:
+            headers = {
+                header: self.headers[header]
+                for header in FORWARD_HEADERS
+                if header in self.headers
+            }
+            response = server.session.request(
+                self.command, url, headers=headers, data=body or None
+            )
+            status = response.status_code
+            content_type = response.headers.get("Content-Type", "application/json")
+            content = response.content
+            if status not in TRANSIENT_STATUSES:
+                server.cassette.put(
+                    key, self.command, url, status, content_type, content
+                )
+
+        else:
+            self.send_body(404, "text/plain", b"No recorded response")
+            return
+
+        if server.delay > 0:
+            time.sleep(server.delay)
+        self.send_body(status, content_type, content)
+
+    def send_body(self, status, content_type, content):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+    def log_message(self, format, *args):
+        """Logs nothing, so that logging does not skew benchmarks."""
+
+
+def start_server(cassette_path=CASSETTE_PATH, record=False, delay=0.0, port=0):
+    """Starts the server on a thread, and returns it. The server serves
+    each upstream under the path /<name>/, at the URL in its base_url
+    attribute.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), RecordingHandler)
+    server.daemon_threads = True
+    server.cassette = Cassette(cassette_path)
+    server.record = record
+    server.delay = delay
+    server.session = requests.Session()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Serves recorded ChEMBL, NCATS, and Open Targets responses locally,
+    optionally recording responses missing from the cassette.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve recorded upstream API responses for benchmarks"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="port on which to serve (default: 8765)",
+    )
+    parser.add_argument(
+        "--cassette",
+        default=CASSETTE_PATH,
+        help=f"file of recorded requests and responses (default: {CASSETTE_PATH})",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="forward requests without a recorded response upstream, and record the response",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.0,
+        help="seconds to wait before each response (default: 0)",
+    )
+    args = parser.parse_args()
+
+    server = start_server(
+        args.cassette, record=args.record, delay=args.delay, port=args.port
+    )
+    print(f"Serving recorded responses at {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
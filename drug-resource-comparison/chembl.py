@@ -1,13 +1,127 @@
 #!/usr/bin/env python
 
 import argparse
-import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 import time
 
-from chembl_webresource_client.new_client import new_client
+from chembl_webresource_client.new_client import client_from_url, new_client
+from chembl_webresource_client.settings import Settings
+
+from chembl_images import IMAGE_FORMATS, fetch_images
+from chembl_sqlite import SqliteClient
+from chembl_target_index import open_target_index, resolve_target
+from gene_index import map_gene_symbol_to_ids, open_gene_index
+from http_transport import add_transport_arguments, install_transport
+from json_writer import JsonObjectCollector, JsonObjectWriter
+from metrics import add_metrics_argument, install_request_metrics, metrics
+from output_formats import (
+    add_output_format_argument,
+    get_results_path,
+    read_results,
+    write_results,
+)
+from results_store import store_bytes, store_file
+
+# Number of molecule ChEMBL ids in each __in filter
+CHUNK_SIZE = 100
+
+
+def create_image_client():
+    """Returns a new ChEMBL image client, which is not shared with other
+    threads, since each client holds its image format, and its session.
+    """
+    return client_from_url(f"{Settings.Instance().NEW_CLIENT_URL}/spore").image
+
 
-from LoaderUtilities import get_gene_name_to_ids_map, map_gene_name_to_ids
+def get_target_results(client, gene_symbol):
+    """Returns the organism and ChEMBL id of the target of the gene
+    symbol, resolved locally, if the target index has been built,
+    otherwise, or on a miss, by searching synonyms remotely.
+    """
+    target_results = None
+    target_index = open_target_index()
+    if target_index is not None:
+        target_results = resolve_target(gene_symbol, target_index)
+        target_index.close()
+    if target_results is None:
+        only = ["organism", "target_chembl_id"]
+        target = client.target
+        target_results = target.filter(
+            target_synonym__icontains=gene_symbol,
+            organism__exact="Homo sapiens",
+        ).only(only)[0]
+    return target_results
+
+
+def get_activity_filters(args):
+    """Returns the activity filters, pushed down to the server, given
+    the standard type and any field lookup filters.
+    """
+    activity_filters = {}
+    if args.standard_type is not None:
+        activity_filters["standard_type"] = args.standard_type
+    for activity_filter in args.activity_filter:
+        key, _, value = activity_filter.partition("=")
+        activity_filters[key] = value
+    return activity_filters
+
+
+def collect_molecule_chembl_ids(activity_results, molecule_chembl_ids):
+    """Yields each activity, fetching each page of activities once, and
+    collects the distinct molecule ChEMBL ids of the activities.
+    """
+    for a_r in activity_results:
+        if a_r["molecule_chembl_id"] is not None:
+            molecule_chembl_ids.add(a_r["molecule_chembl_id"])
+        yield a_r
+
+
+def fetch_chunk(resource, chunk, filters):
+    """Fetches all results of the resource for a chunk of molecule
+    ChEMBL ids, and returns them with the seconds taken.
+    """
+    start_time = time.time()
+    chunk_results = list(resource.filter(molecule_chembl_id__in=chunk, **filters))
+    return chunk_results, time.time() - start_time
+
+
+def fetch_in_chunks(lookups, molecule_chembl_ids, chunk_size, max_workers):
+    """Fetches the results of each lookup, a resource and its filters
+    keyed by name, for the molecule ChEMBL ids split into chunks,
+    running all chunks of all lookups on a worker pool. The results of
+    each lookup are merged in chunk order, the seconds and results of
+    each chunk are recorded, and throughput is reported for each
+    lookup.
+    """
+    chunks = [
+        molecule_chembl_ids[index : index + chunk_size]
+        for index in range(0, len(molecule_chembl_ids), chunk_size)
+    ]
+    lookup_results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: [
+                executor.submit(fetch_chunk, resource, chunk, filters)
+                for chunk in chunks
+            ]
+            for name, (resource, filters) in lookups.items()
+        }
+        for name, name_futures in futures.items():
+            lookup_results[name] = []
+            seconds = 0
+            for future in name_futures:
+                chunk_results, chunk_seconds = future.result()
+                lookup_results[name].extend(chunk_results)
+                seconds += chunk_seconds
+                metrics.record_stage(
+                    f"chembl-{name}", chunk_seconds, len(chunk_results)
+                )
+            print(
+                f"Got {len(lookup_results[name])} ChEMBL {name} results in {len(chunks)} chunks in {seconds} request seconds ({len(lookup_results[name]) / max(seconds, 1e-9):.1f} results per request second)"
+            )
+    return lookup_results
 
 
 def main():
@@ -24,6 +138,46 @@ def main():
         default="ADRB2",
         help="gene symbol for which to obtain ChEMBL data (default: ADRB2)",
     )
+    parser.add_argument(
+        "--standard-type",
+        help="standard type, such as IC50, to which to restrict activities",
+    )
+    parser.add_argument(
+        "--activity-filter",
+        action="append",
+        default=[],
+        help="field lookup filter, such as pchembl_value__gte=6, to which to restrict activities, may be repeated",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"number of molecule ids in each drug, drug indication, and molecule lookup (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="maximum number of concurrent lookups (default: 8)",
+    )
+    parser.add_argument(
+        "--chembl-db",
+        help="local ChEMBL SQLite release from which to obtain target, activity, drug, drug indication, and molecule data, instead of the web services",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="obtain the image of every approved molecule returned by the drug lookup",
+    )
+    parser.add_argument(
+        "--image-format",
+        choices=IMAGE_FORMATS,
+        default="svg",
+        help="format of the images of approved molecules (default: svg)",
+    )
+    add_output_format_argument(parser)
+    add_metrics_argument(parser)
+    add_transport_arguments(parser)
     parser.add_argument(
         "-f",
         "--force",
@@ -32,79 +186,101 @@ def main():
     )
     args = parser.parse_args()
 
+    install_transport(args.http_mode, args.cassette)
+    install_request_metrics()
+
     gene_symbol = args.gene_symbol.upper()
     if gene_symbol == "ADRB2":
         gene_id = "ENSG00000169252"
 
     else:
-        gnm2ids = get_gene_name_to_ids_map()
-        gene_id = map_gene_name_to_ids(gene_symbol, gnm2ids)
+        gene_index = open_gene_index()
+        gene_id = map_gene_symbol_to_ids(gene_symbol, gene_index)
 
-    results_path = Path(f"../results/{gene_symbol}-chembl.json")
-    if not results_path.exists() or args.force:
-
-        results = {}
-        results["gene_symbol"] = gene_symbol
-        results["gene_id"] = gene_id
-
-        # == target
-
-        start_time = time.time()
-        print(f"Getting ChEMBL target data for {gene_symbol}")
-
-        only = ["organism", "target_chembl_id"]
-        target = new_client.target
-        target_results = target.filter(
-            target_synonym__icontains=gene_symbol, organism__exact="Homo sapiens"
-        ).only(only)[0]
-        results["target"] = target_results
-
-        # == activity
-
-        print(f"Getting ChEMBL activity data for {gene_symbol}")
-
-        activity = new_client.activity
-        activity_results = activity.filter(
-            target_chembl_id=target_results["target_chembl_id"]
-        )  # .filter(standard_type="IC50")
-        results["activity"] = list(activity_results)
-
-        molecule_chembl_ids = [a_r["molecule_chembl_id"] for a_r in activity_results]
-
-        # == drug
-
-        print(f"Getting ChEMBL drug data for {gene_symbol}")
+    if args.chembl_db is not None:
+        client = SqliteClient(args.chembl_db)
 
-        drug = new_client.drug
-        drug_results = drug.filter(
-            molecule_chembl_id__in=molecule_chembl_ids, max_phase=4
-        )
-        results["drug"] = list(drug_results)
-
-        # == drug_indication
-
-        print(f"Getting ChEMBL drug indication data for {gene_symbol}")
-
-        drug_indication = new_client.drug_indication
-        drug_indication_results = drug_indication.filter(
-            molecule_chembl_id__in=molecule_chembl_ids, max_phase_for_ind=4
-        )
-        results["drug_indication"] = list(drug_indication_results)
-
-        # == molecule
-
-        print(f"Getting ChEMBL molecule data for {gene_symbol}")
+    else:
+        client = new_client
 
-        molecule = new_client.molecule
-        molecule_results = molecule.filter(
-            molecule_chembl_id__in=molecule_chembl_ids, max_phase=4
-        )
-        results["molecule"] = list(molecule_results)
+    results_path = get_results_path(
+        f"../results/{gene_symbol}-chembl.json", args.output_format
+    )
+    drug_results = None
+    if not results_path.exists() or args.force:
 
-        with open(results_path, "w") as fp:
-            json.dump(results, fp, indent=4)
+        # Write indented JSON as it arrives, to a temporary file so that
+        # an interrupted run leaves no partial results, or collect the
+        # results to write in another format once complete
+        temp_path = results_path.with_suffix(".json.tmp")
+        stream = args.output_format == "json"
+        with open(temp_path, "w") if stream else nullcontext() as fp:
+
+            results = JsonObjectWriter(fp) if stream else JsonObjectCollector()
+            results.write_member("gene_symbol", gene_symbol)
+            results.write_member("gene_id", gene_id)
+
+            # == target
+
+            start_time = time.time()
+            print(f"Getting ChEMBL target data for {gene_symbol}")
+
+            target_results = get_target_results(client, gene_symbol)
+            results.write_member("target", target_results)
+            metrics.record_stage("chembl-target", time.time() - start_time, 1)
+
+            # == activity
+
+            activity_start_time = time.time()
+            print(f"Getting ChEMBL activity data for {gene_symbol}")
+
+            activity_filters = get_activity_filters(args)
+            activity = client.activity
+            activity_results = activity.filter(
+                target_chembl_id=target_results["target_chembl_id"], **activity_filters
+            )
+            molecule_chembl_ids = set()
+            activity_count = results.write_array(
+                "activity",
+                collect_molecule_chembl_ids(activity_results, molecule_chembl_ids),
+            )
+            molecule_chembl_ids = sorted(molecule_chembl_ids)
+            metrics.record_stage(
+                "chembl-activity", time.time() - activity_start_time, activity_count
+            )
+
+            print(
+                f"Got {activity_count} ChEMBL activities for {len(molecule_chembl_ids)} molecules for {gene_symbol}"
+            )
+
+            # == drug, drug_indication, and molecule
+
+            print(
+                f"Getting ChEMBL drug, drug indication, and molecule data for {gene_symbol}"
+            )
+
+            lookups = {
+                "drug": (client.drug, {"max_phase": 4}),
+                "drug_indication": (client.drug_indication, {"max_phase_for_ind": 4}),
+                "molecule": (client.molecule, {"max_phase": 4}),
+            }
+            lookup_results = fetch_in_chunks(
+                lookups, molecule_chembl_ids, args.chunk_size, args.max_workers
+            )
+            for name in lookups:
+                results.write_array(name, lookup_results[name])
+            drug_results = lookup_results["drug"]
+
+            results.close()
+
+        if stream:
+            store_file(temp_path, results_path)
+
+        else:
+            write_results(results.value, results_path, args.output_format)
 
         stop_time = time.time()
+        metrics.record_stage("chembl", stop_time - start_time)
         print(
             f"Got ChEMBL target data for {gene_symbol} in {stop_time - start_time} seconds"
         )
@@ -120,12 +296,27 @@ def main():
 
         image = new_client.image
         image.set_format("svg")
-        with open(image_path, "w") as fp:
-            fp.write(image.get(drug_id))
+        store_bytes(image.get(drug_id).encode("utf-8"), image_path)
 
         stop_time = time.time()
+        metrics.record_stage("chembl-svg", stop_time - start_time, 1)
         print(f"Got ChEMBL SVG for {drug_name} in {stop_time - start_time} seconds")
 
+    # == images
+
+    if args.images:
+        if drug_results is None:
+            drug_results = read_results(results_path, args.output_format)["drug"]
+        fetch_images(
+            create_image_client,
+            [d_r["molecule_chembl_id"] for d_r in drug_results],
+            args.image_format,
+            args.max_workers,
+            force=args.force,
+        )
+
+    metrics.write("chembl", args.metrics_dir)
+
 
 if __name__ == "__main__":
     main()
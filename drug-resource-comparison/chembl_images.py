@@ -0,0 +1,168 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+from metrics import metrics
+
+IMAGES_DIR = "../results/chembl-images"
+
+IMAGE_FORMATS = ["svg", "png"]
+
+
+def get_image_path(images_dir, molecule_chembl_id, image_format):
+    """Returns the path of the image of the molecule, sharded into two
+    levels of directories by the leading digits of the hash of its
+    ChEMBL id, so that no directory holds more than a few files.
+    """
+    digest = hashlib.sha256(molecule_chembl_id.encode("utf-8")).hexdigest()
+    return (
+        Path(images_dir)
+        / image_format
+        / digest[0:2]
+        / digest[2:4]
+        / f"{molecule_chembl_id}.{image_format}"
+    )
+
+
+def hash_file(path):
+    """Returns the SHA-256 hex digest of the file content."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def get_stat_entry(image_path, content_hash):
+    """Returns the manifest entry of the image: the hash of its
+    content, and its size and modification time, by which an unchanged
+    image is recognized without reading it.
+    """
+    stat = image_path.stat()
+    return {"hash": content_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_unchanged(image_path, entry):
+    """Returns True if the image on disk matches its manifest entry,
+    comparing its size and modification time, and only if either
+    differs, its content hash.
+    """
+    if entry is None:
+        return False
+    try:
+        stat = image_path.stat()
+
+    except FileNotFoundError:
+        return False
+
+    if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    return hash_file(image_path) == entry["hash"]
+
+
+def read_manifest(manifest_path):
+    """Reads the manifest entry of each image, keyed by molecule ChEMBL
+    id, or returns an empty manifest.
+    """
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, "r") as fp:
+        return json.load(fp)
+
+
+def write_manifest(manifest_path, manifest):
+    """Writes the manifest atomically."""
+    temp_path = manifest_path.with_suffix(".json.tmp")
+    with open(temp_path, "w") as fp:
+        json.dump(manifest, fp, indent=4, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def fetch_image(get_image, molecule_chembl_id, image_path):
+    """Fetches the image of the molecule using the image client of the
+    current thread, writes it atomically, and returns its manifest
+    entry.
+    """
+    content = get_image().get(molecule_chembl_id)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    image_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = image_path.with_suffix(f".{threading.get_ident()}.tmp")
+    temp_path.write_bytes(content)
+    os.replace(temp_path, image_path)
+    return get_stat_entry(image_path, hashlib.sha256(content).hexdigest())
+
+
+def fetch_images(
+    create_image,
+    molecule_chembl_ids,
+    image_format,
+    max_workers,
+    images_dir=IMAGES_DIR,
+    force=False,
+):
+    """Fetches the image of each molecule concurrently, using an image
+    client created by create_image for each worker thread, since image
+    clients hold the image format, and their session, as state. Skips
+    molecules whose image on disk is unchanged since recorded in the
+    manifest, which is updated. Returns the number of images fetched.
+    """
+    molecule_chembl_ids = list(dict.fromkeys(molecule_chembl_ids))
+
+    start_time = time.time()
+    print(
+        f"Getting ChEMBL {image_format} images for {len(molecule_chembl_ids)} molecules"
+    )
+
+    manifest_path = Path(images_dir) / image_format / "manifest.json"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(manifest_path)
+    fetch_ids = []
+    for molecule_chembl_id in molecule_chembl_ids:
+        image_path = get_image_path(images_dir, molecule_chembl_id, image_format)
+        entry = manifest.get(molecule_chembl_id)
+        if force or not is_unchanged(image_path, entry):
+            fetch_ids.append(molecule_chembl_id)
+
+        else:
+            # Record the size and modification time of an image found
+            # unchanged by content hash
+            manifest[molecule_chembl_id] = get_stat_entry(image_path, entry["hash"])
+
+    thread_images = threading.local()
+
+    def get_image():
+        if not hasattr(thread_images, "image"):
+            thread_images.image = create_image()
+            thread_images.image.set_format(image_format)
+        return thread_images.image
+
+    fetch_count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                fetch_image,
+                get_image,
+                molecule_chembl_id,
+                get_image_path(images_dir, molecule_chembl_id, image_format),
+            ): molecule_chembl_id
+            for molecule_chembl_id in fetch_ids
+        }
+        for future in as_completed(futures):
+            molecule_chembl_id = futures[future]
+            try:
+                manifest[molecule_chembl_id] = future.result()
+                fetch_count += 1
+
+            except Exception as exc:
+                print(f"Could not get ChEMBL image for {molecule_chembl_id}: {exc}")
+
+    write_manifest(manifest_path, manifest)
+
+    stop_time = time.time()
+    metrics.record_stage("chembl-images", stop_time - start_time, fetch_count)
+    print(
+        f"Got {fetch_count} ChEMBL {image_format} images, skipping {len(molecule_chembl_ids) - len(fetch_ids)} unchanged, in {stop_time - start_time} seconds"
+    )
+
+    return fetch_count
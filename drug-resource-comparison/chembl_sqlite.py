@@ -0,0 +1,357 @@
+import json
+import sqlite3
+
+# Indexes on the ChEMBL SQLite release used by the resource queries
+INDEXES = {
+    "target_dictionary_chembl_id": "target_dictionary (chembl_id)",
+    "target_components_tid": "target_components (tid)",
+    "component_synonyms_component_id": "component_synonyms (component_id)",
+    "assays_tid": "assays (tid)",
+    "activities_assay_id": "activities (assay_id)",
+    "activities_molregno": "activities (molregno)",
+    "molecule_dictionary_chembl_id": "molecule_dictionary (chembl_id)",
+    "molecule_synonyms_molregno": "molecule_synonyms (molregno)",
+    "molecule_atc_classification_molregno": "molecule_atc_classification (molregno)",
+    "drug_indication_molregno": "drug_indication (molregno)",
+    "indication_refs_drugind_id": "indication_refs (drugind_id)",
+}
+
+# Each resource selects columns, or expressions, named as the fields
+# of the corresponding ChEMBL web resource, from the ChEMBL schema. A
+# dotted field name is nested, and fields listed as JSON are decoded.
+# Filter fields may be used in filters, but are not selected.
+RESOURCES = {
+    "target": {
+        "from": "target_dictionary td",
+        "fields": {
+            "target_chembl_id": "td.chembl_id",
+            "pref_name": "td.pref_name",
+            "target_type": "td.target_type",
+            "organism": "td.organism",
+            "tax_id": "td.tax_id",
+            "species_group_flag": "td.species_group_flag",
+        },
+        "filter_fields": {
+            "target_synonym": (
+                "(SELECT group_concat(cs.component_synonym, '|')"
+                " FROM target_components tc"
+                " JOIN component_synonyms cs ON cs.component_id = tc.component_id"
+                " WHERE tc.tid = td.tid)"
+            ),
+        },
+        "json_fields": [],
+        "order_by": "td.tid",
+    },
+    "activity": {
+        "from": (
+            "activities act"
+            " JOIN assays a ON a.assay_id = act.assay_id"
+            " JOIN target_dictionary td ON td.tid = a.tid"
+            " JOIN molecule_dictionary md ON md.molregno = act.molregno"
+            " LEFT JOIN docs d ON d.doc_id = act.doc_id"
+            " LEFT JOIN molecule_hierarchy mh ON mh.molregno = act.molregno"
+            " LEFT JOIN molecule_dictionary pmd ON pmd.molregno = mh.parent_molregno"
+            " LEFT JOIN compound_structures cs ON cs.molregno = act.molregno"
+        ),
+        "fields": {
+            "action_type": "act.action_type",
+            "activity_comment": "act.activity_comment",
+            "activity_id": "act.activity_id",
+            "assay_chembl_id": "a.chembl_id",
+            "assay_description": "a.description",
+            "assay_type": "a.assay_type",
+            "bao_endpoint": "act.bao_endpoint",
+            "bao_format": "a.bao_format",
+            "canonical_smiles": "cs.canonical_smiles",
+            "data_validity_comment": "act.data_validity_comment",
+            "document_chembl_id": "d.chembl_id",
+            "document_journal": "d.journal",
+            "document_year": "d.year",
+            "molecule_chembl_id": "md.chembl_id",
+            "molecule_pref_name": "md.pref_name",
+            "parent_molecule_chembl_id": "pmd.chembl_id",
+            "pchembl_value": "act.pchembl_value",
+            "potential_duplicate": "act.potential_duplicate",
+            "qudt_units": "act.qudt_units",
+            "record_id": "act.record_id",
+            "relation": "act.relation",
+            "src_id": "act.src_id",
+            "standard_flag": "act.standard_flag",
+            "standard_relation": "act.standard_relation",
+            "standard_text_value": "act.standard_text_value",
+            "standard_type": "act.standard_type",
+            "standard_units": "act.standard_units",
+            "standard_upper_value": "act.standard_upper_value",
+            "standard_value": "act.standard_value",
+            "target_chembl_id": "td.chembl_id",
+            "target_organism": "td.organism",
+            "target_pref_name": "td.pref_name",
+            "target_tax_id": "td.tax_id",
+            "text_value": "act.text_value",
+            "toid": "act.toid",
+            "type": "act.type",
+            "units": "act.units",
+            "uo_units": "act.uo_units",
+            "upper_value": "act.upper_value",
+            "value": "act.value",
+        },
+        "filter_fields": {},
+        "json_fields": [],
+        "order_by": "act.activity_id",
+    },
+    "drug": {
+        "from": "molecule_dictionary md",
+        "fields": {
+            "molecule_chembl_id": "md.chembl_id",
+            "development_phase": "md.max_phase",
+            "first_approval": "md.first_approval",
+            "first_in_class": "md.first_in_class",
+            "black_box": "md.black_box_warning",
+            "chirality": "md.chirality",
+            "prodrug": "md.prodrug",
+            "oral": "md.oral",
+            "parenteral": "md.parenteral",
+            "topical": "md.topical",
+            "usan_stem": "md.usan_stem",
+            "usan_stem_definition": "md.usan_stem_definition",
+            "usan_year": "md.usan_year",
+            "withdrawn_flag": "md.withdrawn_flag",
+            "synonyms": (
+                "(SELECT json_group_array(ms.synonyms || ' (' || ms.syn_type || ')')"
+                " FROM molecule_synonyms ms WHERE ms.molregno = md.molregno)"
+            ),
+            "atc_classification": (
+                "(SELECT json_group_array(mac.level5)"
+                " FROM molecule_atc_classification mac"
+                " WHERE mac.molregno = md.molregno)"
+            ),
+        },
+        "filter_fields": {
+            "max_phase": "md.max_phase",
+        },
+        "json_fields": ["synonyms", "atc_classification"],
+        "order_by": "md.molregno",
+    },
+    "drug_indication": {
+        "from": (
+            "drug_indication di"
+            " JOIN molecule_dictionary md ON md.molregno = di.molregno"
+            " LEFT JOIN molecule_hierarchy mh ON mh.molregno = di.molregno"
+            " LEFT JOIN molecule_dictionary pmd ON pmd.molregno = mh.parent_molregno"
+        ),
+        "fields": {
+            "drugind_id": "di.drugind_id",
+            "efo_id": "di.efo_id",
+            "efo_term": "di.efo_term",
+            "max_phase_for_ind": "di.max_phase_for_ind",
+            "mesh_heading": "di.mesh_heading",
+            "mesh_id": "di.mesh_id",
+            "molecule_chembl_id": "md.chembl_id",
+            "parent_molecule_chembl_id": "pmd.chembl_id",
+            "indication_refs": (
+                "(SELECT json_group_array(json_object("
+                "'ref_id', ir.ref_id, 'ref_type', ir.ref_type, 'ref_url', ir.ref_url))"
+                " FROM indication_refs ir WHERE ir.drugind_id = di.drugind_id)"
+            ),
+        },
+        "filter_fields": {},
+        "json_fields": ["indication_refs"],
+        "order_by": "di.drugind_id",
+    },
+    "molecule": {
+        "from": (
+            "molecule_dictionary md"
+            " LEFT JOIN compound_structures cs ON cs.molregno = md.molregno"
+            " LEFT JOIN compound_properties cp ON cp.molregno = md.molregno"
+        ),
+        "fields": {
+            "molecule_chembl_id": "md.chembl_id",
+            "pref_name": "md.pref_name",
+            "max_phase": "md.max_phase",
+            "molecule_type": "md.molecule_type",
+            "structure_type": "md.structure_type",
+            "therapeutic_flag": "md.therapeutic_flag",
+            "first_approval": "md.first_approval",
+            "oral": "md.oral",
+            "parenteral": "md.parenteral",
+            "topical": "md.topical",
+            "black_box_warning": "md.black_box_warning",
+            "natural_product": "md.natural_product",
+            "first_in_class": "md.first_in_class",
+            "chirality": "md.chirality",
+            "prodrug": "md.prodrug",
+            "inorganic_flag": "md.inorganic_flag",
+            "usan_year": "md.usan_year",
+            "availability_type": "md.availability_type",
+            "usan_stem": "md.usan_stem",
+            "polymer_flag": "md.polymer_flag",
+            "usan_substem": "md.usan_substem",
+            "usan_stem_definition": "md.usan_stem_definition",
+            "indication_class": "md.indication_class",
+            "withdrawn_flag": "md.withdrawn_flag",
+            "chebi_par_id": "md.chebi_par_id",
+            "orphan": "md.orphan",
+            "molecule_structures.canonical_smiles": "cs.canonical_smiles",
+            "molecule_structures.standard_inchi": "cs.standard_inchi",
+            "molecule_structures.standard_inchi_key": "cs.standard_inchi_key",
+            "molecule_properties.full_mwt": "cp.full_mwt",
+            "molecule_properties.alogp": "cp.alogp",
+            "molecule_properties.hba": "cp.hba",
+            "molecule_properties.hbd": "cp.hbd",
+            "molecule_properties.psa": "cp.psa",
+            "molecule_properties.rtb": "cp.rtb",
+            "molecule_properties.num_ro5_violations": "cp.num_ro5_violations",
+            "molecule_properties.full_molformula": "cp.full_molformula",
+        },
+        "filter_fields": {},
+        "json_fields": [],
+        "order_by": "md.molregno",
+    },
+}
+
+# Field lookups supported in filters, and the corresponding SQL, where
+# LIKE is case insensitive for ASCII, and instr is case sensitive
+LOOKUPS = {
+    "exact": "{} = ?",
+    "iexact": "{} = ? COLLATE NOCASE",
+    "contains": "instr({}, ?) > 0",
+    "icontains": "{} LIKE '%' || ? || '%'",
+    "startswith": "instr({}, ?) = 1",
+    "istartswith": "{} LIKE ? || '%'",
+    "gt": "{} > CAST(? AS REAL)",
+    "gte": "{} >= CAST(? AS REAL)",
+    "lt": "{} < CAST(? AS REAL)",
+    "lte": "{} <= CAST(? AS REAL)",
+    "isnull": "({} IS NULL) = ?",
+}
+
+
+def create_indexes(db_path):
+    """Creates the indexes used by the resource queries, if they do not
+    exist.
+    """
+    connection = sqlite3.connect(db_path)
+    for name, columns in INDEXES.items():
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{name} ON {columns}")
+    connection.commit()
+    connection.close()
+
+
+def nest_row(row, json_fields):
+    """Converts a row to a dictionary, decoding JSON fields, and
+    nesting dotted fields.
+    """
+    result = {}
+    for key in row.keys():
+        value = row[key]
+        if key in json_fields and value is not None:
+            value = json.loads(value)
+        parent, _, child = key.partition(".")
+        if child == "":
+            result[key] = value
+        else:
+            result.setdefault(parent, {})[child] = value
+    return result
+
+
+class SqliteQuerySet:
+    """Lazily evaluated query of a resource, supporting the filter,
+    only, indexing, and iteration used with the ChEMBL web resource
+    client query sets.
+    """
+
+    def __init__(self, db_path, resource, conditions=None, parameters=None, only=None):
+        self.db_path = db_path
+        self.resource = resource
+        self.conditions = conditions or []
+        self.parameters = parameters or []
+        self.fields = only
+
+    def filter(self, **kwargs):
+        """Returns a query set additionally restricted by the field
+        lookups.
+        """
+        spec = RESOURCES[self.resource]
+        conditions = list(self.conditions)
+        parameters = list(self.parameters)
+        for key, value in kwargs.items():
+            field, _, lookup = key.partition("__")
+            if field in spec["fields"]:
+                expression = spec["fields"][field]
+            elif field in spec["filter_fields"]:
+                expression = spec["filter_fields"][field]
+            else:
+                raise ValueError(f"Unsupported {self.resource} field {field}")
+            if lookup == "in":
+                # Bind the values as one JSON array, so that any number
+                # of values is within the SQLite limit of parameters
+                conditions.append(f"{expression} IN (SELECT value FROM json_each(?))")
+                parameters.append(json.dumps(list(value)))
+            elif lookup in LOOKUPS or lookup == "":
+                conditions.append(LOOKUPS[lookup or "exact"].format(expression))
+                parameters.append(value)
+            else:
+                raise ValueError(f"Unsupported lookup {lookup}")
+        return SqliteQuerySet(
+            self.db_path, self.resource, conditions, parameters, self.fields
+        )
+
+    def only(self, fields):
+        """Returns a query set selecting only the given fields."""
+        return SqliteQuerySet(
+            self.db_path, self.resource, self.conditions, self.parameters, fields
+        )
+
+    def get_sql(self):
+        """Returns the SQL statement of the query."""
+        spec = RESOURCES[self.resource]
+        columns = ", ".join(
+            f'{expression} AS "{field}"'
+            for field, expression in spec["fields"].items()
+            if self.fields is None or field.split(".")[0] in self.fields
+        )
+        sql = f"SELECT {columns} FROM {spec['from']}"
+        if self.conditions:
+            sql += " WHERE " + " AND ".join(self.conditions)
+        return sql + f" ORDER BY {spec['order_by']}"
+
+    def __iter__(self):
+        connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        json_fields = RESOURCES[self.resource]["json_fields"]
+        try:
+            for row in connection.execute(self.get_sql(), self.parameters):
+                yield nest_row(row, json_fields)
+        finally:
+            connection.close()
+
+    def __getitem__(self, index):
+        if not isinstance(index, int) or index < 0:
+            raise TypeError("Only non-negative integer indexes are supported")
+        connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        try:
+            row = connection.execute(
+                f"{self.get_sql()} LIMIT 1 OFFSET {index}", self.parameters
+            ).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            raise IndexError(index)
+        return nest_row(row, RESOURCES[self.resource]["json_fields"])
+
+
+class SqliteClient:
+    """Answers the target, activity, drug, drug_indication, and
+    molecule resources of the ChEMBL web resource client from a local
+    ChEMBL SQLite release.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        create_indexes(db_path)
+
+    def __getattr__(self, resource):
+        if resource not in RESOURCES:
+            raise AttributeError(f"No local ChEMBL resource {resource}")
+        return SqliteQuerySet(self.db_path, resource)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+from pathlib import Path
+import sqlite3
+import time
+
+INDEX_PATH = "../data/chembl-target-index.sqlite"
+
+ORGANISM = "Homo sapiens"
+
+# Largest code point, used as the upper bound of a prefix range
+MAX_CHAR = chr(0x10FFFF)
+
+# Ranking of matches: gene symbols before other synonyms, and single
+# proteins before complexes, families, and other target types
+RANK_ORDER = (
+    "syn_type = 'GENE_SYMBOL' DESC,"
+    " target_type = 'SINGLE PROTEIN' DESC,"
+    " CAST(substr(target_chembl_id, 7) AS INTEGER)"
+)
+
+DB_QUERY = f"""
+SELECT cs.component_synonym, cs.syn_type, td.chembl_id, td.target_type
+FROM target_dictionary td
+JOIN target_components tc ON tc.tid = td.tid
+JOIN component_synonyms cs ON cs.component_id = tc.component_id
+WHERE td.organism = '{ORGANISM}'
+UNION ALL
+SELECT td.pref_name, 'PREF_NAME', td.chembl_id, td.target_type
+FROM target_dictionary td
+WHERE td.organism = '{ORGANISM}' AND td.pref_name IS NOT NULL
+"""
+
+
+def read_db_synonyms(chembl_db):
+    """Yields the synonym, synonym type, target ChEMBL id, and target
+    type of each human target component synonym, and each target
+    preferred name, in a ChEMBL SQLite release, matching the rows read
+    using the web services.
+    """
+    connection = sqlite3.connect(f"file:{chembl_db}?mode=ro", uri=True)
+    try:
+        yield from connection.execute(DB_QUERY)
+    finally:
+        connection.close()
+
+
+def read_web_synonyms():
+    """Yields the synonym, synonym type, target ChEMBL id, and target
+    type of each human target component synonym, and each target
+    preferred name, using the ChEMBL web services.
+    """
+    from chembl_webresource_client.new_client import new_client
+
+    only = ["target_chembl_id", "target_type", "pref_name", "target_components"]
+    for target in new_client.target.filter(organism__exact=ORGANISM).only(only):
+        if target["pref_name"] is not None:
+            yield (
+                target["pref_name"],
+                "PREF_NAME",
+                target["target_chembl_id"],
+                target["target_type"],
+            )
+        for component in target["target_components"] or []:
+            for synonym in component["target_component_synonyms"] or []:
+                yield (
+                    synonym["component_synonym"],
+                    synonym["syn_type"],
+                    target["target_chembl_id"],
+                    target["target_type"],
+                )
+
+
+def build_target_index(synonyms, index_path=INDEX_PATH):
+    """Builds the target index from synonym rows, writing it to a
+    temporary file, then renaming it so that readers never see a
+    partial index.
+    """
+    start_time = time.time()
+    print(f"Building ChEMBL target index {index_path}")
+
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = index_path.with_suffix(".tmp")
+    temp_path.unlink(missing_ok=True)
+
+    connection = sqlite3.connect(temp_path)
+    connection.execute(
+        "CREATE TABLE synonyms (key TEXT, syn_type TEXT, target_chembl_id TEXT,"
+        " target_type TEXT, PRIMARY KEY (key, target_chembl_id, syn_type))"
+        " WITHOUT ROWID"
+    )
+    connection.executemany(
+        "INSERT OR IGNORE INTO synonyms VALUES (?, ?, ?, ?)",
+        (
+            (synonym.upper(), syn_type, target_chembl_id, target_type)
+            for synonym, syn_type, target_chembl_id, target_type in synonyms
+            if synonym is not None
+        ),
+    )
+    count = connection.execute("SELECT count(*) FROM synonyms").fetchone()[0]
+    connection.commit()
+    connection.close()
+    os.replace(temp_path, index_path)
+
+    stop_time = time.time()
+    print(
+        f"Built ChEMBL target index of {count} synonyms in {stop_time - start_time} seconds"
+    )
+
+
+def open_target_index(index_path=INDEX_PATH):
+    """Opens the target index read only, or returns None if it has not
+    been built.
+    """
+    if not Path(index_path).exists():
+        return None
+    return sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+
+
+def find_targets(synonym, target_index, prefix=False):
+    """Returns the distinct target ChEMBL ids matching the synonym
+    exactly, ignoring case, or matching it as a prefix, best match
+    first.
+    """
+    key = synonym.upper()
+    if prefix:
+        condition = "key >= ? AND key < ?"
+        parameters = (key, key + MAX_CHAR)
+    else:
+        condition = "key = ?"
+        parameters = (key,)
+    rows = target_index.execute(
+        f"SELECT target_chembl_id FROM synonyms WHERE {condition} ORDER BY {RANK_ORDER}",
+        parameters,
+    )
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def resolve_target(gene_symbol, target_index):
+    """Returns the organism and ChEMBL id of the target best matching
+    the gene symbol exactly, or None if there is no match.
+    """
+    target_chembl_ids = find_targets(gene_symbol, target_index)
+    if len(target_chembl_ids) == 0:
+        return None
+    return {"organism": ORGANISM, "target_chembl_id": target_chembl_ids[0]}
+
+
+def main():
+    """Builds the ChEMBL human target synonym index from a ChEMBL
+    SQLite release, or the ChEMBL web services, and optionally looks
+    up synonyms.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build the ChEMBL target synonym to target ChEMBL id index"
+    )
+    parser.add_argument(
+        "synonyms",
+        nargs="*",
+        help="gene symbols, or other synonyms, to look up in the index",
+    )
+    parser.add_argument(
+        "--chembl-db",
+        help="local ChEMBL SQLite release from which to build the index, instead of the web services",
+    )
+    parser.add_argument(
+        "--prefix",
+        action="store_true",
+        help="look up synonyms as prefixes",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force rebuild of the existing index",
+    )
+    args = parser.parse_args()
+
+    if not Path(INDEX_PATH).exists() or args.force:
+        if args.chembl_db is not None:
+            build_target_index(read_db_synonyms(args.chembl_db))
+
+        else:
+            build_target_index(read_web_synonyms())
+
+    target_index = open_target_index()
+    for synonym in args.synonyms:
+        print(f"{synonym}: {find_targets(synonym, target_index, prefix=args.prefix)}")
+
+
+if __name__ == "__main__":
+    main()
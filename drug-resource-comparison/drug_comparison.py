@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import time
+
+import pandas as pd
+
+from open_targets import read_gene_symbols
+from open_targets_tables import TABLES_DIR, load_table
+from output_formats import OUTPUT_FORMATS, find_results_format, read_results
+from stitcher_conditions import CONDITIONS_PATH
+
+RESULTS_DIR = "../results"
+COMPARISON_PATH = "../results/drug-comparison.csv"
+
+# Member of the decoded NCATS conditions holding the MeSH id of the
+# condition
+MESH_COLUMN = "ConditionMeshValue"
+
+# Number of genes whose results are read by a worker at a time
+CHUNK_SIZE = 250
+
+
+def read_any_results(path):
+    """Reads the results at the path, ending in ".json", in whichever
+    output format they were written, or returns None if there are
+    none.
+    """
+    output_format = find_results_format(path)
+    if output_format is None:
+        return None
+    return read_results(path, output_format)
+
+
+def normalize_disease_id(disease_id):
+    """Returns the disease id with the prefix separated by an
+    underscore, as Open Targets does, rather than a colon, as ChEMBL
+    does.
+    """
+    if disease_id is None:
+        return None
+    return disease_id.replace(":", "_")
+
+
+def read_gene_results(gene_symbol):
+    """Reads the rows needed for comparison from the ChEMBL, Open
+    Targets, and NCATS results of the gene symbol, as written by the
+    utilities, or the pipeline.
+    """
+    rows = {
+        "chembl_drugs": [],
+        "chembl_indications": [],
+        "ot_indications": [],
+        "drug_names": [],
+        "ncats_uniis": [],
+    }
+
+    # ChEMBL drug and drug indication results, from chembl.py, or the
+    # pipeline stages
+    chembl_results = read_any_results(f"{RESULTS_DIR}/{gene_symbol}-chembl.json") or {}
+    drug_results = chembl_results.get("drug")
+    if drug_results is None:
+        drug_results = read_any_results(f"{RESULTS_DIR}/{gene_symbol}-chembl-drug.json")
+    drug_indication_results = chembl_results.get("drug_indication")
+    if drug_indication_results is None:
+        drug_indication_results = read_any_results(
+            f"{RESULTS_DIR}/{gene_symbol}-chembl-drug_indication.json"
+        )
+    for d_r in drug_results or []:
+        rows["chembl_drugs"].append((gene_symbol, d_r["molecule_chembl_id"]))
+    for d_i_r in drug_indication_results or []:
+        rows["chembl_indications"].append(
+            (
+                gene_symbol,
+                d_i_r["molecule_chembl_id"],
+                normalize_disease_id(d_i_r.get("efo_id")),
+                d_i_r.get("mesh_id"),
+            )
+        )
+
+    # Open Targets drug records, from the pipeline
+    drug_records = read_any_results(
+        f"{RESULTS_DIR}/{gene_symbol}-open-targets-drugs.json"
+    )
+    for drug_id, drug_record in (drug_records or {}).items():
+        drug = (drug_record or {}).get("drug") or {}
+        rows["drug_names"].append((drug_id, (drug.get("name") or "").upper()))
+        for row in (drug.get("indications") or {}).get("rows") or []:
+            rows["ot_indications"].append((gene_symbol, drug_id, row["disease"]["id"]))
+
+    # UNIIs of drug names, from the pipeline
+    compound_uniis = read_any_results(f"{RESULTS_DIR}/{gene_symbol}-ncats.json")
+    for compound_name, compound_unii in (compound_uniis or {}).items():
+        if compound_unii is not None:
+            rows["ncats_uniis"].append((compound_name, compound_unii))
+
+    return rows
+
+
+def read_gene_chunk(gene_symbols):
+    """Reads the rows of each gene symbol in a chunk."""
+    chunk_rows = {}
+    for gene_symbol in gene_symbols:
+        for name, rows in read_gene_results(gene_symbol).items():
+            chunk_rows.setdefault(name, []).extend(rows)
+    return chunk_rows
+
+
+# Columns of the frame of each kind of row
+FRAME_COLUMNS = {
+    "chembl_drugs": ["gene_symbol", "chembl_id"],
+    "chembl_indications": ["gene_symbol", "chembl_id", "disease_id", "mesh_id"],
+    "ot_indications": ["gene_symbol", "chembl_id", "disease_id"],
+    "drug_names": ["chembl_id", "compound_name"],
+    "ncats_uniis": ["compound_name", "unii"],
+}
+
+
+def load_frames(gene_symbols, max_workers=None, chunk_size=CHUNK_SIZE):
+    """Reads the results of the gene symbols on a process pool, and
+    returns a frame of each kind of row.
+    """
+    chunks = [
+        gene_symbols[index : index + chunk_size]
+        for index in range(0, len(gene_symbols), chunk_size)
+    ]
+    all_rows = {name: [] for name in FRAME_COLUMNS}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_rows in executor.map(read_gene_chunk, chunks):
+            for name, rows in chunk_rows.items():
+                all_rows[name].extend(rows)
+    return {
+        name: pd.DataFrame(all_rows[name], columns=columns).drop_duplicates()
+        for name, columns in FRAME_COLUMNS.items()
+    }
+
+
+def load_known_drugs(tables_dir=TABLES_DIR):
+    """Returns a frame of the gene symbol, drug ChEMBL id, and disease
+    id of each Open Targets known drug, from the normalized target
+    tables, or an empty frame if they have not been normalized.
+    """
+    columns = ["gene_symbol", "chembl_id", "disease_id"]
+    if not (Path(tables_dir) / "known_drugs.arrow").exists():
+        return pd.DataFrame(columns=columns)
+    targets = load_table(Path(tables_dir) / "targets.arrow").to_pandas()
+    known_drugs = load_table(Path(tables_dir) / "known_drugs.arrow").to_pandas()
+    known_drugs = known_drugs.merge(
+        targets[["target_id", "approvedSymbol"]], on="target_id", how="inner"
+    )
+    known_drugs = known_drugs.rename(
+        columns={
+            "approvedSymbol": "gene_symbol",
+            "drugId": "chembl_id",
+            "diseaseId": "disease_id",
+        }
+    )
+    return known_drugs[columns].drop_duplicates()
+
+
+def load_conditions(conditions_path=CONDITIONS_PATH):
+    """Returns a frame of the UNII and MeSH id of each decoded NCATS
+    condition, or an empty frame if they have not been decoded.
+    """
+    columns = ["unii", "mesh_id"]
+    if not Path(conditions_path).exists():
+        return pd.DataFrame(columns=columns)
+    conditions = pd.read_parquet(conditions_path)
+    if MESH_COLUMN not in conditions.columns:
+        return pd.DataFrame(columns=columns)
+    conditions = conditions.rename(columns={MESH_COLUMN: "mesh_id"})
+    return conditions[columns].dropna().drop_duplicates()
+
+
+def count_overlap(left, right, keys, name, left_name, right_name):
+    """Counts, for each gene, the distinct keys in the left frame, in
+    the right frame, and in both, joining the frames on the gene symbol
+    and keys, and computes the Jaccard index, and the coverage of each
+    frame by the other.
+    """
+    on = ["gene_symbol"] + keys
+    joined = (
+        left[on]
+        .drop_duplicates()
+        .merge(right[on].drop_duplicates(), on=on, how="outer", indicator=True)
+    )
+    counts = (
+        joined.groupby(["gene_symbol", "_merge"], observed=False)
+        .size()
+        .unstack(fill_value=0)
+        .reindex(columns=["left_only", "right_only", "both"], fill_value=0)
+    )
+    metrics = pd.DataFrame(index=counts.index)
+    metrics[f"{name}_{left_name}"] = counts["left_only"] + counts["both"]
+    metrics[f"{name}_{right_name}"] = counts["right_only"] + counts["both"]
+    metrics[f"{name}_both"] = counts["both"]
+    union = counts["left_only"] + counts["right_only"] + counts["both"]
+    metrics[f"{name}_jaccard"] = counts["both"] / union.where(union > 0)
+    metrics[f"{name}_{left_name}_coverage"] = counts["both"] / metrics[
+        f"{name}_{right_name}"
+    ].where(metrics[f"{name}_{right_name}"] > 0)
+    metrics[f"{name}_{right_name}_coverage"] = counts["both"] / metrics[
+        f"{name}_{left_name}"
+    ].where(metrics[f"{name}_{left_name}"] > 0)
+    return metrics
+
+
+def compare_resources(gene_symbols, frames, known_drugs, conditions):
+    """Computes, for each gene, the overlap and coverage of the drugs,
+    and drug indications, of ChEMBL, Open Targets, and NCATS, joining on
+    ChEMBL id, UNII, and disease id.
+    """
+    known_drugs = known_drugs[known_drugs["gene_symbol"].isin(gene_symbols)]
+
+    # Drugs of the ChEMBL drug lookup, and the Open Targets known drugs
+    drugs = count_overlap(
+        frames["chembl_drugs"],
+        known_drugs,
+        ["chembl_id"],
+        "drugs",
+        "chembl",
+        "open_targets",
+    )
+
+    # Drug indications of the ChEMBL drug indication lookup, and the
+    # Open Targets known drugs and drug records, by EFO or MONDO id
+    open_targets_indications = pd.concat(
+        [known_drugs, frames["ot_indications"]], ignore_index=True
+    )
+    indications = count_overlap(
+        frames["chembl_indications"].dropna(subset=["disease_id"]),
+        open_targets_indications,
+        ["chembl_id", "disease_id"],
+        "indications",
+        "chembl",
+        "open_targets",
+    )
+
+    # Drug indications of the ChEMBL drug indication lookup, and the
+    # NCATS conditions of the UNII of each drug, by MeSH id
+    ncats_indications = (
+        open_targets_indications[["gene_symbol", "chembl_id"]]
+        .drop_duplicates()
+        .merge(frames["drug_names"], on="chembl_id")
+        .merge(frames["ncats_uniis"], on="compound_name")
+        .merge(conditions, on="unii")
+    )
+    conditions_metrics = count_overlap(
+        frames["chembl_indications"].dropna(subset=["mesh_id"]),
+        ncats_indications,
+        ["chembl_id", "mesh_id"],
+        "conditions",
+        "chembl",
+        "ncats",
+    )
+
+    # Genes without results have no drugs, and undefined ratios
+    comparison = pd.concat([drugs, indications, conditions_metrics], axis=1)
+    comparison = comparison.reindex(gene_symbols).rename_axis("gene_symbol")
+    for column in comparison.columns:
+        if not column.endswith(("jaccard", "coverage")):
+            comparison[column] = comparison[column].fillna(0).astype(int)
+    return comparison
+
+
+def find_gene_symbols():
+    """Returns the gene symbols of every ChEMBL or Open Targets results
+    file, in any output format.
+    """
+    gene_symbols = set()
+    for results_suffix in ["-chembl", "-chembl-drug", "-open-targets-drugs"]:
+        for suffix in OUTPUT_FORMATS.values():
+            for path in Path(RESULTS_DIR).glob(f"*{results_suffix}{suffix}"):
+                gene_symbols.add(path.name[: -len(results_suffix + suffix)])
+    return sorted(gene_symbols)
+
+
+def main():
+    """Compares the drugs and drug indications of ChEMBL, Open Targets,
+    and NCATS for each gene, and writes the overlap and coverage
+    metrics of every gene.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare ChEMBL, Open Targets, and NCATS drug coverage for each gene"
+    )
+    parser.add_argument(
+        "--gene-list",
+        help="file containing gene symbols, one per line, or - for standard input (default: every gene with results)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="maximum number of processes reading results (default: number of processors)",
+    )
+    args = parser.parse_args()
+
+    start_time = time.time()
+
+    if args.gene_list is not None:
+        gene_symbols = read_gene_symbols(args.gene_list)
+
+    else:
+        gene_symbols = find_gene_symbols()
+    print(
+        f"Comparing ChEMBL, Open Targets, and NCATS drugs for {len(gene_symbols)} genes"
+    )
+
+    frames = load_frames(gene_symbols, max_workers=args.max_workers)
+    comparison = compare_resources(
+        gene_symbols, frames, load_known_drugs(), load_conditions()
+    )
+
+    temp_path = Path(COMPARISON_PATH).with_suffix(".tmp")
+    comparison.to_csv(temp_path)
+    os.replace(temp_path, COMPARISON_PATH)
+
+    stop_time = time.time()
+    print(
+        f"Compared ChEMBL, Open Targets, and NCATS drugs for {len(gene_symbols)} genes in {stop_time - start_time} seconds"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+import sqlite3
+import sys
+import threading
+import time
+
+INDEX_PATH = "../data/gene-index.sqlite"
+
+# Optional HGNC complete set providing alias and previous symbols, see:
+# https://www.genenames.org/download/archive/
+HGNC_PATH = "../data/hgnc/hgnc_complete_set.txt"
+
+# Memory map up to 256 MB of the index
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Source of the gene map loader
+LOADER_PATH = Path(__file__).parent / "LoaderUtilities.py"
+
+# Suffixes of files opened by imports, rather than read as data
+CODE_SUFFIXES = {".py", ".pyc", ".so", ".pth"}
+
+# Paths of the data files read by each thread while it records inputs
+recording = threading.local()
+
+# Whether the audit hook recording opened files has been added, which
+# is done only when the index is first built, since audit hooks cannot
+# be removed
+recorder_lock = threading.Lock()
+recorder_added = False
+
+
+def record_open(event, args):
+    """Records the path of each data file opened for reading by a
+    thread while it records inputs.
+    """
+    if event != "open":
+        return
+    paths = getattr(recording, "paths", None)
+    if paths is None:
+        return
+    path, mode, flags = args
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return
+    if mode is not None and any(c in mode for c in "wax+"):
+        return
+    if mode is None and flags & (os.O_WRONLY | os.O_RDWR):
+        return
+    path = Path(os.fsdecode(path)).resolve()
+    if path.suffix in CODE_SUFFIXES or not path.is_file():
+        return
+    for prefix in {sys.prefix, sys.base_prefix}:
+        if path.is_relative_to(prefix):
+            return
+    paths.add(str(path))
+
+
+def call_recording_inputs(function):
+    """Calls the function, and returns its result, and the sorted
+    paths of the data files it read in the calling thread. The source
+    of the gene map loader lives in another repository, so its input
+    files cannot be listed here, and are recorded as they are opened,
+    by an audit hook added on the first call, which ignores threads
+    which are not recording.
+    """
+    global recorder_added
+    with recorder_lock:
+        if not recorder_added:
+            sys.addaudithook(record_open)
+            recorder_added = True
+    recording.paths = set()
+    try:
+        result = function()
+        return result, sorted(recording.paths)
+
+    finally:
+        recording.paths = None
+
+
+def get_source_fingerprint(input_paths):
+    """Returns a fingerprint of the sources from which the index is
+    built: the content of the gene map loader, and the size and
+    modification time of each input file read by the loader, and of the
+    HGNC complete set, if present.
+    """
+    fingerprint = hashlib.sha256()
+    if LOADER_PATH.exists():
+        fingerprint.update(LOADER_PATH.read_bytes())
+    for source_path in [Path(p) for p in input_paths] + [Path(HGNC_PATH)]:
+        if not source_path.exists():
+            fingerprint.update(f"{source_path}:missing".encode("utf-8"))
+        else:
+            stat = source_path.stat()
+            fingerprint.update(
+                f"{source_path}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")
+            )
+    return fingerprint.hexdigest()
+
+
+def read_hgnc_aliases(hgnc_path):
+    """Reads alias and previous symbols for each approved symbol from
+    the HGNC complete set.
+    """
+    aliases = {}
+    with open(hgnc_path, "r", newline="") as fp:
+        for row in csv.DictReader(fp, delimiter="\t"):
+            for column in ["alias_symbol", "prev_symbol"]:
+                for alias in (row.get(column) or "").strip('"').split("|"):
+                    if alias != "":
+                        aliases.setdefault(alias.upper(), row["symbol"].upper())
+    return aliases
+
+
+def build_gene_index(index_path=INDEX_PATH):
+    """Builds the gene index from the gene name to ids map, and any
+    HGNC aliases, writing it to a temporary file, then renaming it so
+    that readers never see a partial index.
+    """
+    from LoaderUtilities import get_gene_name_to_ids_map, map_gene_name_to_ids
+
+    start_time = time.time()
+    print(f"Building gene index {index_path}")
+
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = index_path.with_suffix(".tmp")
+    temp_path.unlink(missing_ok=True)
+
+    connection = sqlite3.connect(temp_path)
+    connection.executescript("""
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE symbols (symbol TEXT PRIMARY KEY, ids TEXT) WITHOUT ROWID;
+        CREATE TABLE aliases (alias TEXT PRIMARY KEY, symbol TEXT) WITHOUT ROWID;
+        CREATE TABLE ensembl (id TEXT PRIMARY KEY, symbol TEXT) WITHOUT ROWID;
+        """)
+
+    gnm2ids, input_paths = call_recording_inputs(get_gene_name_to_ids_map)
+    symbol_rows = []
+    ensembl_rows = {}
+    for gene_symbol in gnm2ids:
+        gene_ids = map_gene_name_to_ids(gene_symbol, gnm2ids)
+        symbol_rows.append((gene_symbol.upper(), json.dumps(gene_ids)))
+        for gene_id in [gene_ids] if isinstance(gene_ids, str) else gene_ids:
+            ensembl_rows.setdefault(gene_id, gene_symbol.upper())
+    connection.executemany("INSERT OR REPLACE INTO symbols VALUES (?, ?)", symbol_rows)
+    connection.executemany(
+        "INSERT OR REPLACE INTO ensembl VALUES (?, ?)", ensembl_rows.items()
+    )
+
+    if Path(HGNC_PATH).exists():
+        connection.executemany(
+            "INSERT OR REPLACE INTO aliases VALUES (?, ?)",
+            read_hgnc_aliases(HGNC_PATH).items(),
+        )
+
+    connection.executemany(
+        "INSERT INTO meta VALUES (?, ?)",
+        [
+            ("inputs", json.dumps(input_paths)),
+            ("fingerprint", get_source_fingerprint(input_paths)),
+        ],
+    )
+    connection.commit()
+    connection.close()
+    os.replace(temp_path, index_path)
+
+    stop_time = time.time()
+    print(
+        f"Built gene index of {len(symbol_rows)} symbols in {stop_time - start_time} seconds"
+    )
+
+
+def open_gene_index(index_path=INDEX_PATH, rebuild=False):
+    """Opens the gene index read only, building it first if it does not
+    exist, if the loader, or any file it read, or the HGNC complete set
+    has changed since it was built, or if rebuild is requested.
+    """
+    index_path = Path(index_path)
+    if index_path.exists() and not rebuild:
+        connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+        if "inputs" in meta and meta.get("fingerprint") == get_source_fingerprint(
+            json.loads(meta["inputs"])
+        ):
+            connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            return connection
+        connection.close()
+
+    build_gene_index(index_path)
+    return open_gene_index(index_path)
+
+
+def map_gene_symbol_to_ids(gene_symbol, gene_index):
+    """Maps a gene symbol, or alias, to its Ensembl ids, as returned by
+    map_gene_name_to_ids. Raises a KeyError if the symbol is not found.
+    """
+    gene_symbol = gene_symbol.upper()
+    row = gene_index.execute(
+        "SELECT ids FROM symbols WHERE symbol = ?", (gene_symbol,)
+    ).fetchone()
+    if row is None:
+        row = gene_index.execute(
+            "SELECT symbols.ids FROM aliases JOIN symbols USING (symbol)"
+            " WHERE aliases.alias = ?",
+            (gene_symbol,),
+        ).fetchone()
+    if row is None:
+        raise KeyError(gene_symbol)
+    return json.loads(row[0])
+
+
+def map_gene_id_to_symbol(gene_id, gene_index):
+    """Maps an Ensembl id to its gene symbol. Raises a KeyError if the
+    id is not found.
+    """
+    row = gene_index.execute(
+        "SELECT symbol FROM ensembl WHERE id = ?", (gene_id,)
+    ).fetchone()
+    if row is None:
+        raise KeyError(gene_id)
+    return row[0]
+
+
+def main():
+    """Builds, or rebuilds, the gene index shared by the command line
+    utilities, and optionally looks up gene symbols.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build the gene symbol to Ensembl id index"
+    )
+    parser.add_argument(
+        "gene_symbols",
+        nargs="*",
+        help="gene symbols, or aliases, to look up in the index",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force rebuild of the existing index",
+    )
+    args = parser.parse_args()
+
+    gene_index = open_gene_index(rebuild=args.force)
+    for gene_symbol in args.gene_symbols:
+        try:
+            print(f"{gene_symbol}: {map_gene_symbol_to_ids(gene_symbol, gene_index)}")
+
+        except KeyError:
+            print(f"{gene_symbol}: not found")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,25 @@
 #!/usr/bin/env python
 
 import argparse
-import json
-from pathlib import Path
 import time
 
 import gget
 
-from LoaderUtilities import get_gene_name_to_ids_map, map_gene_name_to_ids
+from gene_index import map_gene_symbol_to_ids, open_gene_index
+from http_transport import add_transport_arguments, install_transport
+from metrics import add_metrics_argument, install_request_metrics, metrics
+from output_formats import add_output_format_argument, get_results_path, write_results
 
 
-def main():
-    """Provides an example use of the gget opentargets command to
-    obtain the diseases and drugs resources for a given gene id.
+def fetch_gget(gene_symbol, gene_id, force, output_format="json"):
+    """Fetches the gget opentargets diseases and drugs resources for the
+    given gene symbol and Ensembl id, and writes the results in the
+    output format, unless they exist already.
     """
-    parser = argparse.ArgumentParser(
-        description="Demonstrate use of the gget opentargets command"
-    )
-    parser.add_argument(
-        "--gene-symbol",
-        default="ADRB2",
-        help="gene symbol for which to obtain gget data (default: ADRB2)",
-    )
-    parser.add_argument(
-        "-f",
-        "--force",
-        action="store_true",
-        help="force update of existing files",
+    results_path = get_results_path(
+        f"../results/{gene_symbol}-gget.json", output_format
     )
-    args = parser.parse_args()
-
-    gene_symbol = args.gene_symbol.upper()
-    if gene_symbol == "ADRB2":
-        gene_id = "ENSG00000169252"
-
-    else:
-        gnm2ids = get_gene_name_to_ids_map()
-        gene_id = map_gene_name_to_ids(gene_symbol, gnm2ids)[0]
-
-    results_path = Path(f"../results/{gene_symbol}-gget.json")
-    if not results_path.exists() or args.force:
+    if not results_path.exists() or force:
 
         start_time = time.time()
         print(f"Getting gget data for {gene_symbol}")
@@ -51,22 +31,74 @@ def main():
 
         # == diseases
 
+        resource_start_time = time.time()
         results["target"]["diseases"] = gget.opentargets(
             gene_id, resource="diseases", json=True
         )
+        metrics.record_stage(
+            "gget-diseases",
+            time.time() - resource_start_time,
+            len(results["target"]["diseases"]),
+        )
 
         # == drugs
 
+        resource_start_time = time.time()
         results["target"]["drugs"] = gget.opentargets(
             gene_id, resource="drugs", json=True
         )
+        metrics.record_stage(
+            "gget-drugs",
+            time.time() - resource_start_time,
+            len(results["target"]["drugs"]),
+        )
 
-        with open(results_path, "w") as fp:
-            json.dump(results, fp, indent=4)
+        write_results(results, results_path, output_format)
 
         stop_time = time.time()
+        metrics.record_stage("gget", stop_time - start_time)
         print(f"Got gget data for {gene_symbol} in {stop_time - start_time} seconds")
 
+    return results_path
+
+
+def main():
+    """Provides an example use of the gget opentargets command to
+    obtain the diseases and drugs resources for a given gene id.
+    """
+    parser = argparse.ArgumentParser(
+        description="Demonstrate use of the gget opentargets command"
+    )
+    parser.add_argument(
+        "--gene-symbol",
+        default="ADRB2",
+        help="gene symbol for which to obtain gget data (default: ADRB2)",
+    )
+    add_output_format_argument(parser)
+    add_metrics_argument(parser)
+    add_transport_arguments(parser)
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force update of existing files",
+    )
+    args = parser.parse_args()
+
+    install_transport(args.http_mode, args.cassette)
+    install_request_metrics()
+
+    gene_symbol = args.gene_symbol.upper()
+    if gene_symbol == "ADRB2":
+        gene_id = "ENSG00000169252"
+
+    else:
+        gene_index = open_gene_index()
+        gene_id = map_gene_symbol_to_ids(gene_symbol, gene_index)[0]
+
+    fetch_gget(gene_symbol, gene_id, args.force, args.output_format)
+    metrics.write("gget", args.metrics_dir)
+
 
 if __name__ == "__main__":
     main()
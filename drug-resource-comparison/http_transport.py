@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from response_cache import hash_key
+
+CASSETTE_PATH = "../data/http-cassette.sqlite"
+
+# Modes of the transport: send every request upstream, send every
+# request upstream and record the response, or serve every request from
+# recorded responses, without network access
+TRANSPORT_MODES = ["passthrough", "record", "replay"]
+
+# Responses with these statuses are transient, so are not recorded
+TRANSIENT_STATUSES = [429, 500, 502, 503, 504]
+
+# Send method of the requests transport before it was patched
+adapter_send = HTTPAdapter.send
+
+# Functions each wrapping a send method of the requests transport, such
+# as to redirect or time requests, beneath any cassette, innermost
+# first
+send_wrappers = []
+
+# Mode of the installed transport, and its cassette, if any
+transport_mode = "passthrough"
+cassette = None
+
+
+def add_transport_arguments(parser):
+    """Adds the HTTP transport options shared by all utilities."""
+    parser.add_argument(
+        "--http-mode",
+        choices=TRANSPORT_MODES,
+        default="passthrough",
+        help="send requests upstream, send them and record the responses, or replay recorded responses offline (default: passthrough)",
+    )
+    parser.add_argument(
+        "--cassette",
+        default=CASSETTE_PATH,
+        help=f"file of recorded requests and responses (default: {CASSETTE_PATH})",
+    )
+
+
+def create_session(max_workers=1):
+    """Creates a requests session with a keep-alive connection pool
+    large enough for the given number of concurrent workers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def normalize_url(url):
+    """Returns the URL with the scheme and host lower cased, the query
+    parameters sorted, and no fragment.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path, query, "")
+    )
+
+
+def normalize_body(body):
+    """Returns the request body as text, with JSON bodies serialized
+    with sorted keys, and the whitespace of any GraphQL query
+    collapsed.
+    """
+    if body is None:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        value = json.loads(body)
+
+    except ValueError:
+        return body
+
+    if isinstance(value, dict) and isinstance(value.get("query"), str):
+        value["query"] = " ".join(value["query"].split())
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def get_request_key(method, url, body):
+    """Returns the key of a request: a hash of its method, normalized
+    URL, and normalized body.
+    """
+    return hash_key(method.upper(), normalize_url(url), normalize_body(body))
+
+
+class Cassette:
+    """SQLite store of recorded responses, indexed by the key of each
+    request, shared by all threads.
+    """
+
+    def __init__(self, cassette_path=CASSETTE_PATH):
+        Path(cassette_path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(cassette_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS interactions (
+              key TEXT PRIMARY KEY,
+              method TEXT NOT NULL,
+              url TEXT NOT NULL,
+              status INTEGER NOT NULL,
+              content_type TEXT,
+              body BLOB NOT NULL,
+              recorded_at REAL NOT NULL
+            )
+            """)
+        self.connection.commit()
+
+    def get(self, key):
+        """Returns the status, content type, and body of the recorded
+        response, or None if not recorded.
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT status, content_type, body FROM interactions WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def put(self, key, method, url, status, content_type, body):
+        """Records a response, replacing any recorded for the key."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, method, url, status, content_type, body, time.time()),
+            )
+            self.connection.commit()
+
+    def count(self):
+        """Returns the number of recorded responses."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM interactions"
+            ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def build_response(request, status, content_type, body):
+    """Returns a response to the request with the recorded status,
+    content type, and body.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(
+        {"Content-Type": content_type or "application/octet-stream"}
+    )
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = bytes(body)
+    response.url = request.url
+    response.request = request
+    response.reason = "Replayed"
+    return response
+
+
+def add_send_wrapper(wrapper):
+    """Adds a function which, given a send method of the requests
+    transport, returns a send method wrapping it, and reinstalls the
+    transport, so that the wrapper is applied beneath any cassette,
+    whenever it is added.
+    """
+    send_wrappers.append(wrapper)
+    install_send()
+
+
+def get_cassette_send(upstream_send):
+    """Returns a send method which responds from the cassette, or, when
+    not replaying, calls the upstream send method, and records the
+    response.
+    """
+
+    def cassette_send(self, request, *args, **kwargs):
+        key = get_request_key(request.method, request.url, request.body)
+        recorded = cassette.get(key)
+        if recorded is not None:
+            return build_response(request, *recorded)
+        if transport_mode == "replay":
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {request.method} {request.url}",
+                request=request,
+            )
+        response = upstream_send(self, request, *args, **kwargs)
+        if response.status_code not in TRANSIENT_STATUSES:
+            cassette.put(
+                key,
+                request.method,
+                request.url,
+                response.status_code,
+                response.headers.get("Content-Type"),
+                response.content,
+            )
+        return response
+
+    return cassette_send
+
+
+def install_send():
+    """Patches the send method of the requests transport, for every
+    session, including those of client libraries: the cassette, if
+    any, calls the send wrappers, which call the original send method.
+    """
+    upstream_send = adapter_send
+    for wrapper in send_wrappers:
+        upstream_send = wrapper(upstream_send)
+    if cassette is None:
+        HTTPAdapter.send = upstream_send
+
+    else:
+        HTTPAdapter.send = get_cassette_send(upstream_send)
+
+
+def install_transport(mode, cassette_path=CASSETTE_PATH):
+    """Installs the transport in the mode, and returns the cassette, or
+    None when passing requests through. A request without a recorded
+    response raises a connection error when replaying.
+    """
+    global transport_mode, cassette
+    if cassette is not None:
+        cassette.close()
+    transport_mode = mode
+    cassette = None if mode == "passthrough" else Cassette(cassette_path)
+    install_send()
+    return cassette
+
+
+def main():
+    """Reports the number of responses recorded in the cassette."""
+    parser = argparse.ArgumentParser(
+        description="Report the responses recorded by the HTTP transport"
+    )
+    parser.add_argument(
+        "--cassette",
+        default=CASSETTE_PATH,
+        help=f"file of recorded requests and responses (default: {CASSETTE_PATH})",
+    )
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette)
+    print(f"Cassette {args.cassette} holds {cassette.count()} recorded responses")
+    cassette.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+
+INDENT = 4
+
+
+def dumps_indented(value, level):
+    """Serializes the value as json.dump does with an indent of four,
+    for a value nested at the given level.
+    """
+    return json.dumps(value, indent=INDENT).replace("\n", "\n" + " " * INDENT * level)
+
+
+class JsonObjectWriter:
+    """Writes a JSON object one member at a time, and the items of an
+    array member one at a time, producing the same text as json.dump
+    with an indent of four, without holding the object in memory.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.members = 0
+        self.fp.write("{")
+
+    def write_key(self, key):
+        """Writes the separator, indentation, and key of a member."""
+        separator = "," if self.members > 0 else ""
+        self.fp.write(f"{separator}\n{' ' * INDENT}{json.dumps(key)}: ")
+        self.members += 1
+
+    def write_member(self, key, value):
+        """Writes a member with the given key and value."""
+        self.write_key(key)
+        self.fp.write(dumps_indented(value, 1))
+
+    def write_array(self, key, items):
+        """Writes an array member with the given key, iterating over and
+        writing its items as they are produced. Returns the number of
+        items written.
+        """
+        self.write_key(key)
+        self.fp.write("[")
+        count = 0
+        for item in items:
+            separator = "," if count > 0 else ""
+            self.fp.write(f"{separator}\n{' ' * INDENT * 2}{dumps_indented(item, 2)}")
+            count += 1
+        if count > 0:
+            self.fp.write(f"\n{' ' * INDENT}")
+        self.fp.write("]")
+        return count
+
+    def close(self):
+        """Writes the end of the object."""
+        if self.members > 0:
+            self.fp.write("\n")
+        self.fp.write("}")
+
+
+class JsonObjectCollector:
+    """Collects the members of a JSON object in a dictionary, with the
+    same interface as JsonObjectWriter, for results written in another
+    format once complete.
+    """
+
+    def __init__(self):
+        self.value = {}
+
+    def write_member(self, key, value):
+        """Collects a member with the given key and value."""
+        self.value[key] = value
+
+    def write_array(self, key, items):
+        """Collects an array member with the given key, and returns the
+        number of items.
+        """
+        self.value[key] = list(items)
+        return len(self.value[key])
+
+    def close(self):
+        """Completes the object."""
@@ -0,0 +1,301 @@
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from urllib.parse import urlsplit
+
+import http_transport
+from http_transport import add_send_wrapper
+
+METRICS_DIR = "../results/metrics"
+
+# Prefix of the name of each Prometheus metric
+PREFIX = "drug_comparison"
+
+# Name of the upstream API of each host, under which its requests are
+# recorded, while requests to any other host are recorded under the host
+UPSTREAM_HOSTS = {
+    "www.ebi.ac.uk": "chembl",
+    "drugs.ncats.io": "ncats",
+    "api.platform.opentargets.org": "opentargets",
+}
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+def add_metrics_argument(parser):
+    """Adds the metrics directory option shared by all utilities."""
+    parser.add_argument(
+        "--metrics-dir",
+        default=METRICS_DIR,
+        help=f"directory to which the JSON summary, and Prometheus textfile, of metrics are written (default: {METRICS_DIR})",
+    )
+
+
+class Metrics:
+    """Collects request, cache, stage, and serialization metrics from
+    any thread, and writes them as a JSON summary and a Prometheus
+    textfile.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.stages = {}
+        self.serialization = {}
+
+    def get_upstream(self, upstream):
+        """Returns the request metrics of the upstream, adding them if
+        absent. Call with the lock held.
+        """
+        if upstream not in self.requests:
+            self.requests[upstream] = {
+                "count": 0,
+                "bytes": 0,
+                "retries": 0,
+                "cache_hits": 0,
+                "cache_misses": 0,
+                "statuses": {},
+                "latency_buckets": [0] * len(LATENCY_BUCKETS),
+                "latency_sum": 0.0,
+            }
+        return self.requests[upstream]
+
+    def record_request(self, upstream, seconds, response_bytes, status):
+        """Records the latency, response size, and status of a request
+        to the upstream.
+        """
+        with self.lock:
+            metrics = self.get_upstream(upstream)
+            metrics["count"] += 1
+            metrics["bytes"] += response_bytes
+            status = str(status)
+            metrics["statuses"][status] = metrics["statuses"].get(status, 0) + 1
+            metrics["latency_sum"] += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics["latency_buckets"][index] += 1
+
+    def record_retry(self, upstream):
+        """Records a retried request to the upstream."""
+        with self.lock:
+            self.get_upstream(upstream)["retries"] += 1
+
+    def record_cache(self, upstream, hit):
+        """Records a response cache hit, or miss, for the upstream."""
+        with self.lock:
+            metrics = self.get_upstream(upstream)
+            metrics["cache_hits" if hit else "cache_misses"] += 1
+
+    def record_stage(self, stage, seconds, rows=0):
+        """Records a run of the stage, its duration, and the number of
+        rows it produced.
+        """
+        with self.lock:
+            metrics = self.stages.setdefault(
+                stage, {"runs": 0, "seconds": 0.0, "rows": 0}
+            )
+            metrics["runs"] += 1
+            metrics["seconds"] += seconds
+            metrics["rows"] += rows
+
+    def record_serialization(self, output_format, seconds, written_bytes):
+        """Records the duration, and number of bytes written, of
+        serializing results in the output format.
+        """
+        with self.lock:
+            metrics = self.serialization.setdefault(
+                output_format, {"count": 0, "seconds": 0.0, "bytes": 0}
+            )
+            metrics["count"] += 1
+            metrics["seconds"] += seconds
+            metrics["bytes"] += written_bytes
+
+    def get_summary(self):
+        """Returns a copy of the metrics."""
+        with self.lock:
+            return json.loads(
+                json.dumps(
+                    {
+                        "latency_buckets": LATENCY_BUCKETS,
+                        "requests": self.requests,
+                        "stages": self.stages,
+                        "serialization": self.serialization,
+                    }
+                )
+            )
+
+    def get_prometheus_lines(self, name):
+        """Returns the metrics in the Prometheus text exposition format,
+        labelled with the utility name.
+        """
+        summary = self.get_summary()
+        lines = []
+
+        def add(metric, metric_type, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{metric} {metric_type}")
+            for suffix, labels, value in samples:
+                labels = {"cli": name, **labels}
+                label_text = ",".join(
+                    f'{key}="{value}"' for key, value in labels.items()
+                )
+                lines.append(f"{PREFIX}_{metric}{suffix}{{{label_text}}} {value}")
+
+        requests = summary["requests"]
+        samples = []
+        for upstream, metrics in requests.items():
+            for bound, count in zip(LATENCY_BUCKETS, metrics["latency_buckets"]):
+                samples.append(
+                    ("_bucket", {"upstream": upstream, "le": str(bound)}, count)
+                )
+            samples.append(
+                ("_bucket", {"upstream": upstream, "le": "+Inf"}, metrics["count"])
+            )
+            samples.append(("_sum", {"upstream": upstream}, metrics["latency_sum"]))
+            samples.append(("_count", {"upstream": upstream}, metrics["count"]))
+        add(
+            "request_duration_seconds",
+            "histogram",
+            "Latency of requests to each upstream API.",
+            samples,
+        )
+        add(
+            "requests_total",
+            "counter",
+            "Requests to each upstream API, by response status.",
+            [
+                ("", {"upstream": upstream, "status": status}, count)
+                for upstream, metrics in requests.items()
+                for status, count in metrics["statuses"].items()
+            ],
+        )
+        for metric, key, help_text in [
+            (
+                "response_bytes_total",
+                "bytes",
+                "Bytes of responses from each upstream API.",
+            ),
+            (
+                "request_retries_total",
+                "retries",
+                "Retried requests to each upstream API.",
+            ),
+            (
+                "cache_hits_total",
+                "cache_hits",
+                "Response cache hits for each upstream API.",
+            ),
+            (
+                "cache_misses_total",
+                "cache_misses",
+                "Response cache misses for each upstream API.",
+            ),
+        ]:
+            add(
+                metric,
+                "counter",
+                help_text,
+                [
+                    ("", {"upstream": upstream}, metrics[key])
+                    for upstream, metrics in requests.items()
+                ],
+            )
+        for metric, key, help_text in [
+            ("stage_runs_total", "runs", "Runs of each stage."),
+            ("stage_seconds_total", "seconds", "Seconds spent in each stage."),
+            ("stage_rows_total", "rows", "Rows produced by each stage."),
+        ]:
+            add(
+                metric,
+                "counter",
+                help_text,
+                [
+                    ("", {"stage": stage}, metrics[key])
+                    for stage, metrics in summary["stages"].items()
+                ],
+            )
+        for metric, key, help_text in [
+            (
+                "serialization_seconds_total",
+                "seconds",
+                "Seconds spent serializing results in each output format.",
+            ),
+            (
+                "serialized_bytes_total",
+                "bytes",
+                "Bytes of results serialized in each output format.",
+            ),
+        ]:
+            add(
+                metric,
+                "counter",
+                help_text,
+                [
+                    ("", {"format": output_format}, metrics[key])
+                    for output_format, metrics in summary["serialization"].items()
+                ],
+            )
+        return lines
+
+    def write(self, name, metrics_dir=METRICS_DIR):
+        """Writes the metrics atomically as a JSON summary, and as a
+        Prometheus textfile, named by the utility name.
+        """
+        metrics_dir = Path(metrics_dir)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+
+        temp_path = metrics_dir / f"{name}.json.tmp"
+        with open(temp_path, "w") as fp:
+            json.dump(self.get_summary(), fp, indent=4)
+        os.replace(temp_path, metrics_dir / f"{name}.json")
+
+        temp_path = metrics_dir / f"{name}.prom.tmp"
+        with open(temp_path, "w") as fp:
+            fp.write("\n".join(self.get_prometheus_lines(name)) + "\n")
+        os.replace(temp_path, metrics_dir / f"{name}.prom")
+
+
+# Metrics shared by all modules of a utility
+metrics = Metrics()
+
+
+def get_upstream(url):
+    """Returns the name of the upstream API of the URL."""
+    host = urlsplit(url).netloc.lower()
+    return UPSTREAM_HOSTS.get(host, host)
+
+
+def record_requests(send):
+    """Returns a send method of the requests transport which calls the
+    given send method, and records the latency, response size, and
+    status of each request to the upstream API of its URL. The size of
+    a streamed response is taken from its Content-Length header, so
+    that its content is not read here.
+    """
+
+    def recording_send(self, request, *args, **kwargs):
+        upstream = get_upstream(request.url)
+        start_time = time.time()
+        response = send(self, request, *args, **kwargs)
+        if kwargs.get("stream"):
+            response_bytes = int(response.headers.get("Content-Length", 0))
+        else:
+            response_bytes = len(response.content)
+        metrics.record_request(
+            upstream, time.time() - start_time, response_bytes, response.status_code
+        )
+        return response
+
+    return recording_send
+
+
+def install_request_metrics():
+    """Records the metrics of every request sent upstream by any
+    session, including those of client libraries, by wrapping the send
+    method of the requests transport, at most once.
+    """
+    if record_requests not in http_transport.send_wrappers:
+        add_send_wrapper(record_requests)
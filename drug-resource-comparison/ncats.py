@@ -1,20 +1,138 @@
 #!/usr/bin/env python
 
 import argparse
-import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 from pathlib import Path
-import shutil
+import sys
 import time
 
-import pandas as pd
-import requests
+from adaptive_concurrency import (
+    MAX_LIMIT,
+    REQUEST_TIMEOUT,
+    get_limiter,
+    get_pool_size,
+    send_with_retries,
+)
+from http_transport import add_transport_arguments, create_session, install_transport
+from metrics import add_metrics_argument, install_request_metrics, metrics
+from ncats_index import load_compound_index, lookup_compound, lookup_compounds
+from output_formats import add_output_format_argument, get_results_path, write_results
+from results_store import store_bytes
+from run_manifest import RunManifest
+from stitcher_archive import open_stitcher_archive
+from stitcher_conditions import decode_conditions
+
+# Name of the upstream API under which requests are recorded
+UPSTREAM = "ncats"
+
+MANIFEST_PATH = "../results/ncats-manifest.ndjson"
+
+GSRS_URL = "https://drugs.ncats.io/api/v1/substances({compound_unii})?view=full"
+STITCHER_URL = (
+    "https://drugs.ncats.io/api/v1/substances({compound_unii})/@additional?view=full"
+)
+
+
+def fetch_substance(url, results_path, session):
+    """Gets the URL within the limit of requests in flight, retrying
+    throttled requests, and stores the response bytes, as received, at
+    the results path.
+    """
+
+    def send():
+        return session.get(url, timeout=REQUEST_TIMEOUT)
+
+    response = send_with_retries(send, UPSTREAM)
+    response.raise_for_status()
+    store_bytes(response.content, results_path)
+
+
+def read_compound_names(compound_list):
+    """Reads compound names, one per line, from the given file, or from
+    standard input if the file is "-". Blank lines and lines beginning
+    with "#" are ignored, and duplicate names are dropped.
+    """
+    if compound_list == "-":
+        lines = sys.stdin.readlines()
+
+    else:
+        with open(compound_list, "r") as fp:
+            lines = fp.readlines()
+
+    compound_names = []
+    for line in lines:
+        compound_name = line.strip().upper()
+        if compound_name == "" or compound_name.startswith("#"):
+            continue
+        if compound_name not in compound_names:
+            compound_names.append(compound_name)
+
+    return compound_names
+
+
+def fetch_substances(compound_uniis, force, manifest=None):
+    """Fetches NCATS GSRS and Stitcher data for each compound name and
+    UNII concurrently, within the adaptive limit of requests in flight,
+    over a keep-alive connection pool. If a run manifest is given, only
+    requests which it does not record as done are made, and the status
+    of each request is recorded. Returns the names of compounds for
+    which a request failed.
+    """
+    start_time = time.time()
+    print(f"Getting NCATS GSRS and Stitcher data for {len(compound_uniis)} compounds")
+
+    failed_names = set()
+    fetched = 0
+    session = create_session(get_pool_size(UPSTREAM))
+    with ThreadPoolExecutor(max_workers=get_pool_size(UPSTREAM)) as executor:
+        futures = {}
+        for compound_name, compound_unii in compound_uniis.items():
+            for source, url in [("gsrs", GSRS_URL), ("stitcher", STITCHER_URL)]:
+                results_path = Path(f"../results/{compound_name}-ncats-{source}.json")
+                if manifest is not None:
+                    if not force and not manifest.needs_run(
+                        compound_name, source, results_path
+                    ):
+                        continue
+                    manifest.mark_pending(compound_name, source)
+
+                elif results_path.exists() and not force:
+                    continue
+                future = executor.submit(
+                    fetch_substance,
+                    url.format(compound_unii=compound_unii),
+                    results_path,
+                    session,
+                )
+                futures[future] = (compound_name, source, results_path)
+        for future in as_completed(futures):
+            compound_name, source, results_path = futures[future]
+            try:
+                future.result()
+                fetched += 1
+                if manifest is not None:
+                    manifest.mark_done(compound_name, source, results_path)
+
+            except Exception as exc:
+                print(f"Could not get NCATS data for {compound_name}: {exc}")
+                failed_names.add(compound_name)
+                if manifest is not None:
+                    manifest.mark_failed(compound_name, source, exc)
+
+    stop_time = time.time()
+    metrics.record_stage("ncats-substances", stop_time - start_time, fetched)
+    print(
+        f"Got NCATS GSRS and Stitcher data for {len(compound_uniis) - len(failed_names)} compounds in {stop_time - start_time} seconds"
+    )
+
+    return sorted(failed_names)
 
 
 def main():
     """Provides an example use of the NCATS API to obtain GSRS and
-    Stitcher data given a compound id. Also copies the data downloaded
-    from Figshare, and base64 decodes the conditions field.
+    Stitcher data given a compound id. Also links the data downloaded
+    from Figshare, and base64 decodes each entry of the conditions field.
     """
     parser = argparse.ArgumentParser(
         description="Demonstrate use of the NCATS Inxight API"
@@ -24,6 +142,24 @@ def main():
         default="ALBUTEROL",
         help="compoundname for which to obtain NCATS Inxight data (default: ALBUTEROL)",
     )
+    parser.add_argument(
+        "--compound-list",
+        help="file listing compound names, one per line, or - for standard input, for which to obtain NCATS GSRS and Stitcher data concurrently",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_LIMIT,
+        help=f"maximum to which the adaptive limit of concurrent requests rises when using --compound-list (default: {MAX_LIMIT})",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=MANIFEST_PATH,
+        help=f"run manifest recording the status of each compound and request of a compound list, so that a rerun resumes where it stopped, reset by --force (default: {MANIFEST_PATH})",
+    )
+    add_output_format_argument(parser)
+    add_metrics_argument(parser)
+    add_transport_arguments(parser)
     parser.add_argument(
         "-f",
         "--force",
@@ -32,21 +168,44 @@ def main():
     )
     args = parser.parse_args()
 
+    install_transport(args.http_mode, args.cassette)
+    install_request_metrics()
+    get_limiter(UPSTREAM).set_max_limit(args.max_workers)
+
+    if args.compound_list is not None:
+        compound_names = read_compound_names(args.compound_list)
+        compound_uniis = {}
+        for compound_name, compound_unii in lookup_compounds(
+            compound_names, load_compound_index()
+        ).items():
+            if compound_unii is None:
+                print(f"Found no matching compounds for {compound_name}")
+                continue
+            compound_uniis[compound_name] = compound_unii
+        manifest = RunManifest(args.manifest, reset=args.force)
+        fetch_substances(compound_uniis, args.force, manifest=manifest)
+        manifest.report()
+        manifest.close()
+        metrics.write("ncats", args.metrics_dir)
+        return
+
     compound_name = args.compound_name.upper()
     if compound_name == "ALBUTEROL":
         compound_unii = "QF8SVZ843E"
 
     else:
-        drugs = pd.read_csv("../data/frdb/frdb-drugs.tsv")
-        selected_drugs = drugs[drugs["compound_name"].str.contains(f"^{compound_name}")]
-        if selected_drugs.shape[0] == 0:
-            print(f"Found {selected_drugs.shape[0]} matching compounds")
+        compound_index = load_compound_index()
+        selected_drugs = lookup_compound(compound_name, compound_index)
+        if len(selected_drugs) == 0:
+            print(f"Found {len(selected_drugs)} matching compounds")
             return
-        elif selected_drugs.shape[0] > 1:
+        elif len(selected_drugs) > 1:
             print(
-                f"Found {selected_drugs.shape[0]} matching compounds, using first:{selected_drugs.iloc[0]}"
+                f"Found {len(selected_drugs)} matching compounds, using first: {selected_drugs[0]}"
             )
-        compound_unii = selected_drugs.iloc[0, 2]
+        compound_unii = selected_drugs[0][1]
+
+    session = create_session()
 
     gsrs_path = Path(f"../results/{compound_name}-ncats-gsrs.json")
     if not gsrs_path.exists() or args.force:
@@ -54,15 +213,12 @@ def main():
         start_time = time.time()
         print(f"Getting NCATS GSRS data for {compound_name}")
 
-        gsrs_url = (
-            f"https://drugs.ncats.io/api/v1/substances({compound_unii})?view=full"
+        fetch_substance(
+            GSRS_URL.format(compound_unii=compound_unii), gsrs_path, session
         )
-        gsrs_response = requests.get(gsrs_url)
-
-        with open(gsrs_path, "w") as fp:
-            json.dump(json.loads(gsrs_response.text), fp, indent=4)
 
         stop_time = time.time()
+        metrics.record_stage("ncats-gsrs", stop_time - start_time, 1)
         print(
             f"Got NCATS GSRS data for {compound_name} in {stop_time - start_time} seconds"
         )
@@ -73,42 +229,53 @@ def main():
         start_time = time.time()
         print(f"Getting NCATS Stitcher data for {compound_name}")
 
-        stitcher_url = f"https://drugs.ncats.io/api/v1/substances({compound_unii})/@additional?view=full"
-        stitcher_response = requests.get(stitcher_url)
-
-        with open(stitcher_path, "w") as fp:
-            json.dump(json.loads(stitcher_response.text), fp, indent=4)
+        fetch_substance(
+            STITCHER_URL.format(compound_unii=compound_unii), stitcher_path, session
+        )
 
         stop_time = time.time()
+        metrics.record_stage("ncats-stitcher", stop_time - start_time, 1)
         print(
             f"Got NCATS Stitcher data for {compound_name} in {stop_time - start_time} seconds"
         )
 
-    figshare_path = Path(f"../data/stitcher_json_files/{compound_unii}.json")
-    shutil.copy(figshare_path, Path(f"../results/{compound_name}-ncats-figshare.json"))
-    with open(figshare_path, "r") as fp:
+    print(f"Linking NCATS Figshare data for {compound_name}")
 
-        print(f"Copying NCATS Figshare data for {compound_name}")
+    # Read from the packed archive, if it has been packed
+    stitcher_archive = open_stitcher_archive()
+    if stitcher_archive is not None:
+        figshare_bytes = stitcher_archive.read(compound_unii)
+        stitcher_archive.close()
 
-        stitcher_json = json.load(fp)
+    else:
+        figshare_path = Path(f"../data/stitcher_json_files/{compound_unii}.json")
+        figshare_bytes = figshare_path.read_bytes()
+
+    # Unchanged data is not written again
+    store_bytes(figshare_bytes, Path(f"../results/{compound_name}-ncats-figshare.json"))
+    stitcher_json = json.loads(figshare_bytes)
 
-    conditions_path = Path(f"../results/{compound_name}-ncats-conditions.json")
+    conditions_path = get_results_path(
+        f"../results/{compound_name}-ncats-conditions.json", args.output_format
+    )
     if not conditions_path.exists() or args.force:
 
         start_time = time.time()
         print(f"Decoding NCATS Figshare conditions field for {compound_name}")
 
-        encoded_string = stitcher_json["sgroup"]["properties"]["conditions"][0]["value"]
-        decoded_bytes = base64.b64decode(encoded_string)
-        decoded_string = decoded_bytes.decode("utf-8")
-        with open(conditions_path, "w") as fp:
-            json.dump(json.loads(decoded_string), fp, indent=4)
+        conditions = decode_conditions(stitcher_json)
+        write_results(conditions, conditions_path, args.output_format)
 
         stop_time = time.time()
+        metrics.record_stage(
+            "ncats-conditions", stop_time - start_time, len(conditions)
+        )
         print(
             f"Decoded NCATS Figshare conditions field for {compound_name} in {stop_time - start_time} seconds"
         )
 
+    metrics.write("ncats", args.metrics_dir)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+from pathlib import Path
+import time
+
+import numpy as np
+import pandas as pd
+
+DRUGS_PATH = "../data/frdb/frdb-drugs.tsv"
+INDEX_PATH = "../data/frdb/frdb-drugs-index.npz"
+
+# Largest code point, used as the upper bound of a prefix range
+MAX_CHAR = chr(0x10FFFF)
+
+
+def get_source_stamp(drugs_path):
+    """Returns the size and modification time of the drugs file."""
+    stat = Path(drugs_path).stat()
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def build_compound_index(drugs_path=DRUGS_PATH, index_path=INDEX_PATH):
+    """Builds the compound index from the drugs file: the compound
+    names sorted, with the UNII and file row of each, saved as
+    compressed NumPy arrays.
+    """
+    start_time = time.time()
+    print(f"Building NCATS compound index {index_path}")
+
+    drugs = pd.read_csv(drugs_path)
+    names = drugs["compound_name"].fillna("").astype(str).to_numpy(dtype=str)
+    uniis = drugs.iloc[:, 2].fillna("").astype(str).to_numpy(dtype=str)
+    rows = np.arange(len(names), dtype=np.int64)
+    order = np.lexsort((rows, names))
+
+    temp_path = Path(index_path).with_suffix(".tmp.npz")
+    np.savez_compressed(
+        temp_path,
+        names=names[order],
+        uniis=uniis[order],
+        rows=rows[order],
+        stamp=get_source_stamp(drugs_path),
+    )
+    os.replace(temp_path, index_path)
+
+    stop_time = time.time()
+    print(
+        f"Built NCATS compound index of {len(names)} compounds in {stop_time - start_time} seconds"
+    )
+
+
+def load_compound_index(drugs_path=DRUGS_PATH, index_path=INDEX_PATH, rebuild=False):
+    """Loads the compound index, building it first if it does not
+    exist, if the drugs file has changed since it was built, or if
+    rebuild is requested.
+    """
+    if Path(index_path).exists() and not rebuild:
+        with np.load(index_path) as index:
+            if np.array_equal(index["stamp"], get_source_stamp(drugs_path)):
+                return {key: index[key] for key in ["names", "uniis", "rows"]}
+
+    build_compound_index(drugs_path, index_path)
+    return load_compound_index(drugs_path, index_path)
+
+
+def find_range(index, name, prefix):
+    """Returns the start and stop positions of the names matching the
+    name exactly, or as a prefix.
+    """
+    start = np.searchsorted(index["names"], name, side="left")
+    if prefix:
+        stop = np.searchsorted(index["names"], name + MAX_CHAR, side="left")
+    else:
+        stop = np.searchsorted(index["names"], name, side="right")
+    return start, stop
+
+
+def lookup_compound(name, index, prefix=True):
+    """Returns the names and UNIIs of compounds matching the name
+    exactly, or as a prefix, in drugs file order.
+    """
+    start, stop = find_range(index, name, prefix)
+    order = np.argsort(index["rows"][start:stop], kind="stable")
+    names = index["names"][start:stop][order]
+    uniis = index["uniis"][start:stop][order]
+    return list(zip(names.tolist(), uniis.tolist()))
+
+
+def lookup_compounds(names, index, prefix=True):
+    """Returns the UNII of the first compound, in drugs file order,
+    matching each name exactly, or as a prefix, or None if there is no
+    match.
+    """
+    names = np.asarray(names, dtype=str)
+    starts = np.searchsorted(index["names"], names, side="left")
+    if prefix:
+        stops = np.searchsorted(
+            index["names"], np.char.add(names, MAX_CHAR), side="left"
+        )
+    else:
+        stops = np.searchsorted(index["names"], names, side="right")
+
+    uniis = {}
+    for name, start, stop in zip(names.tolist(), starts, stops):
+        if start == stop:
+            uniis[name] = None
+        else:
+            first = start + np.argmin(index["rows"][start:stop])
+            uniis[name] = str(index["uniis"][first])
+    return uniis
+
+
+def main():
+    """Builds the NCATS compound name to UNII index, and optionally
+    looks up compound names.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build the NCATS compound name to UNII index"
+    )
+    parser.add_argument(
+        "compound_names",
+        nargs="*",
+        help="compound names to look up in the index",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="look up compound names exactly, rather than as prefixes",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force rebuild of the existing index",
+    )
+    args = parser.parse_args()
+
+    index = load_compound_index(rebuild=args.force)
+    compound_names = [c_n.upper() for c_n in args.compound_names]
+    for compound_name, compound_unii in lookup_compounds(
+        compound_names, index, prefix=not args.exact
+    ).items():
+        print(f"{compound_name}: {compound_unii}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,378 @@
 #!/usr/bin/env python
 
 import argparse
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+import sys
 import time
 
-import requests
-
-from LoaderUtilities import get_gene_name_to_ids_map, map_gene_name_to_ids
+from adaptive_concurrency import MAX_LIMIT, get_limiter, get_pool_size
+from gene_index import map_gene_symbol_to_ids, open_gene_index
+from http_transport import add_transport_arguments, create_session, install_transport
+from metrics import add_metrics_argument, install_request_metrics, metrics
+from open_targets_api import UPSTREAM, post_query, set_response_cache
+from open_targets_batch import post_batched_queries
 from open_targets_examples import example_queries
 from open_targets_gget import gget_queries
+from open_targets_pager import PAGE_SIZE, stream_connection
+from open_targets_profiles import PROFILES
+from open_targets_query import get_profile_connections, get_profile_query
+from response_cache import CACHE_DIR, DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache
+from run_manifest import RunManifest
+from output_formats import (
+    add_output_format_argument,
+    count_rows,
+    get_results_path,
+    write_results,
+)
+
+MANIFEST_PATH = "../results/open-targets-manifest.ndjson"
+
+# Paginated connections of each query, and how each is paginated
+TARGET_CONNECTIONS = {
+    "associatedDiseases": "page",
+    "knownDrugs": "cursor",
+}
+DISEASE_CONNECTIONS = {
+    "associatedTargets": "page",
+    "knownDrugs": "cursor",
+    "literatureOcurrences": "cursor",
+}
+DRUG_CONNECTIONS = {
+    "knownDrugs": "cursor",
+    "literatureOcurrences": "cursor",
+}
+
+# Queries selecting the fields of each full projection profile
+TARGET_QUERY_STRING = get_profile_query("target", "full")
+DISEASE_QUERY_STRING = get_profile_query("disease", "full")
+DRUG_QUERY_STRING = get_profile_query("drug", "full")
+
+# Projection profiles defined for every entity type
+SHARED_PROFILES = [
+    profile
+    for profile in PROFILES["target"]
+    if all(profile in profiles for profiles in PROFILES.values())
+]
+
+
+def get_profile_name(name, profile):
+    """Returns the name, of results or of a query, under the projection
+    profile: the name itself for the full profile, so that full results
+    keep the names they had before profiles, and otherwise the name
+    suffixed by the profile, so that results of one profile are never
+    taken for, or skipped as, results of another.
+    """
+    return name if profile == "full" else f"{name}-{profile}"
+
+
+def get_results_stem(name, entity, profile="full"):
+    """Returns the stem of the paths of the Open Targets results of the
+    entity type for the name, such as a gene symbol, under the
+    projection profile.
+    """
+    return get_profile_name(f"../results/{name}-open-targets-{entity}", profile)
+
+
+def get_target_path(gene_symbol, output_format="json", profile="full"):
+    """Returns the path of the Open Targets target results of the gene
+    symbol under the projection profile in the output format.
+    """
+    return get_results_path(
+        f"{get_results_stem(gene_symbol, 'target', profile)}.json", output_format
+    )
+
+
+def fetch_target(
+    gene_symbol, gene_id, force, session=None, output_format="json", profile="full"
+):
+    """Fetches the fields of the projection profile of the Open Targets
+    target of the given gene symbol and Ensembl id, and writes the
+    results in the output format, unless they exist already.
+    """
+    results_path = get_target_path(gene_symbol, output_format, profile)
+    if not results_path.exists() or force:
+
+        start_time = time.time()
+        print(f"Getting Open Targets target data for {gene_symbol}")
+
+        query_string = get_profile_query("target", profile)
+        variables = {"ensemblId": gene_id}
+        results = post_query(query_string, variables, session=session)
+        write_results(results, results_path, output_format)
 
-BASE_URL = "https://api.platform.opentargets.org/api/v4/graphql"
+        stop_time = time.time()
+        metrics.record_stage(
+            "open-targets-target", stop_time - start_time, count_rows(results)
+        )
+        print(
+            f"Got Open Targets target data for {gene_symbol} in {stop_time - start_time} seconds"
+        )
+
+    return results_path
+
+
+def read_gene_symbols(gene_list):
+    """Reads gene symbols, one per line, from the given file, or from
+    standard input if the file is "-". Blank lines and lines beginning
+    with "#" are ignored, and duplicate symbols are dropped.
+    """
+    if gene_list == "-":
+        lines = sys.stdin.readlines()
+
+    else:
+        with open(gene_list, "r") as fp:
+            lines = fp.readlines()
+
+    gene_symbols = []
+    for line in lines:
+        gene_symbol = line.strip().upper()
+        if gene_symbol == "" or gene_symbol.startswith("#"):
+            continue
+        if gene_symbol not in gene_symbols:
+            gene_symbols.append(gene_symbol)
+
+    return gene_symbols
+
+
+def map_gene_symbols_to_ids(gene_symbols):
+    """Maps each gene symbol to its Ensembl id, opening the gene index
+    at most once. Gene symbols that cannot be mapped are reported, and
+    omitted.
+    """
+    gene_ids = {}
+    gene_index = None
+    for gene_symbol in gene_symbols:
+        if gene_symbol == "ADRB2":
+            gene_ids[gene_symbol] = "ENSG00000169252"
+
+        else:
+            if gene_index is None:
+                gene_index = open_gene_index()
+            try:
+                gene_ids[gene_symbol] = map_gene_symbol_to_ids(gene_symbol, gene_index)
+
+            except KeyError:
+                print(f"Could not map gene symbol {gene_symbol}")
+
+    return gene_ids
+
+
+def fetch_targets(gene_ids, force, output_format="json", manifest=None, profile="full"):
+    """Fetches Open Targets target data for each gene symbol and
+    Ensembl id concurrently, within the adaptive limit of requests in
+    flight, writing the results for each gene as its response arrives.
+    Unless forced, only genes without results are fetched, or if a run
+    manifest is given, genes which it does not record as done, and the
+    status of each gene is recorded.
+    """
+    start_time = time.time()
+    print(f"Getting Open Targets target data for {len(gene_ids)} genes")
+
+    query = get_profile_name("target", profile)
+    failed_symbols = []
+    session = create_session(get_pool_size(UPSTREAM))
+    with ThreadPoolExecutor(max_workers=get_pool_size(UPSTREAM)) as executor:
+        futures = {}
+        for gene_symbol, gene_id in gene_ids.items():
+            results_path = get_target_path(gene_symbol, output_format, profile)
+            if manifest is not None:
+                if not force and not manifest.needs_run(
+                    gene_symbol, query, results_path
+                ):
+                    continue
+                manifest.mark_pending(gene_symbol, query)
+
+            elif results_path.exists() and not force:
+                continue
+            future = executor.submit(
+                fetch_target,
+                gene_symbol,
+                gene_id,
+                True,
+                session=session,
+                output_format=output_format,
+                profile=profile,
+            )
+            futures[future] = gene_symbol
+        for future in as_completed(futures):
+            gene_symbol = futures[future]
+            try:
+                results_path = future.result()
+                if manifest is not None:
+                    manifest.mark_done(gene_symbol, query, results_path)
+
+            except Exception as exc:
+                print(
+                    f"Could not get Open Targets target data for {gene_symbol}: {exc}"
+                )
+                failed_symbols.append(gene_symbol)
+                if manifest is not None:
+                    manifest.mark_failed(gene_symbol, query, exc)
+
+    stop_time = time.time()
+    print(
+        f"Got Open Targets target data for {len(futures) - len(failed_symbols)} genes, skipping {len(gene_ids) - len(futures)} existing, in {stop_time - start_time} seconds"
+    )
+
+    return failed_symbols
+
+
+def fetch_targets_batched(
+    gene_ids, force, output_format="json", manifest=None, profile="full"
+):
+    """Fetches Open Targets target data for each gene symbol and
+    Ensembl id using aliased query documents, each requesting many
+    targets, posted concurrently within the adaptive limit of requests
+    in flight, writing the results for each gene as its batch arrives,
+    and returns the gene symbols whose results were null or had an
+    error. If a run manifest is given, only genes which it does not
+    record as done are fetched, and the status of each gene is
+    recorded, so that failed genes are fetched again by a rerun.
+    """
+    start_time = time.time()
+    print(f"Getting Open Targets target data for {len(gene_ids)} genes in batches")
+
+    query = get_profile_name("target", profile)
+    results_paths = {
+        g_s: get_target_path(g_s, output_format, profile) for g_s in gene_ids
+    }
+    if manifest is not None:
+        fetch_symbols = [
+            g_s
+            for g_s in gene_ids
+            if force or manifest.needs_run(g_s, query, results_paths[g_s])
+        ]
+        for g_s in fetch_symbols:
+            manifest.mark_pending(g_s, query)
+
+    else:
+        fetch_symbols = [
+            g_s for g_s in gene_ids if not results_paths[g_s].exists() or force
+        ]
+    variables_list = [{"ensemblId": gene_ids[g_s]} for g_s in fetch_symbols]
+    session = create_session(get_pool_size(UPSTREAM))
+    failed_symbols = []
+    rows = 0
+    next_index = 0
+    try:
+        for index, results in post_batched_queries(
+            get_profile_query("target", profile),
+            variables_list,
+            session=session,
+            max_workers=get_pool_size(UPSTREAM),
+        ):
+            gene_symbol = fetch_symbols[index]
+            next_index = index + 1
+            if results is None:
+                print(f"Could not get Open Targets target data for {gene_symbol}")
+                failed_symbols.append(gene_symbol)
+                if manifest is not None:
+                    manifest.mark_failed(gene_symbol, query, "null or error result")
+                continue
+            write_results(results, results_paths[gene_symbol], output_format)
+            rows += count_rows(results)
+            if manifest is not None:
+                manifest.mark_done(gene_symbol, query, results_paths[gene_symbol])
+
+    except Exception as exc:
+        if manifest is not None:
+            for gene_symbol in fetch_symbols[next_index:]:
+                manifest.mark_failed(gene_symbol, query, exc)
+        raise
+
+    stop_time = time.time()
+    metrics.record_stage("open-targets-target-batched", stop_time - start_time, rows)
+    print(
+        f"Got Open Targets target data for {len(fetch_symbols) - len(failed_symbols)} genes, skipping {len(gene_ids) - len(fetch_symbols)} existing, in {stop_time - start_time} seconds"
+    )
+
+    return failed_symbols
+
+
+def page_connections(
+    query_string, connections, variables, results_stem, args, manifest=None
+):
+    """Streams every page of each paginated connection of the root
+    field of the query string to an NDJSON file, resuming any
+    interrupted paging. If a run manifest is given, connections which
+    it records as done are skipped, and the status of each connection
+    is recorded.
+    """
+    entity = Path(results_stem).name
+    for connection, pagination in connections.items():
+        ndjson_path = Path(f"{results_stem}-{connection}.ndjson")
+        if manifest is not None:
+            if not args.force and not manifest.needs_run(
+                entity, connection, ndjson_path
+            ):
+                continue
+            manifest.mark_pending(entity, connection)
+
+        start_time = time.time()
+        print(f"Paging Open Targets {connection} data to {ndjson_path}")
+
+        try:
+            rows = stream_connection(
+                query_string,
+                connection,
+                pagination,
+                variables,
+                ndjson_path,
+                force=args.force,
+                page_size=args.page_size,
+            )
+
+        except Exception as exc:
+            if manifest is not None:
+                manifest.mark_failed(entity, connection, exc)
+            raise
+
+        if manifest is not None:
+            manifest.mark_done(entity, connection, ndjson_path)
+
+        stop_time = time.time()
+        metrics.record_stage(f"open-targets-{connection}", stop_time - start_time, rows)
+        print(
+            f"Paged {rows} Open Targets {connection} rows to {ndjson_path} in {stop_time - start_time} seconds"
+        )
+
+
+def page_targets(gene_ids, args, manifest=None):
+    """Streams every page of each paginated target connection for each
+    gene symbol and Ensembl id concurrently, within the adaptive limit
+    of requests in flight.
+    """
+    with ThreadPoolExecutor(max_workers=get_pool_size(UPSTREAM)) as executor:
+        futures = {
+            executor.submit(
+                page_connections,
+                get_profile_query("target", args.profile),
+                get_profile_connections(TARGET_CONNECTIONS, "target", args.profile),
+                {"ensemblId": gene_id},
+                get_results_stem(gene_symbol, "target", args.profile),
+                args,
+                manifest,
+            ): gene_symbol
+            for gene_symbol, gene_id in gene_ids.items()
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+
+            except Exception as exc:
+                print(
+                    f"Could not page Open Targets target data for {futures[future]}: {exc}"
+                )
+
+
+def report_cache(cache):
+    """Prints the response cache statistics, if caching."""
+    if cache is not None:
+        stats = cache.get_stats()
+        print(
+            f"Response cache had {stats['hits']} hits, {stats['misses']} misses, {stats['expirations']} expirations, and {stats['evictions']} evictions, and holds {stats['total_bytes']} bytes"
+        )
 
 
 def main():
@@ -26,6 +387,68 @@ def main():
         default="ADRB2",
         help="gene symbol for which to obtain Open Targets data (default: ADRB2)",
     )
+    parser.add_argument(
+        "--gene-list",
+        help="file containing gene symbols, one per line, for which to obtain Open Targets target data, or - for standard input",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_LIMIT,
+        help=f"maximum to which the adaptive limit of concurrent requests for a gene list rises (default: {MAX_LIMIT})",
+    )
+    parser.add_argument(
+        "--alias-batching",
+        action="store_true",
+        help="request many targets in each query for a gene list, using aliases",
+    )
+    parser.add_argument(
+        "--paginate",
+        action="store_true",
+        help="stream every page of each paginated connection to an NDJSON file",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        help=f"number of rows requested per page (default: {PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help=f"directory of the shared response cache (default: {CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=DEFAULT_TTL,
+        help=f"seconds after which cached responses expire (default: {DEFAULT_TTL})",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help=f"size above which least recently used responses are evicted (default: {DEFAULT_MAX_BYTES})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="post every query, without reading or writing the response cache",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=SHARED_PROFILES,
+        default="full",
+        help="projection profile of the fields requested for each target, disease, and drug, where ids requests only ids, names, and scores (default: full)",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=MANIFEST_PATH,
+        help=f"run manifest recording the status of each gene and query of a gene list, so that a rerun resumes where it stopped, reset by --force (default: {MANIFEST_PATH})",
+    )
+    add_output_format_argument(parser)
+    add_metrics_argument(parser)
+    add_transport_arguments(parser)
     parser.add_argument(
         "-f",
         "--force",
@@ -34,13 +457,50 @@ def main():
     )
     args = parser.parse_args()
 
-    gene_symbol = args.gene_symbol.upper()
-    if gene_symbol == "ADRB2":
-        gene_id = "ENSG00000169252"
+    install_transport(args.http_mode, args.cassette)
+    install_request_metrics()
+    get_limiter(UPSTREAM).set_max_limit(args.max_workers)
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, args.cache_ttl, args.cache_max_bytes)
+        set_response_cache(cache)
+
+    if args.gene_list is not None:
+        gene_ids = map_gene_symbols_to_ids(read_gene_symbols(args.gene_list))
+        manifest = RunManifest(args.manifest, reset=args.force)
+        if args.alias_batching:
+            fetch_targets_batched(
+                gene_ids,
+                args.force,
+                args.output_format,
+                manifest=manifest,
+                profile=args.profile,
+            )
 
-    else:
-        gnm2ids = get_gene_name_to_ids_map()
-        gene_id = map_gene_name_to_ids(gene_symbol, gnm2ids)
+        else:
+            fetch_targets(
+                gene_ids,
+                args.force,
+                args.output_format,
+                manifest=manifest,
+                profile=args.profile,
+            )
+
+        if args.paginate:
+            page_targets(gene_ids, args, manifest=manifest)
+
+        manifest.report()
+        manifest.close()
+        report_cache(cache)
+        metrics.write("open-targets", args.metrics_dir)
+        return
+
+    gene_symbol = args.gene_symbol.upper()
+    gene_ids = map_gene_symbols_to_ids([gene_symbol])
+    if gene_symbol not in gene_ids:
+        return
+    gene_id = gene_ids[gene_symbol]
 
     disease_id = "MONDO_0004979"
     disease_name = "asthma"
@@ -50,417 +510,113 @@ def main():
 
     # == target
 
-    results_path = Path(f"../results/{gene_symbol}-open-targets-target.json")
-    if not results_path.exists() or args.force:
-
-        start_time = time.time()
-        print(f"Getting Open Targets target data for {gene_symbol}")
-
-        # See: https://api.platform.opentargets.org/api/v4/graphql/browser
-        query_string = """
-        query target($ensemblId: String!) {
-          target(ensemblId: $ensemblId) {
-            id
-            approvedSymbol
-            approvedName
-            transcriptIds
-            associatedDiseases {
-              rows {
-                disease {
-                  id
-                  name
-                  description
-                  dbXRefs
-                }
-                score
-              }
-            }
-            proteinIds {
-              id
-              source
-            }
-            knownDrugs {
-              rows {
-                drugId
-                prefName
-                drugType
-                targetClass
-                mechanismOfAction
-                drug {
-                  description
-                  synonyms
-                  tradeNames
-                  isApproved
-                }
-                diseaseId
-                disease {
-                  name
-                  description
-                  dbXRefs
-                }
-                phase
-                status
-                ctIds
-              }
-            }
-            tep {
-              description
-              name
-              therapeuticArea
-              uri
-            }
-            pathways {
-              pathwayId
-              pathway
-              topLevelTerm
-            }
-            geneOntology {
-              geneProduct
-              source
-              aspect
-              evidence
-              term {
-                id
-                name
-              }
-            }
-            tractability {
-              label
-              modality
-              value
-            }
-            targetClass {
-              id
-              level
-              label
-            }
-          }
-        }
-        """
-        variables = {"ensemblId": gene_id}
-        response = requests.post(
-            BASE_URL, json={"query": query_string, "variables": variables}
-        )
-        results = json.loads(response.text)["data"]
-        with open(results_path, "w") as fp:
-            json.dump(results, fp, indent=4)
+    fetch_target(
+        gene_symbol,
+        gene_id,
+        args.force,
+        output_format=args.output_format,
+        profile=args.profile,
+    )
 
-        stop_time = time.time()
-        print(
-            f"Got Open Targets target data for {gene_symbol} in {stop_time - start_time} seconds"
+    if args.paginate:
+        page_connections(
+            get_profile_query("target", args.profile),
+            get_profile_connections(TARGET_CONNECTIONS, "target", args.profile),
+            {"ensemblId": gene_id},
+            get_results_stem(gene_symbol, "target", args.profile),
+            args,
         )
 
     # == disease
 
-    results_path = Path(f"../results/{gene_symbol}-open-targets-disease.json")
+    results_path = get_results_path(
+        f"{get_results_stem(gene_symbol, 'disease', args.profile)}.json",
+        args.output_format,
+    )
     if not results_path.exists() or args.force:
 
         start_time = time.time()
         print(f"Getting Open Targets target disease for {disease_name}")
 
-        # See: https://api.platform.opentargets.org/api/v4/graphql/browser
-        query_string = """
-        query disease($efoId: String!) {
-          disease(efoId: $efoId) {
-            directLocationIds
-            id
-            descendants
-            obsoleteTerms
-            description
-            dbXRefs
-            indirectLocationIds
-            synonyms {
-              relation
-              terms
-            }
-            ancestors
-            name
-            therapeuticAreas {
-              id
-              name
-            }
-            parents {
-              id
-              name
-            }
-            children {
-              id
-              name
-            }
-            directLocations {
-              id
-              name
-            }
-            indirectLocations {
-              id
-              name
-            }
-            similarEntities {
-              id
-              category
-              score
-            }
-            literatureOcurrences {
-              rows {
-                pmid
-                pmcid
-                publicationDate
-                sentences {
-                  section
-                  matches {
-                    mappedId
-                    matchedLabel
-                    sectionStart
-                    sectionEnd
-                    startInSentence
-                    endInSentence
-                    matchedType
-                  }
-                }
-              }
-            }
-            isTherapeuticArea
-            phenotypes {
-              rows {
-                phenotypeHPO {
-                  id
-                }
-                phenotypeEFO {
-                  id
-                }
-              }
-            }
-            otarProjects {
-              otarCode
-              status
-              reference
-              integratesInPPP
-              projectName
-            }
-            knownDrugs {
-              rows {
-                drugId
-              }
-            }
-            associatedTargets {
-              rows {
-                datatypeScores {
-                  id
-                }
-                datasourceScores {
-                  id
-                }
-                score
-                target {
-                  id
-                }
-              }
-            }
-          }
-        }
-        """
+        query_string = get_profile_query("disease", args.profile)
         variables = {"efoId": disease_id}
-        response = requests.post(
-            BASE_URL, json={"query": query_string, "variables": variables}
-        )
-        results = json.loads(response.text)["data"]
-        with open(results_path, "w") as fp:
-            json.dump(results, fp, indent=4)
+        results = post_query(query_string, variables)
+        write_results(results, results_path, args.output_format)
 
         stop_time = time.time()
+        metrics.record_stage(
+            "open-targets-disease", stop_time - start_time, count_rows(results)
+        )
         print(
             f"Got Open Targets disease data for {disease_name} in {stop_time - start_time} seconds"
         )
 
+    if args.paginate:
+        page_connections(
+            get_profile_query("disease", args.profile),
+            get_profile_connections(DISEASE_CONNECTIONS, "disease", args.profile),
+            {"efoId": disease_id},
+            get_results_stem(gene_symbol, "disease", args.profile),
+            args,
+        )
+
     # == drug
 
-    results_path = Path(f"../results/{drug_name}-open-targets-drug.json")
+    results_path = get_results_path(
+        f"{get_results_stem(drug_name, 'drug', args.profile)}.json",
+        args.output_format,
+    )
     if not results_path.exists() or args.force:
 
         start_time = time.time()
         print(f"Getting Open Targets drug data for {drug_name}")
 
-        # See: https://api.platform.opentargets.org/api/v4/graphql/browser
-        query_string = """
-        query drug($chemblId: String!) {
-          drug(chemblId: $chemblId) {
-            id
-            description
-            blackBoxWarning
-            yearOfFirstApproval
-            maximumClinicalTrialPhase
-            drugType
-            crossReferences {
-              reference
-              source
-            }
-            isApproved
-            synonyms
-            hasBeenWithdrawn
-            tradeNames
-            name
-            parentMolecule {
-              id
-            }
-            childMolecules {
-              id
-            }
-            approvedIndications
-            drugWarnings {
-              id
-              efoIdForWarningClass
-              references {
-                id
-                source
-                url
-              }
-              efoTerm
-              description
-              country
-              efoId
-              warningType
-              year
-              toxicityClass
-            }
-            similarEntities {
-              id
-              category
-              score
-            }
-            literatureOcurrences {
-              rows {
-                pmid
-                pmcid
-                publicationDate
-                sentences {
-                  section
-                  matches {
-                    mappedId
-                    matchedLabel
-                    sectionStart
-                    sectionEnd
-                    startInSentence
-                    endInSentence
-                    matchedType
-                  }
-                }
-              }
-            }
-            mechanismsOfAction {
-              rows {
-                references {
-                  urls
-                  source
-                  ids
-                }
-                targetName
-                actionType
-                mechanismOfAction
-              }
-            }
-            indications {
-              rows {
-                maxPhaseForIndication
-                references {
-                  source
-                  ids
-                }
-                disease {
-                  id
-                }
-              }
-            }
-            knownDrugs {
-              rows {
-                drugId
-              }
-            }
-            adverseEvents {
-              rows {
-                logLR
-                count
-                meddraCode
-                name
-              }
-            }
-            pharmacogenomics {
-              isDirectTarget
-              genotypeAnnotationText
-              haplotypeFromSourceId
-              phenotypeText
-              pgxCategory
-              genotypeId
-              targetFromSourceId
-              studyId
-              literature
-              variantRsId
-              datatypeId
-              variantFunctionalConsequenceId
-              phenotypeFromSourceId
-              evidenceLevel
-              datasourceId
-              variantId
-              genotype
-              haplotypeId
-              variantFunctionalConsequence {
-                id
-                label
-              }
-              target {
-                id
-              }
-              drugs {
-                drugId
-              }
-            }
-            linkedDiseases {
-              rows {
-                id
-              }
-            }
-            linkedTargets {
-              rows {
-                id
-              }
-            }
-          }
-        }
-        """
+        query_string = get_profile_query("drug", args.profile)
         variables = {"chemblId": drug_id}
-        response = requests.post(
-            BASE_URL, json={"query": query_string, "variables": variables}
-        )
-        results = json.loads(response.text)["data"]
-        with open(results_path, "w") as fp:
-            json.dump(results, fp, indent=4)
+        results = post_query(query_string, variables)
+        write_results(results, results_path, args.output_format)
 
         stop_time = time.time()
+        metrics.record_stage(
+            "open-targets-drug", stop_time - start_time, count_rows(results)
+        )
         print(
             f"Got Open Targets drug data for {drug_name} in {stop_time - start_time} seconds"
         )
 
+    if args.paginate:
+        page_connections(
+            get_profile_query("drug", args.profile),
+            get_profile_connections(DRUG_CONNECTIONS, "drug", args.profile),
+            {"chemblId": drug_id},
+            get_results_stem(drug_name, "drug", args.profile),
+            args,
+        )
+
     # == example queries
 
     for name, query in example_queries.items():
 
-        results_path = Path(f"../results/open-targets-example-{name}.json")
+        results_path = get_results_path(
+            f"../results/open-targets-example-{name}.json", args.output_format
+        )
         if not results_path.exists() or args.force:
 
             start_time = time.time()
             print(f"Running Open Targets example query {name}")
 
-            response = requests.post(
-                BASE_URL,
-                json={"query": query["query_string"], "variables": query["variables"]},
-            )
             results = {}
             results["purpose"] = query["purpose"]
             results["variables"] = query["variables"]
-            results["data"] = json.loads(response.text)["data"]
-            with open(results_path, "w") as fp:
-                json.dump(results, fp, indent=4)
+            results["data"] = post_query(query["query_string"], query["variables"])
+            write_results(results, results_path, args.output_format)
 
             stop_time = time.time()
+            metrics.record_stage(
+                f"open-targets-example-{name}",
+                stop_time - start_time,
+                count_rows(results),
+            )
             print(
                 f"Ran Open Targets example query {name} in {stop_time - start_time} seconds"
             )
@@ -469,28 +625,33 @@ def main():
 
     for name, query in gget_queries.items():
 
-        results_path = Path(f"../results/open-targets-ggetx-{name}.json")
+        results_path = get_results_path(
+            f"../results/open-targets-ggetx-{name}.json", args.output_format
+        )
         if not results_path.exists() or args.force:
 
             start_time = time.time()
             print(f"Running Open Targets gget query {name}")
 
-            response = requests.post(
-                BASE_URL,
-                json={"query": query["query_string"], "variables": query["variables"]},
-            )
             results = {}
             results["purpose"] = query["purpose"]
             results["variables"] = query["variables"]
-            results["data"] = json.loads(response.text)["data"]
-            with open(results_path, "w") as fp:
-                json.dump(results, fp, indent=4)
+            results["data"] = post_query(query["query_string"], query["variables"])
+            write_results(results, results_path, args.output_format)
 
             stop_time = time.time()
+            metrics.record_stage(
+                f"open-targets-gget-{name}",
+                stop_time - start_time,
+                count_rows(results),
+            )
             print(
                 f"Ran Open Targets gget query {name} in {stop_time - start_time} seconds"
             )
 
+    report_cache(cache)
+    metrics.write("open-targets", args.metrics_dir)
+
 
 if __name__ == "__main__":
     main()
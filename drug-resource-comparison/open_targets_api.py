@@ -0,0 +1,104 @@
+import json
+import threading
+
+import requests
+
+from adaptive_concurrency import REQUEST_TIMEOUT, send_with_retries
+from metrics import metrics
+from response_cache import hash_key
+
+BASE_URL = "https://api.platform.opentargets.org/api/v4/graphql"
+
+# Name of the upstream API under which requests are recorded
+UPSTREAM = "opentargets"
+
+RELEASE_QUERY_STRING = """
+query release {
+  meta {
+    dataVersion {
+      year
+      month
+    }
+  }
+}
+"""
+
+# Response cache shared by all queries, if set, and the data release
+# used to key its entries
+response_cache = None
+release = None
+release_lock = threading.Lock()
+
+
+def set_response_cache(cache):
+    """Sets the response cache used by all queries, or unsets it if
+    None.
+    """
+    global response_cache
+    response_cache = cache
+
+
+def post_graphql(query_string, variables, session=None):
+    """Posts a query to the Open Targets GraphQL API within the limit of
+    requests in flight, retrying throttled requests, and returns the
+    response, or raises an HTTPError for an error status.
+    """
+    poster = session or requests
+
+    def send():
+        return poster.post(
+            BASE_URL,
+            json={"query": query_string, "variables": variables},
+            timeout=REQUEST_TIMEOUT,
+        )
+
+    response = send_with_retries(send, UPSTREAM)
+    response.raise_for_status()
+    return response
+
+
+def get_release(session=None):
+    """Returns the Open Targets data release, requesting it at most
+    once.
+    """
+    global release
+    with release_lock:
+        if release is None:
+            response = post_graphql(RELEASE_QUERY_STRING, {}, session=session)
+            data_version = json.loads(response.text)["data"]["meta"]["dataVersion"]
+            release = f"{data_version['year']}.{data_version['month']}"
+    return release
+
+
+def post_request(query_string, variables, session=None):
+    """Posts a query to the Open Targets GraphQL API, and returns the
+    response text. If a response cache is set, the text is read from,
+    or written to, the cache using a key which hashes the query string,
+    variables, and data release. Responses containing errors are not
+    cached. Each cache hit or miss is recorded.
+    """
+    key = None
+    if response_cache is not None:
+        key = hash_key(" ".join(query_string.split()), variables, get_release(session))
+        text = response_cache.get(key)
+        metrics.record_cache(UPSTREAM, text is not None)
+        if text is not None:
+            return text
+
+    response = post_graphql(query_string, variables, session=session)
+    if (
+        key is not None
+        and response.status_code == 200
+        and "errors" not in json.loads(response.text)
+    ):
+        response_cache.put(key, response.text)
+
+    return response.text
+
+
+def post_query(query_string, variables, session=None):
+    """Posts a query to the Open Targets GraphQL API, and returns the
+    data member of the response.
+    """
+    text = post_request(query_string, variables, session=session)
+    return json.loads(text)["data"]
@@ -0,0 +1,182 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json
+import re
+
+from adaptive_concurrency import get_limiter
+from open_targets_api import UPSTREAM, post_request
+
+# Bounds on the number of entities in one aliased query document
+INITIAL_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 200
+
+# Target size of one aliased query response
+MAX_RESPONSE_BYTES = 8 * 1024 * 1024
+
+HEADER_PATTERN = re.compile(r"\s*query\s+(\w+)\s*(?:\((.*?)\))?\s*\{", re.DOTALL)
+ROOT_FIELD_PATTERN = re.compile(r"\s*(\w+)\s*(\([^)]*\))?\s*\{", re.DOTALL)
+VARIABLE_PATTERN = re.compile(r"\$(\w+)")
+
+
+def find_closing_brace(string, start):
+    """Returns the index of the brace closing the brace at the given
+    start index.
+    """
+    depth = 0
+    for index in range(start, len(string)):
+        if string[index] == "{":
+            depth += 1
+        elif string[index] == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("Unbalanced braces in query string")
+
+
+def parse_query(query_string):
+    """Parses a single root field query string into its operation
+    name, variable definitions, root field name, root field arguments,
+    and root field selection set.
+    """
+    header = HEADER_PATTERN.match(query_string)
+    if header is None:
+        raise ValueError("Could not parse query operation")
+    name = header.group(1)
+    definitions = header.group(2) or ""
+
+    body_stop = find_closing_brace(query_string, header.end() - 1)
+    body = query_string[header.end() : body_stop]
+    root = ROOT_FIELD_PATTERN.match(body)
+    if root is None:
+        raise ValueError("Could not parse query root field")
+    field = root.group(1)
+    arguments = root.group(2) or ""
+
+    selection_stop = find_closing_brace(body, root.end() - 1)
+    selection = body[root.end() - 1 : selection_stop + 1]
+    if body[selection_stop + 1 :].strip() != "":
+        raise ValueError("Only queries with a single root field can be batched")
+
+    return name, definitions, field, arguments, selection
+
+
+def build_batched_query(query_string, variables_list):
+    """Builds one query document which requests the root field of the
+    query string once for each set of variables, using aliases, and
+    suffixing each variable with the index of its set.
+
+    Returns the query string, variables, and the alias of each set.
+    """
+    name, definitions, field, arguments, selection = parse_query(query_string)
+    prefix = field[0]
+
+    batched_definitions = []
+    batched_fields = []
+    batched_variables = {}
+    aliases = []
+    for index, variables in enumerate(variables_list):
+        alias = f"{prefix}{index}"
+        aliases.append(alias)
+        suffix = rf"$\g<1>{index}"
+        if definitions != "":
+            batched_definitions.append(VARIABLE_PATTERN.sub(suffix, definitions))
+        field_string = f"  {alias}: {field}{arguments} {selection}"
+        batched_fields.append(VARIABLE_PATTERN.sub(suffix, field_string))
+        for key, value in variables.items():
+            batched_variables[f"{key}{index}"] = value
+
+    batched_query_string = f"query {name}Batch"
+    if batched_definitions:
+        batched_query_string += f"({', '.join(batched_definitions)})"
+    batched_query_string += " {\n" + "\n".join(batched_fields) + "\n}\n"
+
+    return batched_query_string, batched_variables, aliases
+
+
+def split_batched_data(data, field, aliases, errors=None):
+    """Splits the data member of an aliased query response into one
+    result per alias, each shaped like the response of the original
+    query. The result is None for an alias which is null, missing, or
+    the path of which has an error.
+    """
+    data = data or {}
+    failed_aliases = {error["path"][0] for error in errors or [] if error.get("path")}
+    return [
+        (
+            {field: data[alias]}
+            if data.get(alias) is not None and alias not in failed_aliases
+            else None
+        )
+        for alias in aliases
+    ]
+
+
+def post_batch(query_string, batch, session=None):
+    """Posts the query for each set of variables of the batch in one
+    aliased query document, and returns the response text, and the
+    alias of each set.
+    """
+    batched_query_string, batched_variables, aliases = build_batched_query(
+        query_string, batch
+    )
+    return post_request(batched_query_string, batched_variables, session), aliases
+
+
+def post_batched_queries(
+    query_string,
+    variables_list,
+    session=None,
+    initial_batch_size=INITIAL_BATCH_SIZE,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_response_bytes=MAX_RESPONSE_BYTES,
+    max_workers=1,
+):
+    """Posts the query for each set of variables using aliased query
+    documents, sizing each batch so that its response stays below the
+    maximum number of bytes, given the number of bytes per entity
+    observed in the last response. The first batch is posted alone,
+    then up to max_workers batches are posted concurrently, submitting
+    no more than the adaptive limit of requests in flight allows.
+
+    Yields the index of each set of variables and its result, in order,
+    or None if the result of the set failed, so that it can be retried.
+    """
+    field = parse_query(query_string)[2]
+    limiter = get_limiter(UPSTREAM)
+    batch_size = min(initial_batch_size, max_batch_size)
+    start = 0
+    next_index = 0
+    sized = False
+    pending = {}
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while next_index < len(variables_list):
+            max_pending = min(max_workers, int(limiter.limit)) if sized else 1
+            while start < len(variables_list) and len(pending) < max_pending:
+                batch = variables_list[start : start + batch_size]
+                future = executor.submit(post_batch, query_string, batch, session)
+                pending[future] = start
+                start += len(batch)
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_start = pending.pop(future)
+                text, aliases = future.result()
+                response = json.loads(text)
+                for index, result in enumerate(
+                    split_batched_data(
+                        response.get("data"),
+                        field,
+                        aliases,
+                        response.get("errors"),
+                    )
+                ):
+                    results[batch_start + index] = result
+
+                sized = True
+                bytes_per_entity = max(len(text) / len(aliases), 1)
+                batch_size = int(max_response_bytes // bytes_per_entity)
+                batch_size = max(1, min(batch_size, max_batch_size))
+
+            while next_index in results:
+                yield next_index, results.pop(next_index)
+                next_index += 1
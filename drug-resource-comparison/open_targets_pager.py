@@ -0,0 +1,140 @@
+import json
+import os
+from pathlib import Path
+import re
+
+from open_targets_api import post_query
+from open_targets_batch import find_closing_brace, parse_query
+
+# Number of rows requested per page
+PAGE_SIZE = 500
+
+# Cursor paginated connections which do not accept a size argument
+UNSIZED_CONNECTIONS = {"literatureOcurrences"}
+
+
+def extract_selection(query_string, field):
+    """Returns the selection set, including braces, of the first
+    occurrence of the field in the query string.
+    """
+    match = re.search(rf"\b{field}\b\s*(\([^)]*\))?\s*\{{", query_string)
+    if match is None:
+        raise ValueError(f"Could not find field {field} in query string")
+    stop = find_closing_brace(query_string, match.end() - 1)
+    return query_string[match.end() - 1 : stop + 1]
+
+
+def build_page_query(query_string, connection, pagination):
+    """Builds a query which requests one page of rows of the
+    connection of the root field of the query string, selecting the
+    same row fields. Pagination is either "page", using an index and
+    size, or "cursor", using a cursor and, if supported, a size.
+    """
+    name, definitions, field, arguments, selection = parse_query(query_string)
+    rows = extract_selection(extract_selection(selection, connection), "rows")
+    if pagination == "page":
+        page_definitions = "$index: Int!, $size: Int!"
+        page_arguments = "page: {index: $index, size: $size}"
+        page_fields = "count"
+    elif connection in UNSIZED_CONNECTIONS:
+        page_definitions = "$cursor: String"
+        page_arguments = "cursor: $cursor"
+        page_fields = "count cursor"
+    else:
+        page_definitions = "$cursor: String, $size: Int"
+        page_arguments = "cursor: $cursor, size: $size"
+        page_fields = "count cursor"
+    if definitions != "":
+        page_definitions = f"{definitions}, {page_definitions}"
+    return f"""
+query {name}{connection[0].upper()}{connection[1:]}Page({page_definitions}) {{
+  {field}{arguments} {{
+    {connection}({page_arguments}) {{
+      {page_fields}
+      rows {rows}
+    }}
+  }}
+}}
+"""
+
+
+def read_state(state_path):
+    """Reads the pagination state, or returns the initial state if
+    none has been written.
+    """
+    if not state_path.exists():
+        return {"index": 0, "cursor": None, "offset": 0, "rows": 0, "done": False}
+    with open(state_path, "r") as fp:
+        return json.load(fp)
+
+
+def write_state(state_path, state):
+    """Writes the pagination state atomically."""
+    temp_path = state_path.with_suffix(state_path.suffix + ".tmp")
+    with open(temp_path, "w") as fp:
+        json.dump(state, fp)
+    os.replace(temp_path, state_path)
+
+
+def stream_connection(
+    query_string,
+    connection,
+    pagination,
+    variables,
+    ndjson_path,
+    force=False,
+    page_size=PAGE_SIZE,
+    session=None,
+):
+    """Fetches every page of rows of the connection of the root field
+    of the query string, appending each row to an NDJSON file as its
+    page arrives. The index or cursor of the next page, and the size of
+    the file after the last complete page, are recorded in a state file
+    so that an interrupted run resumes from the next page.
+
+    Returns the number of rows written.
+    """
+    ndjson_path = Path(ndjson_path)
+    state_path = ndjson_path.with_suffix(ndjson_path.suffix + ".state")
+    if force:
+        state_path.unlink(missing_ok=True)
+    state = read_state(state_path)
+    if state["done"]:
+        return state["rows"]
+
+    field = parse_query(query_string)[2]
+    page_query_string = build_page_query(query_string, connection, pagination)
+    mode = "r+" if ndjson_path.exists() else "w"
+    with open(ndjson_path, mode) as fp:
+        # Discard rows from any page written after the last saved state
+        fp.seek(state["offset"])
+        fp.truncate()
+
+        while not state["done"]:
+            page_variables = dict(variables)
+            if pagination == "page":
+                page_variables["index"] = state["index"]
+                page_variables["size"] = page_size
+            else:
+                page_variables["cursor"] = state["cursor"]
+                if connection not in UNSIZED_CONNECTIONS:
+                    page_variables["size"] = page_size
+
+            data = post_query(page_query_string, page_variables, session=session)
+            page = ((data or {}).get(field) or {}).get(connection) or {}
+            rows = page.get("rows") or []
+            for row in rows:
+                fp.write(json.dumps(row) + "\n")
+            fp.flush()
+
+            state["rows"] += len(rows)
+            state["offset"] = fp.tell()
+            if pagination == "page":
+                state["index"] += 1
+                state["done"] = len(rows) == 0 or state["rows"] >= page["count"]
+            else:
+                state["cursor"] = page.get("cursor")
+                state["done"] = len(rows) == 0 or state["cursor"] is None
+            write_state(state_path, state)
+
+    return state["rows"]
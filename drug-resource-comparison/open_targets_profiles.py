@@ -0,0 +1,427 @@
+# Projection profiles of each Open Targets entity type, from which
+# queries are built: the dotted path of each field selected, in order.
+# The full profiles select the fields the utilities have always
+# requested, and the gget profiles the fields of the gget opentargets
+# resources, while the ids profiles select only ids, names, and scores.
+# See: https://api.platform.opentargets.org/api/v4/graphql/browser
+TARGET_PROFILES = {
+    "full": [
+        "id",
+        "approvedSymbol",
+        "approvedName",
+        "transcriptIds",
+        "associatedDiseases.rows.disease.id",
+        "associatedDiseases.rows.disease.name",
+        "associatedDiseases.rows.disease.description",
+        "associatedDiseases.rows.disease.dbXRefs",
+        "associatedDiseases.rows.score",
+        "proteinIds.id",
+        "proteinIds.source",
+        "knownDrugs.rows.drugId",
+        "knownDrugs.rows.prefName",
+        "knownDrugs.rows.drugType",
+        "knownDrugs.rows.targetClass",
+        "knownDrugs.rows.mechanismOfAction",
+        "knownDrugs.rows.drug.description",
+        "knownDrugs.rows.drug.synonyms",
+        "knownDrugs.rows.drug.tradeNames",
+        "knownDrugs.rows.drug.isApproved",
+        "knownDrugs.rows.diseaseId",
+        "knownDrugs.rows.disease.name",
+        "knownDrugs.rows.disease.description",
+        "knownDrugs.rows.disease.dbXRefs",
+        "knownDrugs.rows.phase",
+        "knownDrugs.rows.status",
+        "knownDrugs.rows.ctIds",
+        "tep.description",
+        "tep.name",
+        "tep.therapeuticArea",
+        "tep.uri",
+        "pathways.pathwayId",
+        "pathways.pathway",
+        "pathways.topLevelTerm",
+        "geneOntology.geneProduct",
+        "geneOntology.source",
+        "geneOntology.aspect",
+        "geneOntology.evidence",
+        "geneOntology.term.id",
+        "geneOntology.term.name",
+        "tractability.label",
+        "tractability.modality",
+        "tractability.value",
+        "targetClass.id",
+        "targetClass.level",
+        "targetClass.label",
+    ],
+    "ids": [
+        "id",
+        "approvedSymbol",
+        "associatedDiseases.rows.disease.id",
+        "associatedDiseases.rows.score",
+        "knownDrugs.rows.drugId",
+        "knownDrugs.rows.diseaseId",
+        "knownDrugs.rows.phase",
+    ],
+    "gget-target": [
+        "id",
+        "dbXrefs.id",
+        "dbXrefs.source",
+        "proteinIds.id",
+        "proteinIds.source",
+        "transcriptIds",
+        "approvedSymbol",
+        "approvedName",
+        "associatedDiseases.count",
+        "associatedDiseases.rows.score",
+        "associatedDiseases.rows.disease.id",
+        "associatedDiseases.rows.disease.description",
+        "associatedDiseases.rows.disease.dbXRefs",
+        "associatedDiseases.rows.disease.name",
+        "knownDrugs.count",
+        "knownDrugs.rows.phase",
+        "knownDrugs.rows.status",
+        "knownDrugs.rows.drugId",
+        "knownDrugs.rows.drugType",
+        "knownDrugs.rows.diseaseId",
+        "knownDrugs.rows.approvedSymbol",
+        "knownDrugs.rows.ctIds",
+        "knownDrugs.rows.approvedName",
+        "knownDrugs.rows.mechanismOfAction",
+        "knownDrugs.rows.drug.id",
+        "knownDrugs.rows.drug.description",
+        "knownDrugs.rows.drug.maximumClinicalTrialPhase",
+        "knownDrugs.rows.drug.isApproved",
+        "knownDrugs.rows.drug.synonyms",
+        "knownDrugs.rows.drug.tradeNames",
+        "knownDrugs.rows.drug.name",
+        "knownDrugs.rows.drug.indications.count",
+        "knownDrugs.rows.drug.indications.rows.maxPhaseForIndication",
+        "knownDrugs.rows.drug.indications.rows.references.source",
+        "knownDrugs.rows.drug.indications.rows.references.ids",
+        "interactions.count",
+        "interactions.rows.count",
+        "interactions.rows.score",
+        "interactions.rows.sourceDatabase",
+        "interactions.rows.targetA.proteinIds.id",
+        "interactions.rows.targetA.id",
+        "interactions.rows.targetA.approvedSymbol",
+        "interactions.rows.intABiologicalRole",
+        "interactions.rows.speciesA.taxonId",
+        "interactions.rows.targetB.proteinIds.id",
+        "interactions.rows.targetB.id",
+        "interactions.rows.targetB.approvedSymbol",
+        "interactions.rows.intBBiologicalRole",
+        "interactions.rows.speciesB.taxonId",
+        "interactions.rows.evidences.pubmedId",
+        "interactions.rows.evidences.evidenceScore",
+        "pharmacogenomics.variantRsId",
+        "pharmacogenomics.genotypeId",
+        "pharmacogenomics.genotype",
+        "pharmacogenomics.variantFunctionalConsequenceId",
+        "pharmacogenomics.variantFunctionalConsequence.label",
+        "pharmacogenomics.drugs.drugId",
+        "pharmacogenomics.drugs.drugFromSource",
+        "pharmacogenomics.drugs.drug.name",
+        "pharmacogenomics.phenotypeText",
+        "pharmacogenomics.genotypeAnnotationText",
+        "pharmacogenomics.pgxCategory",
+        "pharmacogenomics.isDirectTarget",
+        "pharmacogenomics.evidenceLevel",
+        "pharmacogenomics.datasourceId",
+        "pharmacogenomics.literature",
+        "pharmacogenomics.haplotypeFromSourceId",
+        "pharmacogenomics.targetFromSourceId",
+        "pharmacogenomics.studyId",
+        "pharmacogenomics.datatypeId",
+        "pharmacogenomics.phenotypeFromSourceId",
+        "pharmacogenomics.variantId",
+        "pharmacogenomics.haplotypeId",
+        "tractability.label",
+        "tractability.modality",
+        "tractability.value",
+        "expressions.tissue.id",
+        "expressions.tissue.label",
+        "expressions.tissue.anatomicalSystems",
+        "expressions.tissue.organs",
+        "expressions.rna.zscore",
+        "expressions.rna.value",
+        "expressions.rna.unit",
+        "expressions.rna.level",
+        "depMapEssentiality.screens.depmapId",
+        "depMapEssentiality.screens.expression",
+        "depMapEssentiality.screens.geneEffect",
+        "depMapEssentiality.screens.cellLineName",
+        "depMapEssentiality.screens.diseaseCellLineId",
+        "depMapEssentiality.screens.diseaseFromSource",
+        "depMapEssentiality.screens.mutation",
+        "depMapEssentiality.tissueId",
+        "depMapEssentiality.tissueName",
+    ],
+    "gget-diseases": [
+        "id",
+        "associatedDiseases.count",
+        "associatedDiseases.rows.score",
+        "associatedDiseases.rows.disease.id",
+        "associatedDiseases.rows.disease.description",
+        "associatedDiseases.rows.disease.dbXRefs",
+        "associatedDiseases.rows.disease.name",
+    ],
+    "gget-drugs": [
+        "id",
+        "knownDrugs.count",
+        "knownDrugs.rows.phase",
+        "knownDrugs.rows.status",
+        "knownDrugs.rows.drugId",
+        "knownDrugs.rows.drugType",
+        "knownDrugs.rows.diseaseId",
+        "knownDrugs.rows.approvedSymbol",
+        "knownDrugs.rows.ctIds",
+        "knownDrugs.rows.approvedName",
+        "knownDrugs.rows.mechanismOfAction",
+        "knownDrugs.rows.drug.id",
+        "knownDrugs.rows.drug.description",
+        "knownDrugs.rows.drug.maximumClinicalTrialPhase",
+        "knownDrugs.rows.drug.isApproved",
+        "knownDrugs.rows.drug.synonyms",
+        "knownDrugs.rows.drug.tradeNames",
+        "knownDrugs.rows.drug.name",
+        "knownDrugs.rows.drug.indications.count",
+        "knownDrugs.rows.drug.indications.rows.maxPhaseForIndication",
+        "knownDrugs.rows.drug.indications.rows.references.source",
+        "knownDrugs.rows.drug.indications.rows.references.ids",
+    ],
+    "gget-interactions": [
+        "id",
+        "interactions.count",
+        "interactions.rows.count",
+        "interactions.rows.score",
+        "interactions.rows.sourceDatabase",
+        "interactions.rows.targetA.proteinIds.id",
+        "interactions.rows.targetA.id",
+        "interactions.rows.targetA.approvedSymbol",
+        "interactions.rows.intABiologicalRole",
+        "interactions.rows.speciesA.taxonId",
+        "interactions.rows.targetB.proteinIds.id",
+        "interactions.rows.targetB.id",
+        "interactions.rows.targetB.approvedSymbol",
+        "interactions.rows.intBBiologicalRole",
+        "interactions.rows.speciesB.taxonId",
+        "interactions.rows.evidences.pubmedId",
+        "interactions.rows.evidences.evidenceScore",
+    ],
+    "gget-pharmacogenetics": [
+        "id",
+        "pharmacogenomics.variantRsId",
+        "pharmacogenomics.genotypeId",
+        "pharmacogenomics.genotype",
+        "pharmacogenomics.variantFunctionalConsequenceId",
+        "pharmacogenomics.variantFunctionalConsequence.label",
+        "pharmacogenomics.drugs.drugId",
+        "pharmacogenomics.drugs.drugFromSource",
+        "pharmacogenomics.drugs.drug.name",
+        "pharmacogenomics.phenotypeText",
+        "pharmacogenomics.genotypeAnnotationText",
+        "pharmacogenomics.pgxCategory",
+        "pharmacogenomics.isDirectTarget",
+        "pharmacogenomics.evidenceLevel",
+        "pharmacogenomics.datasourceId",
+        "pharmacogenomics.literature",
+        "pharmacogenomics.haplotypeFromSourceId",
+        "pharmacogenomics.targetFromSourceId",
+        "pharmacogenomics.studyId",
+        "pharmacogenomics.datatypeId",
+        "pharmacogenomics.phenotypeFromSourceId",
+        "pharmacogenomics.variantId",
+        "pharmacogenomics.haplotypeId",
+    ],
+    "gget-tractability": [
+        "id",
+        "tractability.label",
+        "tractability.modality",
+        "tractability.value",
+    ],
+    "gget-expression": [
+        "id",
+        "expressions.tissue.id",
+        "expressions.tissue.label",
+        "expressions.tissue.anatomicalSystems",
+        "expressions.tissue.organs",
+        "expressions.rna.zscore",
+        "expressions.rna.value",
+        "expressions.rna.unit",
+        "expressions.rna.level",
+    ],
+    "gget-depmap": [
+        "id",
+        "depMapEssentiality.screens.depmapId",
+        "depMapEssentiality.screens.expression",
+        "depMapEssentiality.screens.geneEffect",
+        "depMapEssentiality.screens.cellLineName",
+        "depMapEssentiality.screens.diseaseCellLineId",
+        "depMapEssentiality.screens.diseaseFromSource",
+        "depMapEssentiality.screens.mutation",
+        "depMapEssentiality.tissueId",
+        "depMapEssentiality.tissueName",
+    ],
+}
+
+DISEASE_PROFILES = {
+    "full": [
+        "directLocationIds",
+        "id",
+        "descendants",
+        "obsoleteTerms",
+        "description",
+        "dbXRefs",
+        "indirectLocationIds",
+        "synonyms.relation",
+        "synonyms.terms",
+        "ancestors",
+        "name",
+        "therapeuticAreas.id",
+        "therapeuticAreas.name",
+        "parents.id",
+        "parents.name",
+        "children.id",
+        "children.name",
+        "directLocations.id",
+        "directLocations.name",
+        "indirectLocations.id",
+        "indirectLocations.name",
+        "similarEntities.id",
+        "similarEntities.category",
+        "similarEntities.score",
+        "literatureOcurrences.rows.pmid",
+        "literatureOcurrences.rows.pmcid",
+        "literatureOcurrences.rows.publicationDate",
+        "literatureOcurrences.rows.sentences.section",
+        "literatureOcurrences.rows.sentences.matches.mappedId",
+        "literatureOcurrences.rows.sentences.matches.matchedLabel",
+        "literatureOcurrences.rows.sentences.matches.sectionStart",
+        "literatureOcurrences.rows.sentences.matches.sectionEnd",
+        "literatureOcurrences.rows.sentences.matches.startInSentence",
+        "literatureOcurrences.rows.sentences.matches.endInSentence",
+        "literatureOcurrences.rows.sentences.matches.matchedType",
+        "isTherapeuticArea",
+        "phenotypes.rows.phenotypeHPO.id",
+        "phenotypes.rows.phenotypeEFO.id",
+        "otarProjects.otarCode",
+        "otarProjects.status",
+        "otarProjects.reference",
+        "otarProjects.integratesInPPP",
+        "otarProjects.projectName",
+        "knownDrugs.rows.drugId",
+        "associatedTargets.rows.datatypeScores.id",
+        "associatedTargets.rows.datasourceScores.id",
+        "associatedTargets.rows.score",
+        "associatedTargets.rows.target.id",
+    ],
+    "ids": [
+        "id",
+        "name",
+        "associatedTargets.rows.target.id",
+        "associatedTargets.rows.score",
+        "knownDrugs.rows.drugId",
+    ],
+}
+
+DRUG_PROFILES = {
+    "full": [
+        "id",
+        "description",
+        "blackBoxWarning",
+        "yearOfFirstApproval",
+        "maximumClinicalTrialPhase",
+        "drugType",
+        "crossReferences.reference",
+        "crossReferences.source",
+        "isApproved",
+        "synonyms",
+        "hasBeenWithdrawn",
+        "tradeNames",
+        "name",
+        "parentMolecule.id",
+        "childMolecules.id",
+        "approvedIndications",
+        "drugWarnings.id",
+        "drugWarnings.efoIdForWarningClass",
+        "drugWarnings.references.id",
+        "drugWarnings.references.source",
+        "drugWarnings.references.url",
+        "drugWarnings.efoTerm",
+        "drugWarnings.description",
+        "drugWarnings.country",
+        "drugWarnings.efoId",
+        "drugWarnings.warningType",
+        "drugWarnings.year",
+        "drugWarnings.toxicityClass",
+        "similarEntities.id",
+        "similarEntities.category",
+        "similarEntities.score",
+        "literatureOcurrences.rows.pmid",
+        "literatureOcurrences.rows.pmcid",
+        "literatureOcurrences.rows.publicationDate",
+        "literatureOcurrences.rows.sentences.section",
+        "literatureOcurrences.rows.sentences.matches.mappedId",
+        "literatureOcurrences.rows.sentences.matches.matchedLabel",
+        "literatureOcurrences.rows.sentences.matches.sectionStart",
+        "literatureOcurrences.rows.sentences.matches.sectionEnd",
+        "literatureOcurrences.rows.sentences.matches.startInSentence",
+        "literatureOcurrences.rows.sentences.matches.endInSentence",
+        "literatureOcurrences.rows.sentences.matches.matchedType",
+        "mechanismsOfAction.rows.references.urls",
+        "mechanismsOfAction.rows.references.source",
+        "mechanismsOfAction.rows.references.ids",
+        "mechanismsOfAction.rows.targetName",
+        "mechanismsOfAction.rows.actionType",
+        "mechanismsOfAction.rows.mechanismOfAction",
+        "indications.rows.maxPhaseForIndication",
+        "indications.rows.references.source",
+        "indications.rows.references.ids",
+        "indications.rows.disease.id",
+        "knownDrugs.rows.drugId",
+        "adverseEvents.rows.logLR",
+        "adverseEvents.rows.count",
+        "adverseEvents.rows.meddraCode",
+        "adverseEvents.rows.name",
+        "pharmacogenomics.isDirectTarget",
+        "pharmacogenomics.genotypeAnnotationText",
+        "pharmacogenomics.haplotypeFromSourceId",
+        "pharmacogenomics.phenotypeText",
+        "pharmacogenomics.pgxCategory",
+        "pharmacogenomics.genotypeId",
+        "pharmacogenomics.targetFromSourceId",
+        "pharmacogenomics.studyId",
+        "pharmacogenomics.literature",
+        "pharmacogenomics.variantRsId",
+        "pharmacogenomics.datatypeId",
+        "pharmacogenomics.variantFunctionalConsequenceId",
+        "pharmacogenomics.phenotypeFromSourceId",
+        "pharmacogenomics.evidenceLevel",
+        "pharmacogenomics.datasourceId",
+        "pharmacogenomics.variantId",
+        "pharmacogenomics.genotype",
+        "pharmacogenomics.haplotypeId",
+        "pharmacogenomics.variantFunctionalConsequence.id",
+        "pharmacogenomics.variantFunctionalConsequence.label",
+        "pharmacogenomics.target.id",
+        "pharmacogenomics.drugs.drugId",
+        "linkedDiseases.rows.id",
+        "linkedTargets.rows.id",
+    ],
+    "ids": [
+        "id",
+        "name",
+        "indications.rows.disease.id",
+        "indications.rows.maxPhaseForIndication",
+        "knownDrugs.rows.drugId",
+        "linkedTargets.rows.id",
+        "linkedDiseases.rows.id",
+    ],
+}
+
+PROFILES = {
+    "target": TARGET_PROFILES,
+    "disease": DISEASE_PROFILES,
+    "drug": DRUG_PROFILES,
+}
@@ -0,0 +1,76 @@
+from open_targets_profiles import PROFILES
+
+# Argument, and its type, by which the root field of each entity type
+# is queried
+ENTITY_ARGUMENTS = {
+    "target": ("ensemblId", "String!"),
+    "disease": ("efoId", "String!"),
+    "drug": ("chemblId", "String!"),
+}
+
+# Indentation of each level of the generated query
+INDENT = "  "
+
+
+def build_tree(projection):
+    """Returns the fields of the projection, a list of dotted field
+    paths, as a tree of nested dictionaries, keeping the order in which
+    fields first appear.
+    """
+    tree = {}
+    for path in projection:
+        node = tree
+        for field in path.split("."):
+            node = node.setdefault(field, {})
+    return tree
+
+
+def format_selection(tree, depth):
+    """Returns the lines selecting each field of the tree, with a
+    nested selection set for each field with fields.
+    """
+    lines = []
+    for field, subtree in tree.items():
+        if subtree:
+            lines.append(f"{INDENT * depth}{field} {{")
+            lines.extend(format_selection(subtree, depth + 1))
+            lines.append(f"{INDENT * depth}}}")
+        else:
+            lines.append(f"{INDENT * depth}{field}")
+    return lines
+
+
+def build_query(entity, projection, name=None):
+    """Returns a GraphQL query of the entity type, named by the entity
+    type unless given a name, selecting only the fields of the
+    projection.
+    """
+    argument, argument_type = ENTITY_ARGUMENTS[entity]
+    lines = [
+        f"query {name or entity}(${argument}: {argument_type}) {{",
+        f"{INDENT}{entity}({argument}: ${argument}) {{",
+    ]
+    lines.extend(format_selection(build_tree(projection), 2))
+    lines.extend([f"{INDENT}}}", "}"])
+    return "\n" + "\n".join(lines) + "\n"
+
+
+def get_profile_query(entity, profile):
+    """Returns the GraphQL query of the entity type selecting the fields
+    of the named projection profile.
+    """
+    if profile not in PROFILES[entity]:
+        raise ValueError(f"Unknown Open Targets {entity} profile {profile}")
+    return build_query(entity, PROFILES[entity][profile])
+
+
+def get_profile_connections(connections, entity, profile):
+    """Returns the paginated connections, and how each is paginated,
+    whose rows are selected by the named projection profile.
+    """
+    tree = build_tree(PROFILES[entity][profile])
+    return {
+        connection: pagination
+        for connection, pagination in connections.items()
+        if (tree.get(connection) or {}).get("rows")
+    }
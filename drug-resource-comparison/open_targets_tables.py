@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import os
+from pathlib import Path
+import time
+
+from optional_imports import import_optional
+from output_formats import OUTPUT_FORMATS, read_results
+
+RESULTS_DIR = "../results"
+TABLES_DIR = "../results/open-targets-tables"
+
+# Number of targets normalized into each record batch
+BATCH_SIZE = 500
+
+# Suffix of the name of the target results of each gene, before the
+# suffix of its output format
+TARGET_SUFFIX = "-open-targets-target"
+
+# Tables of the target query: the path of the nested connection or
+# list in the target, or None for the target itself, and the name of
+# the Arrow type of each column, named by its dotted path in each row,
+# flattened with underscores. Each table is keyed by a target_id
+# column.
+TARGET_TABLES = {
+    "targets": (
+        None,
+        {
+            "approvedSymbol": "string",
+            "approvedName": "string",
+            "transcriptIds": "list<string>",
+        },
+    ),
+    "associated_diseases": (
+        "associatedDiseases.rows",
+        {
+            "disease.id": "string",
+            "disease.name": "string",
+            "disease.description": "string",
+            "disease.dbXRefs": "list<string>",
+            "score": "float64",
+        },
+    ),
+    "protein_ids": (
+        "proteinIds",
+        {
+            "id": "string",
+            "source": "string",
+        },
+    ),
+    "known_drugs": (
+        "knownDrugs.rows",
+        {
+            "drugId": "string",
+            "prefName": "string",
+            "drugType": "string",
+            "targetClass": "list<string>",
+            "mechanismOfAction": "string",
+            "drug.description": "string",
+            "drug.synonyms": "list<string>",
+            "drug.tradeNames": "list<string>",
+            "drug.isApproved": "bool",
+            "diseaseId": "string",
+            "disease.name": "string",
+            "disease.description": "string",
+            "disease.dbXRefs": "list<string>",
+            "phase": "float64",
+            "status": "string",
+            "ctIds": "list<string>",
+        },
+    ),
+    "tep": (
+        "tep",
+        {
+            "description": "string",
+            "name": "string",
+            "therapeuticArea": "string",
+            "uri": "string",
+        },
+    ),
+    "pathways": (
+        "pathways",
+        {
+            "pathwayId": "string",
+            "pathway": "string",
+            "topLevelTerm": "string",
+        },
+    ),
+    "gene_ontology": (
+        "geneOntology",
+        {
+            "geneProduct": "string",
+            "source": "string",
+            "aspect": "string",
+            "evidence": "string",
+            "term.id": "string",
+            "term.name": "string",
+        },
+    ),
+    "tractability": (
+        "tractability",
+        {
+            "label": "string",
+            "modality": "string",
+            "value": "bool",
+        },
+    ),
+    "target_class": (
+        "targetClass",
+        {
+            "id": "int64",
+            "level": "string",
+            "label": "string",
+        },
+    ),
+}
+
+
+# Connections of the target which may be paged to NDJSON files
+PAGED_CONNECTIONS = [
+    path[: -len(".rows")]
+    for path, _ in TARGET_TABLES.values()
+    if path is not None and path.endswith(".rows")
+]
+
+
+def import_pyarrow():
+    """Imports pyarrow, which normalizing and loading tables requires."""
+    return import_optional("pyarrow", "Normalizing Open Targets target tables")
+
+
+def get_arrow_type(type_name):
+    """Returns the Arrow type of the type name."""
+    pa = import_pyarrow()
+    if type_name == "list<string>":
+        return pa.list_(pa.string())
+    return pa.type_for_alias(type_name)
+
+
+def get_schema(columns):
+    """Returns the schema of a table: the target id, and each column,
+    flattened.
+    """
+    pa = import_pyarrow()
+    fields = [pa.field("target_id", pa.string())]
+    for column, type_name in columns.items():
+        fields.append(pa.field(column.replace(".", "_"), get_arrow_type(type_name)))
+    return pa.schema(fields)
+
+
+def get_value(value, path):
+    """Returns the value at the dotted path, or None if any part of the
+    path is missing.
+    """
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def get_rows(target, path):
+    """Returns the rows of the nested connection or list of the target
+    at the path, the target itself if the path is None, or a nested
+    object as a single row.
+    """
+    if path is None:
+        return [target]
+    rows = get_value(target, path)
+    if rows is None:
+        return []
+    if isinstance(rows, dict):
+        return [rows]
+    return rows
+
+
+def build_batch(targets, columns, schema):
+    """Returns a record batch of the rows of the targets."""
+    values = {"target_id": []}
+    values.update({column: [] for column in columns})
+    for target, rows in targets:
+        for row in rows:
+            values["target_id"].append(target["id"])
+            for column in columns:
+                values[column].append(get_value(row, column))
+    pa = import_pyarrow()
+    arrays = [pa.array(values["target_id"], pa.string())]
+    for column, type_name in columns.items():
+        arrays.append(pa.array(values[column], get_arrow_type(type_name)))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def find_target_results(results_dir=RESULTS_DIR):
+    """Returns the path and output format of the target results of each
+    gene, in any output format, preferring formats in the order in
+    which they are listed.
+    """
+    found = {}
+    for output_format, suffix in OUTPUT_FORMATS.items():
+        for results_path in Path(results_dir).glob(f"*{TARGET_SUFFIX}{suffix}"):
+            stem = results_path.name[: -len(suffix)]
+            found.setdefault(stem, (results_path, output_format))
+    return [found[stem] for stem in sorted(found)]
+
+
+def read_paged_rows(results_path, output_format):
+    """Returns the rows of each connection of the target paged
+    completely to an NDJSON file beside the target results, keyed by
+    connection.
+    """
+    results_path = Path(results_path)
+    stem = results_path.name[: -len(OUTPUT_FORMATS[output_format])]
+    paged_rows = {}
+    for connection in PAGED_CONNECTIONS:
+        ndjson_path = results_path.parent / f"{stem}-{connection}.ndjson"
+        state_path = ndjson_path.with_suffix(".ndjson.state")
+        if not ndjson_path.exists() or not state_path.exists():
+            continue
+        with open(state_path, "r") as fp:
+            if not json.load(fp)["done"]:
+                continue
+        with open(ndjson_path, "r") as fp:
+            paged_rows[connection] = [json.loads(line) for line in fp]
+    return paged_rows
+
+
+def read_targets(target_results):
+    """Yields the target of the target results file, in its output
+    format, of each gene, with the rows of each connection replaced by
+    every row paged, if paged completely, skipping files without a
+    target.
+    """
+    for results_path, output_format in target_results:
+        target = (read_results(results_path, output_format) or {}).get("target")
+        if target is None:
+            print(f"Found no Open Targets target in {results_path}")
+            continue
+        for connection, rows in read_paged_rows(results_path, output_format).items():
+            target[connection] = {**(target.get(connection) or {}), "rows": rows}
+        yield target
+
+
+def normalize_targets(target_results, tables_dir=TABLES_DIR, parquet=False):
+    """Flattens each nested connection or list of the targets of the
+    target results files, each a path and output format, into a typed
+    table, keyed by target id, written as an uncompressed Arrow file,
+    for memory mapped reads, and optionally as a Parquet file. Targets
+    are normalized in batches, so that only one batch is held in
+    memory. Returns the number of rows of each table.
+    """
+    pa = import_pyarrow()
+    pq = import_optional("pyarrow.parquet", "Normalizing Open Targets target tables")
+
+    start_time = time.time()
+    print(f"Normalizing {len(target_results)} Open Targets targets into {tables_dir}")
+
+    tables_dir = Path(tables_dir)
+    tables_dir.mkdir(parents=True, exist_ok=True)
+    schemas = {
+        name: get_schema(columns) for name, (_, columns) in TARGET_TABLES.items()
+    }
+    writers = {}
+    for name, schema in schemas.items():
+        temp_path = tables_dir / f"{name}.arrow.tmp"
+        writers[name] = pa.ipc.new_file(str(temp_path), schema)
+    row_counts = {name: 0 for name in TARGET_TABLES}
+
+    def write_batch(batch_targets):
+        for name, (path, columns) in TARGET_TABLES.items():
+            batch = build_batch(
+                [(target, get_rows(target, path)) for target in batch_targets],
+                columns,
+                schemas[name],
+            )
+            writers[name].write_batch(batch)
+            row_counts[name] += batch.num_rows
+
+    batch_targets = []
+    for target in read_targets(target_results):
+        batch_targets.append(target)
+        if len(batch_targets) == BATCH_SIZE:
+            write_batch(batch_targets)
+            batch_targets = []
+    if batch_targets:
+        write_batch(batch_targets)
+
+    for name, writer in writers.items():
+        writer.close()
+        table_path = tables_dir / f"{name}.arrow"
+        os.replace(tables_dir / f"{name}.arrow.tmp", table_path)
+        if parquet:
+            temp_path = tables_dir / f"{name}.parquet.tmp"
+            pq.write_table(load_table(table_path), temp_path, compression="zstd")
+            os.replace(temp_path, tables_dir / f"{name}.parquet")
+
+    stop_time = time.time()
+    print(
+        f"Normalized Open Targets targets into {', '.join(f'{count} {name}' for name, count in row_counts.items())} rows in {stop_time - start_time} seconds"
+    )
+
+    return row_counts
+
+
+def load_table(table_path):
+    """Loads an Arrow file through a memory map, without copying."""
+    pa = import_pyarrow()
+    source = pa.memory_map(str(table_path), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_target_tables(tables_dir=TABLES_DIR):
+    """Loads each normalized target table, keyed by name, through a
+    memory map.
+    """
+    return {
+        name: load_table(Path(tables_dir) / f"{name}.arrow") for name in TARGET_TABLES
+    }
+
+
+def main():
+    """Normalizes the Open Targets target results of every gene into a
+    typed table for each nested connection or list, keyed by target
+    id.
+    """
+    parser = argparse.ArgumentParser(
+        description="Normalize Open Targets target results into typed tables"
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="also write each table as a Parquet file",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force update of existing tables",
+    )
+    args = parser.parse_args()
+
+    if not (Path(TABLES_DIR) / "targets.arrow").exists() or args.force:
+        normalize_targets(find_target_results(), parquet=args.parquet)
+
+    for name, table in load_target_tables().items():
+        print(f"{name}: {table.num_rows} rows")
+
+
+if __name__ == "__main__":
+    main()
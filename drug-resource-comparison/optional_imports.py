@@ -0,0 +1,20 @@
+import importlib
+
+# Package providing each optional module, where their names differ
+PACKAGES = {
+    "pyarrow.parquet": "pyarrow",
+}
+
+
+def import_optional(module_name, feature):
+    """Imports an optional dependency used only by the feature, or
+    raises an ImportError naming the package to install.
+    """
+    try:
+        return importlib.import_module(module_name)
+
+    except ImportError as exc:
+        package = PACKAGES.get(module_name, module_name)
+        raise ImportError(
+            f"{feature} requires the optional package {package}, install it with: pip install {package}"
+        ) from exc
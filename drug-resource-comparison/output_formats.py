@@ -0,0 +1,297 @@
+import gzip
+import io
+import json
+from pathlib import Path
+import threading
+import time
+
+from metrics import metrics
+from optional_imports import import_optional
+from results_store import store_file, store_json
+
+# Output formats, and the suffix of the results file of each
+OUTPUT_FORMATS = {
+    "json": ".json",
+    "compact": ".compact.json",
+    "ndjson": ".ndjson",
+    "ndjson.gz": ".ndjson.gz",
+    "ndjson.zst": ".ndjson.zst",
+    "parquet": ".parquet",
+}
+
+# Size of the chunks of text written when streaming
+CHUNK_CHARS = 1 << 16
+
+
+def add_output_format_argument(parser):
+    """Adds the output format option shared by all utilities."""
+    parser.add_argument(
+        "--output-format",
+        choices=list(OUTPUT_FORMATS),
+        default="json",
+        help="format of results files: indented JSON, compact JSON, NDJSON of rows, optionally gzip or zstd compressed, or Parquet of rows (default: json)",
+    )
+
+
+def get_results_path(results_path, output_format):
+    """Returns the results path, ending in ".json", with the suffix of
+    the output format. Parquet results are a directory of tables.
+    """
+    results_path = str(results_path)
+    if results_path.endswith(OUTPUT_FORMATS[output_format]):
+        return Path(results_path)
+    if results_path.endswith(".json"):
+        results_path = results_path[: -len(".json")]
+    return Path(results_path + OUTPUT_FORMATS[output_format])
+
+
+def find_results_format(results_path):
+    """Returns the output format in which the results, at the path
+    ending in ".json", were written, preferring formats in the order in
+    which they are listed, or None if there are no results.
+    """
+    for output_format in OUTPUT_FORMATS:
+        if get_results_path(results_path, output_format).exists():
+            return output_format
+    return None
+
+
+def is_rows(value):
+    """Returns True if the value is a row shaped section: a non-empty
+    list of objects.
+    """
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(isinstance(item, dict) for item in value)
+    )
+
+
+def split_rows(value, path=()):
+    """Returns the value with each row shaped section replaced by None,
+    and a list of the path, as a dotted string, and rows of each
+    section.
+    """
+    if is_rows(value):
+        return None, [(".".join(path), value)]
+    if isinstance(value, dict):
+        remainder = {}
+        sections = []
+        for key, member in value.items():
+            remainder[key], member_sections = split_rows(member, path + (str(key),))
+            sections.extend(member_sections)
+        return remainder, sections
+    return value, []
+
+
+def count_rows(results):
+    """Returns the number of rows in the row shaped sections of the
+    results.
+    """
+    return sum(len(rows) for _, rows in split_rows(results)[1])
+
+
+def join_rows(remainder, sections):
+    """Returns the results with the rows of each section restored at
+    its dotted path.
+    """
+    for section, rows in sections.items():
+        if section == "":
+            return rows
+        keys = section.split(".")
+        value = remainder
+        for key in keys[:-1]:
+            value = value[key]
+        value[keys[-1]] = rows
+    return remainder
+
+
+def open_text(path, output_format, mode="w"):
+    """Opens a text stream writing to, or reading from, the path,
+    compressed as the output format requires.
+    """
+    if output_format == "ndjson.gz":
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    if output_format == "ndjson.zst":
+        zstandard = import_optional("zstandard", "The ndjson.zst output format")
+
+        fp = open(path, f"{mode}b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(fp, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(fp, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_compact(results, temp_path):
+    """Writes the results as compact JSON, encoding in chunks rather
+    than as one string.
+    """
+    encoder = json.JSONEncoder(separators=(",", ":"))
+    with open(temp_path, "w", encoding="utf-8") as fp:
+        chunks = []
+        size = 0
+        for chunk in encoder.iterencode(results):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= CHUNK_CHARS:
+                fp.write("".join(chunks))
+                chunks = []
+                size = 0
+        fp.write("".join(chunks))
+
+
+def write_ndjson(results, temp_path, output_format):
+    """Writes the results as NDJSON, one row per line. The first line
+    holds the results with each row shaped section replaced by null,
+    and each following line holds the dotted path of its section, and
+    a row.
+    """
+    remainder, sections = split_rows(results)
+    with open_text(temp_path, output_format) as fp:
+        fp.write(json.dumps({"section": None, "value": remainder}) + "\n")
+        for section, rows in sections:
+            for row in rows:
+                fp.write(json.dumps({"section": section, "row": row}) + "\n")
+
+
+def is_nested(value):
+    """Returns True if the value is an object or array."""
+    return isinstance(value, (dict, list))
+
+
+def build_table(rows):
+    """Returns the rows as an Arrow table with the column types inferred
+    by Arrow, except that columns holding objects or arrays, or values
+    of types which Arrow cannot combine, hold JSON, and are named in
+    the table metadata so that they are decoded when read.
+    """
+    pa = import_optional("pyarrow", "The parquet output format")
+
+    keys = dict.fromkeys(key for row in rows for key in row)
+    arrays = {}
+    json_columns = []
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        if not any(is_nested(value) for value in values):
+            try:
+                arrays[key] = pa.array(values)
+                continue
+
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                pass
+
+        arrays[key] = pa.array(
+            [None if value is None else json.dumps(value) for value in values],
+            pa.string(),
+        )
+        json_columns.append(key)
+    return pa.table(arrays).replace_schema_metadata(
+        {"json_columns": json.dumps(json_columns)}
+    )
+
+
+def read_table(section_path):
+    """Returns the rows of a Parquet table, decoding the columns which
+    hold JSON.
+    """
+    pq = import_optional("pyarrow.parquet", "The parquet output format")
+
+    table = pq.read_table(section_path)
+    metadata = table.schema.metadata or {}
+    json_columns = json.loads(metadata.get(b"json_columns", b"[]"))
+    rows = table.to_pylist()
+    for row in rows:
+        for key in json_columns:
+            if row[key] is not None:
+                row[key] = json.loads(row[key])
+    return rows
+
+
+def write_parquet(results, results_path):
+    """Writes each row shaped section of the results as a Parquet table,
+    named by its section, in the results directory, and the remainder
+    as compact JSON.
+    """
+    pq = import_optional("pyarrow.parquet", "The parquet output format")
+
+    remainder, sections = split_rows(results)
+    results_path.mkdir(parents=True, exist_ok=True)
+    for section, rows in sections:
+        section_path = results_path / f"{section or '_'}.parquet"
+        temp_path = section_path.with_suffix(f".{threading.get_ident()}.tmp")
+        pq.write_table(build_table(rows), temp_path, compression="zstd")
+        store_file(temp_path, section_path)
+
+    remainder_path = results_path / "remainder.json"
+    temp_path = remainder_path.with_suffix(f".{threading.get_ident()}.tmp")
+    write_compact(remainder, temp_path)
+    store_file(temp_path, remainder_path)
+
+
+def get_written_bytes(results_path):
+    """Returns the size of the results file, or of every file in the
+    results directory.
+    """
+    if results_path.is_dir():
+        return sum(path.stat().st_size for path in results_path.iterdir())
+    return results_path.stat().st_size
+
+
+def write_results(results, results_path, output_format="json"):
+    """Writes the results in the output format, through the results
+    store, to the results path, ending in ".json", or the suffix of the
+    output format, records the time taken and bytes written, and
+    returns the path written.
+    """
+    start_time = time.time()
+    if output_format == "json":
+        results_path = Path(results_path)
+        store_json(results, results_path)
+
+    elif output_format == "parquet":
+        results_path = get_results_path(results_path, output_format)
+        write_parquet(results, results_path)
+
+    else:
+        results_path = get_results_path(results_path, output_format)
+        temp_path = results_path.with_suffix(f".{threading.get_ident()}.tmp")
+        if output_format == "compact":
+            write_compact(results, temp_path)
+
+        else:
+            write_ndjson(results, temp_path, output_format)
+        store_file(temp_path, results_path)
+
+    metrics.record_serialization(
+        output_format, time.time() - start_time, get_written_bytes(results_path)
+    )
+    return results_path
+
+
+def read_results(results_path, output_format="json"):
+    """Reads results written in the output format. Rows of Parquet
+    tables have a member for every column of their table, null if the
+    row had none.
+    """
+    results_path = get_results_path(results_path, output_format)
+    if output_format in ["json", "compact"]:
+        with open(results_path, "r") as fp:
+            return json.load(fp)
+
+    sections = {}
+    if output_format == "parquet":
+        with open(results_path / "remainder.json", "r") as fp:
+            remainder = json.load(fp)
+        for section_path in sorted(results_path.glob("*.parquet")):
+            section = section_path.name[: -len(".parquet")]
+            sections["" if section == "_" else section] = read_table(section_path)
+        return join_rows(remainder, sections)
+
+    with open_text(results_path, output_format, "r") as fp:
+        remainder = json.loads(fp.readline())["value"]
+        for line in fp:
+            record = json.loads(line)
+            sections.setdefault(record["section"], []).append(record["row"])
+    return join_rows(remainder, sections)
@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+
+from chembl_webresource_client.new_client import new_client
+
+from adaptive_concurrency import get_pool_size
+from chembl import CHUNK_SIZE, fetch_in_chunks, get_target_results
+from chembl_sqlite import SqliteClient
+from gget_cli import fetch_gget
+from http_transport import add_transport_arguments, create_session, install_transport
+from metrics import add_metrics_argument, install_request_metrics, metrics
+from ncats import fetch_substances
+from ncats_index import load_compound_index, lookup_compounds
+from open_targets import (
+    TARGET_QUERY_STRING,
+    fetch_target,
+    map_gene_symbols_to_ids,
+    read_gene_symbols,
+)
+from open_targets_api import UPSTREAM, post_query, set_response_cache
+from open_targets_pager import stream_connection
+from open_targets_query import get_profile_query
+from response_cache import ResponseCache, hash_key
+from results_store import store_json
+
+STATE_PATH = "../results/pipeline-state.json"
+
+# Filters of the ChEMBL lookups of each molecule of the activities of a
+# target
+CHEMBL_LOOKUPS = {
+    "drug": {"max_phase": 4},
+    "drug_indication": {"max_phase_for_ind": 4},
+    "molecule": {"max_phase": 4},
+}
+
+# Query of the drug record of each known drug, which is read only for
+# the drug name and indications
+DRUG_QUERY_STRING = get_profile_query("drug", "ids")
+
+
+def add_node(nodes, name, requires, outputs, definition, run):
+    """Adds a node to the pipeline: a stage which runs after the nodes
+    it requires, and writes its output files, listed, or returned by a
+    function, if they are known only once the stage has run. The
+    definition is any JSON serializable value which, if changed,
+    requires the stage to run again, such as its query string and
+    variables.
+    """
+    nodes[name] = {
+        "requires": requires,
+        "outputs": outputs,
+        "definition": definition,
+        "run": run,
+    }
+
+
+def get_outputs(node):
+    """Returns the paths of the output files of the node."""
+    outputs = node["outputs"]() if callable(node["outputs"]) else node["outputs"]
+    return [Path(output) for output in outputs]
+
+
+def sort_nodes(nodes):
+    """Returns the node names in an order in which each node follows
+    the nodes it requires, or raises a ValueError if a required node is
+    missing, or the nodes have a cycle.
+    """
+    order = []
+    visiting = set()
+    visited = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline has a cycle through node {name}")
+        if name not in nodes:
+            raise ValueError(f"Pipeline has no node {name}")
+        visiting.add(name)
+        for required in nodes[name]["requires"]:
+            visit(required)
+        visiting.remove(name)
+        visited.add(name)
+        order.append(name)
+
+    for name in nodes:
+        visit(name)
+    return order
+
+
+def get_output_key(node):
+    """Returns the hash of the content of the output files of the node,
+    or None if any is missing.
+    """
+    digest = hashlib.sha256()
+    for output in get_outputs(node):
+        if not output.exists():
+            return None
+        digest.update(hashlib.sha256(output.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def read_state(state_path):
+    """Reads the input and output key of each node last run, or returns
+    an empty state.
+    """
+    if not Path(state_path).exists():
+        return {}
+    with open(state_path, "r") as fp:
+        return json.load(fp)
+
+
+def write_state(state_path, state):
+    """Writes the state atomically."""
+    temp_path = Path(state_path).with_suffix(".json.tmp")
+    with open(temp_path, "w") as fp:
+        json.dump(state, fp, indent=4, sort_keys=True)
+    os.replace(temp_path, state_path)
+
+
+def run_pipeline(nodes, max_workers, force=False, state_path=STATE_PATH):
+    """Runs each node once the nodes it requires have completed, with
+    at most max_workers nodes running concurrently. A node runs only if
+    its definition, or the output of a node it requires, has changed
+    since it last ran, if any output is missing, or if forced. Nodes
+    requiring a node which failed are not run. Returns the names of the
+    nodes which failed or were not run.
+    """
+    start_time = time.time()
+    print(f"Running pipeline of {len(nodes)} nodes")
+
+    order = sort_nodes(nodes)
+    state = read_state(state_path)
+    output_keys = {}
+    failed_names = set()
+    run_count = 0
+
+    waiting = {name: set(nodes[name]["requires"]) for name in order}
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while waiting or futures:
+
+            # Skip or submit each node whose required nodes completed
+            for name in [n for n in order if n in waiting and not waiting[n]]:
+                del waiting[name]
+                node = nodes[name]
+                input_key = hash_key(
+                    node["definition"],
+                    [output_keys[required] for required in node["requires"]],
+                )
+                output_key = get_output_key(node)
+                node_state = state.get(name, {})
+                if (
+                    not force
+                    and output_key is not None
+                    and node_state.get("input_key") == input_key
+                    and node_state.get("output_key") == output_key
+                ):
+                    output_keys[name] = output_key
+                    for other in waiting.values():
+                        other.discard(name)
+                    continue
+
+                print(f"Running pipeline node {name}")
+                futures[executor.submit(node["run"])] = (name, input_key)
+
+            if not futures:
+                continue
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, input_key = futures.pop(future)
+                try:
+                    future.result()
+                    output_key = get_output_key(nodes[name])
+                    if output_key is None:
+                        raise RuntimeError("an output file is missing")
+                    output_keys[name] = output_key
+                    state[name] = {"input_key": input_key, "output_key": output_key}
+                    write_state(state_path, state)
+                    run_count += 1
+                    for other in waiting.values():
+                        other.discard(name)
+
+                except Exception as exc:
+                    print(f"Could not run pipeline node {name}: {exc}")
+                    failed_names.add(name)
+
+            # Drop nodes which require a failed node, and the nodes
+            # which require those
+            dropped = True
+            while dropped:
+                dropped = False
+                for other in list(waiting):
+                    if waiting[other] & failed_names:
+                        print(f"Not running pipeline node {other}")
+                        del waiting[other]
+                        failed_names.add(other)
+                        dropped = True
+
+    stop_time = time.time()
+    metrics.record_stage("pipeline", stop_time - start_time, run_count)
+    print(
+        f"Ran {run_count} pipeline nodes, skipping {len(nodes) - run_count - len(failed_names)} unchanged, with {len(failed_names)} failed or not run, in {stop_time - start_time} seconds"
+    )
+
+    return sorted(failed_names)
+
+
+def read_json(path):
+    """Reads the JSON file."""
+    with open(path, "r") as fp:
+        return json.load(fp)
+
+
+def add_chembl_nodes(nodes, gene_symbol, client, chunk_size, max_workers):
+    """Adds nodes for the ChEMBL target of the gene symbol, the
+    activities of the target, and the drug, drug indication, and
+    molecule lookups of the molecules of the activities.
+    """
+    stem = f"../results/{gene_symbol}-chembl"
+
+    def run_target():
+        store_json(get_target_results(client, gene_symbol), f"{stem}-target.json")
+
+    add_node(
+        nodes,
+        f"{gene_symbol}:chembl-target",
+        [],
+        [f"{stem}-target.json"],
+        ["chembl-target", gene_symbol],
+        run_target,
+    )
+
+    def run_activity():
+        target_results = read_json(f"{stem}-target.json")
+        activity_results = client.activity.filter(
+            target_chembl_id=target_results["target_chembl_id"]
+        )
+        store_json(list(activity_results), f"{stem}-activity.json")
+
+    add_node(
+        nodes,
+        f"{gene_symbol}:chembl-activity",
+        [f"{gene_symbol}:chembl-target"],
+        [f"{stem}-activity.json"],
+        ["chembl-activity"],
+        run_activity,
+    )
+
+    for name, filters in CHEMBL_LOOKUPS.items():
+
+        def run_lookup(name=name, filters=filters):
+            molecule_chembl_ids = sorted(
+                {
+                    a_r["molecule_chembl_id"]
+                    for a_r in read_json(f"{stem}-activity.json")
+                    if a_r["molecule_chembl_id"] is not None
+                }
+            )
+            lookups = {name: (getattr(client, name), filters)}
+            lookup_results = fetch_in_chunks(
+                lookups, molecule_chembl_ids, chunk_size, max_workers
+            )
+            store_json(lookup_results[name], f"{stem}-{name}.json")
+
+        add_node(
+            nodes,
+            f"{gene_symbol}:chembl-{name}",
+            [f"{gene_symbol}:chembl-activity"],
+            [f"{stem}-{name}.json"],
+            [f"chembl-{name}", filters],
+            run_lookup,
+        )
+
+
+def add_open_targets_nodes(nodes, gene_symbol, gene_id):
+    """Adds nodes for the Open Targets target of the gene symbol, every
+    page of the known drugs of the target, and the drug record of each
+    known drug.
+    """
+    stem = f"../results/{gene_symbol}-open-targets"
+    variables = {"ensemblId": gene_id}
+
+    add_node(
+        nodes,
+        f"{gene_symbol}:open-targets-target",
+        [],
+        [f"{stem}-target.json"],
+        [TARGET_QUERY_STRING, variables],
+        lambda: fetch_target(gene_symbol, gene_id, True),
+    )
+
+    add_node(
+        nodes,
+        f"{gene_symbol}:open-targets-knownDrugs",
+        [],
+        [f"{stem}-target-knownDrugs.ndjson"],
+        [TARGET_QUERY_STRING, variables, "knownDrugs"],
+        lambda: stream_connection(
+            TARGET_QUERY_STRING,
+            "knownDrugs",
+            "cursor",
+            variables,
+            f"{stem}-target-knownDrugs.ndjson",
+            force=True,
+        ),
+    )
+
+    def run_drugs():
+        with open(f"{stem}-target-knownDrugs.ndjson", "r") as fp:
+            drug_ids = sorted({json.loads(line)["drugId"] for line in fp})
+        session = create_session(get_pool_size(UPSTREAM))
+        with ThreadPoolExecutor(max_workers=get_pool_size(UPSTREAM)) as executor:
+            drug_results = executor.map(
+                lambda drug_id: post_query(
+                    DRUG_QUERY_STRING, {"chemblId": drug_id}, session=session
+                ),
+                drug_ids,
+            )
+            results = dict(zip(drug_ids, drug_results))
+        store_json(results, f"{stem}-drugs.json")
+
+    add_node(
+        nodes,
+        f"{gene_symbol}:open-targets-drugs",
+        [f"{gene_symbol}:open-targets-knownDrugs"],
+        [f"{stem}-drugs.json"],
+        [DRUG_QUERY_STRING],
+        run_drugs,
+    )
+
+
+def add_gget_node(nodes, gene_symbol, gene_id):
+    """Adds a node for the gget diseases and drugs of the gene symbol."""
+    add_node(
+        nodes,
+        f"{gene_symbol}:gget",
+        [],
+        [f"../results/{gene_symbol}-gget.json"],
+        ["gget", gene_id, ["diseases", "drugs"]],
+        lambda: fetch_gget(gene_symbol, gene_id, True),
+    )
+
+
+def add_ncats_node(nodes, gene_symbol):
+    """Adds a node for the NCATS GSRS and Stitcher data of each Open
+    Targets drug of the gene symbol, found by name in the compound
+    index, and writes the UNII of each drug name. The outputs of the
+    node are the UNIIs, and the GSRS and Stitcher data of each drug
+    with a UNII.
+    """
+    ncats_path = Path(f"../results/{gene_symbol}-ncats.json")
+
+    def get_ncats_outputs():
+        outputs = [ncats_path]
+        if ncats_path.exists():
+            for compound_name, compound_unii in sorted(read_json(ncats_path).items()):
+                if compound_unii is not None:
+                    outputs.extend(
+                        f"../results/{compound_name}-ncats-{source}.json"
+                        for source in ["gsrs", "stitcher"]
+                    )
+        return outputs
+
+    def run_ncats():
+        drug_results = read_json(f"../results/{gene_symbol}-open-targets-drugs.json")
+        drug_names = sorted(
+            {
+                d_r["drug"]["name"].upper()
+                for d_r in drug_results.values()
+                if d_r and d_r["drug"] and d_r["drug"]["name"]
+            }
+        )
+        compound_uniis = lookup_compounds(
+            drug_names, load_compound_index(), prefix=False
+        )
+        failed_names = fetch_substances(
+            {c_n: c_u for c_n, c_u in compound_uniis.items() if c_u is not None},
+            True,
+        )
+        if failed_names:
+            raise RuntimeError(f"could not get NCATS data for {failed_names}")
+        store_json(compound_uniis, ncats_path)
+
+    add_node(
+        nodes,
+        f"{gene_symbol}:ncats",
+        [f"{gene_symbol}:open-targets-drugs"],
+        get_ncats_outputs,
+        ["ncats", ["gsrs", "stitcher"]],
+        run_ncats,
+    )
+
+
+def main():
+    """Refreshes the ChEMBL, Open Targets, gget, and NCATS data for a
+    list of genes, running independent stages concurrently, and only
+    stages whose inputs or queries changed since they last ran.
+    """
+    parser = argparse.ArgumentParser(
+        description="Refresh all resources for a gene list as a pipeline of dependent stages"
+    )
+    parser.add_argument(
+        "--gene-list",
+        help="file containing gene symbols, one per line, or - for standard input (default: ADRB2 only)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="maximum number of concurrent stages, and of concurrent ChEMBL lookups within a stage, while requests to Open Targets and NCATS are within an adaptive limit (default: 8)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"number of molecule ids in each ChEMBL lookup (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--chembl-db",
+        help="local ChEMBL SQLite release to use instead of the web services",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="post every Open Targets query, without reading or writing the response cache",
+    )
+    add_metrics_argument(parser)
+    add_transport_arguments(parser)
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force every stage to run",
+    )
+    args = parser.parse_args()
+
+    install_transport(args.http_mode, args.cassette)
+    install_request_metrics()
+
+    if not args.no_cache:
+        set_response_cache(ResponseCache())
+
+    if args.chembl_db is not None:
+        client = SqliteClient(args.chembl_db)
+
+    else:
+        client = new_client
+
+    if args.gene_list is not None:
+        gene_symbols = read_gene_symbols(args.gene_list)
+
+    else:
+        gene_symbols = ["ADRB2"]
+
+    nodes = {}
+    for gene_symbol, gene_ids in map_gene_symbols_to_ids(gene_symbols).items():
+        gene_id = gene_ids if isinstance(gene_ids, str) else gene_ids[0]
+        add_chembl_nodes(nodes, gene_symbol, client, args.chunk_size, args.max_workers)
+        add_open_targets_nodes(nodes, gene_symbol, gene_id)
+        add_gget_node(nodes, gene_symbol, gene_id)
+        add_ncats_node(nodes, gene_symbol)
+
+    run_pipeline(nodes, args.max_workers, force=args.force)
+    metrics.write("pipeline", args.metrics_dir)
+
+
+if __name__ == "__main__":
+    main()
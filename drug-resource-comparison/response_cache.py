@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+CACHE_DIR = "../data/response-cache"
+
+# Entries expire after one week by default
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+# Least recently used entries are evicted above 2 GB by default
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def hash_key(*parts):
+    """Returns the SHA-256 hex digest of the JSON serialization of the
+    given parts, with sorted keys.
+    """
+    serialized = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of response text, keyed on a hash of the request,
+    with expiry after a time to live, and least recently used eviction
+    above a maximum total size. Entries are written to a file per key,
+    with the modification time recording when the entry was written,
+    and the access time recording when the entry was last read.
+    """
+
+    def __init__(
+        self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.total_bytes = sum(
+            p.stat().st_size for p in self.cache_dir.glob("*/*.json")
+        )
+
+    def get_path(self, key):
+        """Returns the path of the entry for the key."""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Returns the text of the entry for the key, or None if the
+        entry does not exist, or has expired.
+        """
+        path = self.get_path(key)
+        now = time.time()
+        try:
+            stat = path.stat()
+            if now - stat.st_mtime > self.ttl:
+                self.remove(path, stat.st_size)
+                with self.lock:
+                    self.expirations += 1
+                    self.misses += 1
+                return None
+
+            text = path.read_text(encoding="utf-8")
+            os.utime(path, (now, stat.st_mtime))
+
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """Writes the text of the entry for the key atomically, then
+        evicts least recently used entries if the cache is too large.
+        """
+        path = self.get_path(key)
+        path.parent.mkdir(exist_ok=True)
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temp_path.write_text(text, encoding="utf-8")
+        size = temp_path.stat().st_size
+        try:
+            previous_size = path.stat().st_size
+        except FileNotFoundError:
+            previous_size = 0
+        os.replace(temp_path, path)
+        with self.lock:
+            self.total_bytes += size - previous_size
+            evict = self.total_bytes > self.max_bytes
+        if evict:
+            self.evict()
+
+    def remove(self, path, size):
+        """Removes the entry at the path, if it still exists."""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self.lock:
+            self.total_bytes -= size
+
+    def evict(self):
+        """Removes least recently used entries until the cache is no
+        larger than three quarters of its maximum size.
+        """
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+        for _, size, path in entries:
+            with self.lock:
+                if self.total_bytes <= 0.75 * self.max_bytes:
+                    break
+                self.evictions += 1
+            self.remove(path, size)
+
+    def get_stats(self):
+        """Returns the hit, miss, expiration, and eviction counts, and
+        the total size of the cache.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "total_bytes": self.total_bytes,
+            }
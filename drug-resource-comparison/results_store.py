@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+import threading
+
+STORE_DIR = "../results/store"
+
+# Size of the blocks read when hashing a file
+BLOCK_BYTES = 1 << 20
+
+# Stored objects are read only, since every results path linked to an
+# object would change if it were edited in place
+OBJECT_MODE = 0o444
+
+
+def get_object_path(digest, suffix, store_dir=STORE_DIR):
+    """Returns the path of the stored object with the content hash and
+    the suffix of its results path, sharded by the leading digits of
+    the hash.
+    """
+    return Path(store_dir) / digest[0:2] / f"{digest}{suffix}"
+
+
+def get_temp_path(store_dir=STORE_DIR):
+    """Returns a temporary path in the store, unique to the process and
+    thread, from which an object may be renamed into the store.
+    """
+    Path(store_dir).mkdir(parents=True, exist_ok=True)
+    return Path(store_dir) / f"{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class HashingWriter(io.RawIOBase):
+    """Writes bytes to a file, updating the SHA-256 digest of the bytes
+    written.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.digest = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, block):
+        self.digest.update(block)
+        return self.fp.write(block)
+
+
+def link_results(object_path, results_path):
+    """Links the results path to the stored object, replacing it
+    atomically, and writing a copy if the file system does not support
+    hard links. Nothing is written if the results path already links to
+    the object. Returns True if the results path changed.
+    """
+    results_path = Path(results_path)
+    if results_path.exists() and os.path.samefile(results_path, object_path):
+        return False
+
+    temp_path = results_path.with_suffix(f".{threading.get_ident()}.tmp")
+    temp_path.unlink(missing_ok=True)
+    try:
+        os.link(object_path, temp_path)
+
+    except OSError:
+        temp_path.write_bytes(object_path.read_bytes())
+    os.replace(temp_path, results_path)
+    return True
+
+
+def add_object(temp_path, object_path):
+    """Moves a written file into the store as a read only object, or
+    removes it if the object is stored already.
+    """
+    if object_path.exists():
+        temp_path.unlink()
+
+    else:
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(temp_path, OBJECT_MODE)
+        os.replace(temp_path, object_path)
+
+
+def store_bytes(content, results_path, store_dir=STORE_DIR):
+    """Saves the content once under its content hash, and links the
+    results path to the stored object. Nothing is written if the
+    results path already links to the object. Returns True if the
+    results path changed.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    object_path = get_object_path(digest, Path(results_path).suffix, store_dir)
+    if not object_path.exists():
+        temp_path = get_temp_path(store_dir)
+        temp_path.write_bytes(content)
+        add_object(temp_path, object_path)
+
+    return link_results(object_path, results_path)
+
+
+def store_file(temp_path, results_path, store_dir=STORE_DIR, digest=None):
+    """Moves a written file into the store under its content hash,
+    hashing it unless the hex digest is given, or removes it if the
+    content is stored already, and links the results path to the
+    stored object. Returns True if the results path changed.
+    """
+    temp_path = Path(temp_path)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(temp_path, "rb") as fp:
+            for block in iter(lambda: fp.read(BLOCK_BYTES), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+    object_path = get_object_path(digest, Path(results_path).suffix, store_dir)
+    add_object(temp_path, object_path)
+
+    return link_results(object_path, results_path)
+
+
+def store_json(results, results_path, store_dir=STORE_DIR):
+    """Serializes the results as indented JSON, streaming them to a
+    temporary file while hashing them, rather than serializing them in
+    memory, and stores them.
+    """
+    temp_path = get_temp_path(store_dir)
+    with open(temp_path, "wb") as fp:
+        writer = HashingWriter(fp)
+        with io.TextIOWrapper(io.BufferedWriter(writer), encoding="utf-8") as text:
+            json.dump(results, text, indent=4)
+    return store_file(temp_path, results_path, store_dir, writer.digest.hexdigest())
+
+
+def get_object_paths(store_dir=STORE_DIR):
+    """Returns the paths of the stored objects."""
+    return [
+        object_path
+        for object_path in Path(store_dir).glob("*/*")
+        if object_path.suffix != ".tmp"
+    ]
+
+
+def prune_store(store_dir=STORE_DIR):
+    """Removes stored objects no longer linked from any results path,
+    and returns the number of objects removed.
+    """
+    prune_count = 0
+    for object_path in get_object_paths(store_dir):
+        if object_path.stat().st_nlink == 1:
+            object_path.unlink()
+            prune_count += 1
+    return prune_count
+
+
+def main():
+    """Reports the size of the results store, and optionally prunes
+    objects no longer linked from any results path.
+    """
+    parser = argparse.ArgumentParser(
+        description="Report on, or prune, the content addressed results store"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="remove stored objects no longer linked from any results path",
+    )
+    args = parser.parse_args()
+
+    if args.prune:
+        print(f"Pruned {prune_store()} objects from the results store")
+
+    object_paths = get_object_paths()
+    total_bytes = sum(object_path.stat().st_size for object_path in object_paths)
+    print(f"Results store holds {len(object_paths)} objects in {total_bytes} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+import argparse
+from collections import Counter
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+# Statuses of each unit of a batch run
+UNIT_STATUSES = ["pending", "done", "failed"]
+
+# Size of the chunks read when hashing results
+CHUNK_BYTES = 1 << 20
+
+
+def hash_results(results_path):
+    """Returns the SHA-256 hex digest of the results file, or of every
+    file in the results directory, in name order.
+    """
+    results_path = Path(results_path)
+    if results_path.is_dir():
+        paths = sorted(path for path in results_path.rglob("*") if path.is_file())
+    else:
+        paths = [results_path]
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(CHUNK_BYTES), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RunManifest:
+    """Records the status, pending, done, or failed, of each unit of a
+    batch run, an entity and the query made for it, with the content
+    hash of its results once done. Each change is appended to the
+    manifest as a line of JSON, so that an interrupted run loses at most
+    a truncated line, and the manifest is compacted atomically when
+    opened. A rerun runs only the units which are not done, or whose
+    results have since changed.
+    """
+
+    def __init__(self, manifest_path, reset=False):
+        self.manifest_path = Path(manifest_path)
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.units = {}
+        if reset:
+            self.manifest_path.unlink(missing_ok=True)
+        self.read()
+        self.compact()
+        self.fp = open(self.manifest_path, "a")
+
+    def read(self):
+        """Reads the last record of each unit, skipping a line truncated
+        by an interrupted run.
+        """
+        if not self.manifest_path.exists():
+            return
+        with open(self.manifest_path, "r") as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+
+                except ValueError:
+                    continue
+
+                self.units[(record["entity"], record["query"])] = record
+
+    def compact(self):
+        """Rewrites the manifest atomically, with one record per unit."""
+        temp_path = self.manifest_path.with_suffix(".tmp")
+        with open(temp_path, "w") as fp:
+            for record in self.units.values():
+                fp.write(json.dumps(record) + "\n")
+        os.replace(temp_path, self.manifest_path)
+
+    def append(self, entity, query, status, **fields):
+        """Records the status of a unit."""
+        record = {
+            "entity": entity,
+            "query": query,
+            "status": status,
+            "time": time.time(),
+            **fields,
+        }
+        with self.lock:
+            self.units[(entity, query)] = record
+            self.fp.write(json.dumps(record) + "\n")
+            self.fp.flush()
+
+    def needs_run(self, entity, query, results_path):
+        """Returns True if the unit is pending or failed, or if done,
+        its results are missing, or have changed. Existing results of a
+        unit not in the manifest are recorded as done.
+        """
+        results_path = Path(results_path)
+        record = self.units.get((entity, query))
+        if record is None:
+            if not results_path.exists():
+                return True
+            self.mark_done(entity, query, results_path)
+            return False
+        if record["status"] != "done":
+            return True
+        return not results_path.exists() or hash_results(results_path) != record["hash"]
+
+    def mark_pending(self, entity, query):
+        self.append(entity, query, "pending")
+
+    def mark_done(self, entity, query, results_path):
+        self.append(
+            entity,
+            query,
+            "done",
+            path=str(results_path),
+            hash=hash_results(results_path),
+        )
+
+    def mark_failed(self, entity, query, error):
+        self.append(entity, query, "failed", error=str(error))
+
+    def get_counts(self):
+        """Returns the number of units with each status."""
+        with self.lock:
+            counts = Counter(record["status"] for record in self.units.values())
+        return {status: counts[status] for status in UNIT_STATUSES}
+
+    def report(self):
+        """Prints the number of units with each status."""
+        counts = self.get_counts()
+        print(
+            f"Run manifest {self.manifest_path} records {counts['done']} done, {counts['failed']} failed, and {counts['pending']} pending units"
+        )
+
+    def close(self):
+        with self.lock:
+            self.fp.close()
+
+
+def main():
+    """Reports the status of each unit of a batch run which is not
+    done.
+    """
+    parser = argparse.ArgumentParser(
+        description="Report the units of a batch run which are not done"
+    )
+    parser.add_argument(
+        "manifest_path",
+        help="run manifest to report",
+    )
+    args = parser.parse_args()
+
+    manifest = RunManifest(args.manifest_path)
+    for record in manifest.units.values():
+        if record["status"] != "done":
+            print(
+                f"{record['entity']} {record['query']}: {record['status']} {record.get('error', '')}"
+            )
+    manifest.report()
+    manifest.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import mmap
+import os
+from pathlib import Path
+import time
+import zlib
+
+import numpy as np
+
+JSON_DIR = "../data/stitcher_json_files"
+ARCHIVE_PATH = "../data/stitcher-json-files.pack"
+INDEX_PATH = "../data/stitcher-json-files.idx.npz"
+
+
+def pack_stitcher_files(
+    json_dir=JSON_DIR, archive_path=ARCHIVE_PATH, index_path=INDEX_PATH, compress=False
+):
+    """Packs the Stitcher JSON files, one per substance, into a single
+    archive file of concatenated records, optionally compressed per
+    record, and an index of the offset and length of the record of
+    each UNII, sorted by UNII.
+    """
+    start_time = time.time()
+    print(f"Packing Stitcher JSON files in {json_dir} into {archive_path}")
+
+    uniis = []
+    offsets = []
+    lengths = []
+    offset = 0
+    temp_path = Path(archive_path).with_suffix(".tmp")
+    with open(temp_path, "wb") as fp:
+        with os.scandir(json_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                with open(entry.path, "rb") as json_fp:
+                    record = json_fp.read()
+                if compress:
+                    record = zlib.compress(record)
+                fp.write(record)
+                uniis.append(entry.name[: -len(".json")])
+                offsets.append(offset)
+                lengths.append(len(record))
+                offset += len(record)
+
+    uniis = np.array(uniis, dtype=str)
+    order = np.argsort(uniis)
+    temp_index_path = Path(index_path).with_suffix(".tmp.npz")
+    np.savez(
+        temp_index_path,
+        uniis=uniis[order],
+        offsets=np.array(offsets, dtype=np.int64)[order],
+        lengths=np.array(lengths, dtype=np.int64)[order],
+        compressed=np.array(compress),
+    )
+    os.replace(temp_path, archive_path)
+    os.replace(temp_index_path, index_path)
+
+    stop_time = time.time()
+    print(
+        f"Packed {len(uniis)} Stitcher JSON files into {offset} bytes in {stop_time - start_time} seconds"
+    )
+
+
+class StitcherArchive:
+    """Random access, through a memory map, to the records of a packed
+    Stitcher archive, by UNII.
+    """
+
+    def __init__(self, archive_path=ARCHIVE_PATH, index_path=INDEX_PATH):
+        with np.load(index_path) as index:
+            self.uniis = index["uniis"]
+            self.offsets = index["offsets"]
+            self.lengths = index["lengths"]
+            self.compressed = bool(index["compressed"])
+        self.fp = open(archive_path, "rb")
+        if self.lengths.sum() > 0:
+            self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.mm = b""
+
+    def find(self, unii):
+        """Returns the position of the UNII in the index, or None."""
+        position = np.searchsorted(self.uniis, unii)
+        if position < len(self.uniis) and self.uniis[position] == unii:
+            return position
+        return None
+
+    def __contains__(self, unii):
+        return self.find(unii) is not None
+
+    def __len__(self):
+        return len(self.uniis)
+
+    def read(self, unii):
+        """Returns the JSON bytes of the record of the UNII, or raises a
+        KeyError.
+        """
+        position = self.find(unii)
+        if position is None:
+            raise KeyError(unii)
+        offset = self.offsets[position]
+        record = self.mm[offset : offset + self.lengths[position]]
+        if self.compressed:
+            record = zlib.decompress(record)
+        return record
+
+    def load(self, unii):
+        """Returns the decoded JSON of the record of the UNII."""
+        return json.loads(self.read(unii))
+
+    def close(self):
+        """Closes the memory map, and archive file."""
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.fp.close()
+
+
+def open_stitcher_archive(archive_path=ARCHIVE_PATH, index_path=INDEX_PATH):
+    """Opens the Stitcher archive, or returns None if it has not been
+    packed.
+    """
+    if not Path(archive_path).exists() or not Path(index_path).exists():
+        return None
+    return StitcherArchive(archive_path, index_path)
+
+
+def main():
+    """Packs the Stitcher JSON files downloaded from Figshare into a
+    single archive with a UNII index.
+    """
+    parser = argparse.ArgumentParser(
+        description="Pack the Stitcher JSON files into a single indexed archive"
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="compress each record",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force update of the existing archive",
+    )
+    args = parser.parse_args()
+
+    if not Path(ARCHIVE_PATH).exists() or args.force:
+        pack_stitcher_files(compress=args.compress)
+
+
+if __name__ == "__main__":
+    main()
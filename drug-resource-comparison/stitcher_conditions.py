@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+import argparse
+import base64
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from pathlib import Path
+import time
+
+from optional_imports import import_optional
+from stitcher_archive import JSON_DIR, open_stitcher_archive
+
+CONDITIONS_PATH = "../results/ncats-conditions.parquet"
+
+# Number of substances decoded by a worker at a time
+CHUNK_SIZE = 1000
+
+
+def decode_conditions(stitcher_json):
+    """Returns the base64 decoded JSON of every entry of the conditions
+    property of a Stitcher record.
+    """
+    conditions = []
+    properties = (stitcher_json.get("sgroup") or {}).get("properties") or {}
+    for condition in properties.get("conditions") or []:
+        decoded_bytes = base64.b64decode(condition["value"])
+        conditions.append(json.loads(decoded_bytes.decode("utf-8")))
+    return conditions
+
+
+def get_condition_row(compound_unii, condition_index, condition):
+    """Returns a row for a decoded condition: the UNII, the index of
+    the condition, the condition JSON, and each top level member of the
+    condition as a string column, with nested members as JSON.
+    """
+    row = {
+        "unii": compound_unii,
+        "condition_index": condition_index,
+        "condition": json.dumps(condition),
+    }
+    if isinstance(condition, dict):
+        for key, value in condition.items():
+            if isinstance(value, str) or value is None:
+                row[key] = value
+            else:
+                row[key] = json.dumps(value)
+    return row
+
+
+def decode_chunk(compound_uniis):
+    """Decodes the conditions of each substance in a chunk, reading
+    records from the packed archive, if packed, or the JSON files, and
+    returns the condition rows.
+    """
+    stitcher_archive = open_stitcher_archive()
+    rows = []
+    for compound_unii in compound_uniis:
+        if stitcher_archive is not None:
+            stitcher_json = stitcher_archive.load(compound_unii)
+
+        else:
+            with open(Path(JSON_DIR) / f"{compound_unii}.json", "rb") as fp:
+                stitcher_json = json.load(fp)
+
+        try:
+            conditions = decode_conditions(stitcher_json)
+
+        except (KeyError, ValueError) as exc:
+            print(f"Could not decode NCATS conditions for {compound_unii}: {exc}")
+            continue
+
+        for condition_index, condition in enumerate(conditions):
+            rows.append(get_condition_row(compound_unii, condition_index, condition))
+
+    if stitcher_archive is not None:
+        stitcher_archive.close()
+    return rows
+
+
+def list_uniis():
+    """Returns the UNII of every substance in the packed archive, if
+    packed, or the JSON files.
+    """
+    stitcher_archive = open_stitcher_archive()
+    if stitcher_archive is not None:
+        compound_uniis = stitcher_archive.uniis.tolist()
+        stitcher_archive.close()
+        return compound_uniis
+
+    with os.scandir(JSON_DIR) as entries:
+        return sorted(
+            entry.name[: -len(".json")]
+            for entry in entries
+            if entry.name.endswith(".json")
+        )
+
+
+def decode_all_conditions(
+    conditions_path=CONDITIONS_PATH, max_workers=None, chunk_size=CHUNK_SIZE
+):
+    """Decodes the conditions of every substance on a process pool, and
+    writes one Parquet table of condition rows, ordered by UNII and
+    condition index. Columns missing from some conditions are null.
+    """
+    pa = import_optional("pyarrow", "Decoding NCATS conditions into Parquet")
+    pq = import_optional("pyarrow.parquet", "Decoding NCATS conditions into Parquet")
+
+    start_time = time.time()
+    print(f"Decoding NCATS conditions for every substance into {conditions_path}")
+
+    compound_uniis = list_uniis()
+    chunks = [
+        compound_uniis[index : index + chunk_size]
+        for index in range(0, len(compound_uniis), chunk_size)
+    ]
+    tables = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for rows in executor.map(decode_chunk, chunks):
+            if rows:
+                # Collect the columns of every row, since conditions
+                # differ in their members
+                columns = {key: [] for row in rows for key in row}
+                for row in rows:
+                    for key, values in columns.items():
+                        values.append(row.get(key))
+                tables.append(pa.table(columns))
+
+    if tables:
+        table = pa.concat_tables(tables, promote_options="default")
+
+    else:
+        table = pa.table(
+            {
+                "unii": pa.array([], pa.string()),
+                "condition_index": pa.array([], pa.int64()),
+                "condition": pa.array([], pa.string()),
+            }
+        )
+    temp_path = Path(conditions_path).with_suffix(".tmp")
+    pq.write_table(table, temp_path, compression="zstd")
+    os.replace(temp_path, conditions_path)
+
+    stop_time = time.time()
+    print(
+        f"Decoded {table.num_rows} NCATS conditions for {len(compound_uniis)} substances in {stop_time - start_time} seconds"
+    )
+
+
+def main():
+    """Decodes the conditions of every substance in the Stitcher
+    Figshare dump into one Parquet table.
+    """
+    parser = argparse.ArgumentParser(
+        description="Decode the Stitcher conditions of every substance into a Parquet table"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="maximum number of decoding processes (default: number of processors)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"number of substances decoded by a process at a time (default: {CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="force update of the existing table",
+    )
+    args = parser.parse_args()
+
+    if not Path(CONDITIONS_PATH).exists() or args.force:
+        decode_all_conditions(max_workers=args.max_workers, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
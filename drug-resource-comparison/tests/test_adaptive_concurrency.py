@@ -0,0 +1,122 @@
+import pytest
+import requests
+
+import adaptive_concurrency
+from adaptive_concurrency import (
+    AdaptiveLimiter,
+    get_limiter,
+    get_pool_size,
+    get_retry_after,
+    send_with_retries,
+)
+
+
+@pytest.fixture(autouse=True)
+def limiters(monkeypatch):
+    """Gives each test its own limiters, and retries without
+    sleeping.
+    """
+    monkeypatch.setattr(adaptive_concurrency, "limiters", {})
+    monkeypatch.setattr(adaptive_concurrency.time, "sleep", lambda seconds: None)
+
+
+def build_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+def test_limit_rises_while_healthy_and_halves_when_throttled():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=6)
+    for _ in range(4):
+        limiter.on_success(0.1)
+    assert limiter.limit == pytest.approx(5.0, abs=0.1)
+
+    # Slow responses do not raise the limit
+    limiter.on_success(1.0)
+    assert limiter.limit == pytest.approx(5.0, abs=0.1)
+
+    for _ in range(20):
+        limiter.on_success(0.1)
+    assert limiter.limit == 6
+
+    send_time = limiter.acquire()
+    limiter.release()
+    limiter.on_throttle(send_time)
+    assert limiter.limit == 3
+
+    # Requests sent before the cut do not cut the limit again
+    limiter.on_throttle(send_time)
+    assert limiter.limit == 3
+    limiter.on_throttle(limiter.acquire())
+    limiter.release()
+    assert limiter.limit == 1.5
+    for _ in range(4):
+        limiter.on_throttle(limiter.acquire())
+        limiter.release()
+    assert limiter.limit == 1
+
+
+def test_set_max_limit_cuts_limit_and_sizes_pool():
+    limiter = get_limiter("api")
+    assert get_pool_size("api") == adaptive_concurrency.MAX_LIMIT
+    limiter.set_max_limit(4)
+    assert limiter.limit == 4
+    assert get_pool_size("api") == 4
+
+
+def test_retry_after_pauses_requests():
+    limiter = AdaptiveLimiter()
+    limiter.on_throttle(limiter.acquire(), retry_after=0.05)
+    limiter.release()
+    start_time = adaptive_concurrency.time.monotonic()
+    limiter.acquire()
+    assert adaptive_concurrency.time.monotonic() - start_time >= 0.04
+
+
+def test_get_retry_after():
+    assert get_retry_after(build_response(429, {"Retry-After": "3"})) == 3.0
+    assert get_retry_after(build_response(429, {"Retry-After": "soon"})) is None
+    assert get_retry_after(build_response(429)) is None
+    assert (
+        get_retry_after(
+            build_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        )
+        == 0.0
+    )
+
+
+def test_send_with_retries_retries_throttled_responses():
+    responses = [
+        build_response(429, {"Retry-After": "0"}),
+        build_response(503),
+        build_response(200),
+    ]
+    response = send_with_retries(lambda: responses.pop(0), "api")
+    assert response.status_code == 200
+    assert not responses
+    # Cut twice, then raised by the healthy response
+    assert get_limiter("api").limit == adaptive_concurrency.INITIAL_LIMIT / 4 + 0.5
+
+
+def test_send_with_retries_gives_up():
+    response = send_with_retries(lambda: build_response(429), "api", max_retries=2)
+    assert response.status_code == 429
+
+    def send():
+        raise requests.exceptions.Timeout()
+
+    with pytest.raises(requests.exceptions.Timeout):
+        send_with_retries(send, "api", max_retries=1)
+    assert get_limiter("api").in_flight == 0
+
+
+def test_send_with_retries_releases_on_other_errors():
+    def send():
+        raise requests.exceptions.ConnectionError()
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            send_with_retries(send, "api")
+    assert get_limiter("api").in_flight == 0
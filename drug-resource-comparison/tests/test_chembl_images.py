@@ -0,0 +1,49 @@
+import os
+import threading
+
+import chembl_images
+from chembl_images import fetch_images, get_image_path, read_manifest
+
+
+class FakeImage:
+    """Image client recording the threads using it."""
+
+    created = []
+
+    def __init__(self):
+        self.threads = set()
+        FakeImage.created.append(self)
+
+    def set_format(self, image_format):
+        self.image_format = image_format
+
+    def get(self, molecule_chembl_id):
+        self.threads.add(threading.get_ident())
+        return f"<svg id='{molecule_chembl_id}'/>"
+
+
+def test_fetch_images(tmp_path, monkeypatch):
+    FakeImage.created = []
+    molecule_chembl_ids = [f"CHEMBL{index}" for index in range(20)]
+
+    assert fetch_images(FakeImage, molecule_chembl_ids, "svg", 4, tmp_path) == 20
+    assert all(len(image.threads) == 1 for image in FakeImage.created)
+    assert all(image.image_format == "svg" for image in FakeImage.created)
+    image_path = get_image_path(tmp_path, "CHEMBL0", "svg")
+    assert image_path.read_text() == "<svg id='CHEMBL0'/>"
+
+    # Unchanged images are recognized without reading them
+    def hash_file(path):
+        raise AssertionError(f"Read {path}")
+
+    with monkeypatch.context() as context:
+        context.setattr(chembl_images, "hash_file", hash_file)
+        assert fetch_images(FakeImage, molecule_chembl_ids, "svg", 4, tmp_path) == 0
+
+    # A touched image with unchanged content is not fetched again, but
+    # a changed image is
+    os.utime(image_path, ns=(0, 0))
+    get_image_path(tmp_path, "CHEMBL1", "svg").write_text("<svg/>")
+    assert fetch_images(FakeImage, molecule_chembl_ids, "svg", 4, tmp_path) == 1
+    manifest = read_manifest(tmp_path / "svg" / "manifest.json")
+    assert manifest["CHEMBL0"]["mtime_ns"] == 0
@@ -0,0 +1,359 @@
+import sqlite3
+
+import pytest
+
+from chembl_sqlite import RESOURCES, SqliteClient
+
+# Columns of the tables of a ChEMBL SQLite release read by the resources
+TABLES = {
+    "target_dictionary": "tid, chembl_id, pref_name, target_type, organism, tax_id, species_group_flag",
+    "target_components": "tid, component_id",
+    "component_synonyms": "component_id, component_synonym",
+    "assays": "assay_id, tid, chembl_id, description, assay_type, bao_format",
+    "activities": "activity_id, assay_id, molregno, doc_id, action_type, activity_comment, bao_endpoint, data_validity_comment, pchembl_value, potential_duplicate, qudt_units, record_id, relation, src_id, standard_flag, standard_relation, standard_text_value, standard_type, standard_units, standard_upper_value, standard_value, text_value, toid, type, units, uo_units, upper_value, value",
+    "docs": "doc_id, chembl_id, journal, year",
+    "molecule_dictionary": "molregno, chembl_id, pref_name, max_phase, molecule_type, structure_type, therapeutic_flag, first_approval, oral, parenteral, topical, black_box_warning, natural_product, first_in_class, chirality, prodrug, inorganic_flag, usan_year, availability_type, usan_stem, polymer_flag, usan_substem, usan_stem_definition, indication_class, withdrawn_flag, chebi_par_id, orphan",
+    "molecule_hierarchy": "molregno, parent_molregno",
+    "molecule_synonyms": "molregno, synonyms, syn_type",
+    "molecule_atc_classification": "molregno, level5",
+    "drug_indication": "drugind_id, molregno, efo_id, efo_term, max_phase_for_ind, mesh_heading, mesh_id",
+    "indication_refs": "drugind_id, ref_id, ref_type, ref_url",
+    "compound_structures": "molregno, canonical_smiles, standard_inchi, standard_inchi_key",
+    "compound_properties": "molregno, full_mwt, alogp, hba, hbd, psa, rtb, num_ro5_violations, full_molformula",
+}
+
+# Fields of each ChEMBL web resource, of which the local resources
+# select a subset, with the fields of nested objects
+WEB_FIELDS = {
+    "target": {
+        "cross_references",
+        "organism",
+        "pref_name",
+        "score",
+        "species_group_flag",
+        "target_chembl_id",
+        "target_components",
+        "target_type",
+        "tax_id",
+    },
+    "activity": {
+        "action_type",
+        "activity_comment",
+        "activity_id",
+        "activity_properties",
+        "assay_chembl_id",
+        "assay_description",
+        "assay_type",
+        "assay_variant_accession",
+        "assay_variant_mutation",
+        "bao_endpoint",
+        "bao_format",
+        "bao_label",
+        "canonical_smiles",
+        "data_validity_comment",
+        "data_validity_description",
+        "document_chembl_id",
+        "document_journal",
+        "document_year",
+        "ligand_efficiency",
+        "molecule_chembl_id",
+        "molecule_pref_name",
+        "parent_molecule_chembl_id",
+        "pchembl_value",
+        "potential_duplicate",
+        "qudt_units",
+        "record_id",
+        "relation",
+        "src_id",
+        "standard_flag",
+        "standard_relation",
+        "standard_text_value",
+        "standard_type",
+        "standard_units",
+        "standard_upper_value",
+        "standard_value",
+        "target_chembl_id",
+        "target_organism",
+        "target_pref_name",
+        "target_tax_id",
+        "text_value",
+        "toid",
+        "type",
+        "units",
+        "uo_units",
+        "upper_value",
+        "value",
+    },
+    "drug": {
+        "applicants",
+        "atc_classification",
+        "availability_type",
+        "black_box",
+        "chirality",
+        "development_phase",
+        "drug_type",
+        "first_approval",
+        "first_in_class",
+        "helm_notation",
+        "indication_class",
+        "molecule_chembl_id",
+        "molecule_properties",
+        "molecule_structures",
+        "molecule_synonyms",
+        "ob_patent",
+        "oral",
+        "parenteral",
+        "prodrug",
+        "research_codes",
+        "rule_of_five",
+        "sc_patent",
+        "synonyms",
+        "topical",
+        "usan_stem",
+        "usan_stem_definition",
+        "usan_year",
+        "withdrawn_flag",
+    },
+    "drug_indication": {
+        "drugind_id",
+        "efo_id",
+        "efo_term",
+        "indication_refs",
+        "max_phase_for_ind",
+        "mesh_heading",
+        "mesh_id",
+        "molecule_chembl_id",
+        "parent_molecule_chembl_id",
+    },
+    "molecule": {
+        "atc_classifications",
+        "availability_type",
+        "biotherapeutic",
+        "black_box_warning",
+        "chebi_par_id",
+        "chemical_probe",
+        "chirality",
+        "cross_references",
+        "dosed_ingredient",
+        "first_approval",
+        "first_in_class",
+        "helm_notation",
+        "indication_class",
+        "inorganic_flag",
+        "max_phase",
+        "molecule_chembl_id",
+        "molecule_hierarchy",
+        "molecule_properties",
+        "molecule_structures",
+        "molecule_synonyms",
+        "molecule_type",
+        "natural_product",
+        "oral",
+        "orphan",
+        "parenteral",
+        "polymer_flag",
+        "pref_name",
+        "prodrug",
+        "structure_type",
+        "therapeutic_flag",
+        "topical",
+        "usan_stem",
+        "usan_stem_definition",
+        "usan_substem",
+        "usan_year",
+        "withdrawn_flag",
+    },
+    "molecule.molecule_structures": {
+        "canonical_smiles",
+        "molfile",
+        "standard_inchi",
+        "standard_inchi_key",
+    },
+    "molecule.molecule_properties": {
+        "alogp",
+        "aromatic_rings",
+        "cx_logd",
+        "cx_logp",
+        "cx_most_apka",
+        "cx_most_bpka",
+        "full_molformula",
+        "full_mwt",
+        "hba",
+        "hba_lipinski",
+        "hbd",
+        "hbd_lipinski",
+        "heavy_atoms",
+        "molecular_species",
+        "mw_freebase",
+        "mw_monoisotopic",
+        "np_likeness_score",
+        "num_lipinski_ro5_violations",
+        "num_ro5_violations",
+        "psa",
+        "qed_weighted",
+        "ro3_pass",
+        "rtb",
+    },
+}
+
+
+def insert(connection, table, **values):
+    columns = ", ".join(values)
+    placeholders = ", ".join("?" * len(values))
+    connection.execute(
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+        list(values.values()),
+    )
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Returns a client of a ChEMBL SQLite release of two targets, and
+    five molecules, each with an activity against the first target.
+    """
+    db_path = tmp_path / "chembl.db"
+    connection = sqlite3.connect(db_path)
+    for table, columns in TABLES.items():
+        connection.execute(f"CREATE TABLE {table} ({columns})")
+    for tid, chembl_id, synonym in [
+        (1, "CHEMBL210", "ADRB2"),
+        (2, "CHEMBL211", "adrb"),
+    ]:
+        insert(
+            connection,
+            "target_dictionary",
+            tid=tid,
+            chembl_id=chembl_id,
+            pref_name=f"Target {tid}",
+            organism="Homo sapiens",
+        )
+        insert(connection, "target_components", tid=tid, component_id=tid)
+        insert(
+            connection,
+            "component_synonyms",
+            component_id=tid,
+            component_synonym=synonym,
+        )
+    insert(connection, "assays", assay_id=1, tid=1, chembl_id="CHEMBL_A1")
+    for molregno in range(1, 6):
+        insert(
+            connection,
+            "molecule_dictionary",
+            molregno=molregno,
+            chembl_id=f"CHEMBL{molregno}",
+            max_phase=4 if molregno % 2 else 2,
+        )
+        insert(
+            connection,
+            "compound_structures",
+            molregno=molregno,
+            canonical_smiles="C" * molregno,
+        )
+        insert(
+            connection,
+            "activities",
+            activity_id=molregno,
+            assay_id=1,
+            molregno=molregno,
+            standard_type="IC50",
+            pchembl_value=5 + molregno,
+        )
+        insert(
+            connection,
+            "molecule_synonyms",
+            molregno=molregno,
+            synonyms="S",
+            syn_type="T",
+        )
+        insert(
+            connection,
+            "drug_indication",
+            drugind_id=molregno,
+            molregno=molregno,
+            max_phase_for_ind=4,
+        )
+        insert(connection, "indication_refs", drugind_id=molregno, ref_id="R")
+    connection.commit()
+    connection.close()
+    return SqliteClient(db_path)
+
+
+def test_filter_lookups(client):
+    target = client.target
+    assert [t["target_chembl_id"] for t in target.filter(target_synonym="ADRB2")] == [
+        "CHEMBL210"
+    ]
+    assert [
+        t["target_chembl_id"] for t in target.filter(target_synonym__icontains="adrb")
+    ] == ["CHEMBL210", "CHEMBL211"]
+    assert [
+        t["target_chembl_id"] for t in target.filter(target_synonym__startswith="adrb")
+    ] == ["CHEMBL211"]
+    assert [
+        t["target_chembl_id"] for t in target.filter(target_synonym__istartswith="adrb")
+    ] == ["CHEMBL210", "CHEMBL211"]
+
+    activity = client.activity.filter(target_chembl_id="CHEMBL210")
+    assert len(list(activity.filter(pchembl_value__gte="9"))) == 2
+    assert len(list(activity.filter(standard_type="Ki"))) == 0
+    with pytest.raises(ValueError):
+        activity.filter(unknown_field=1)
+    with pytest.raises(ValueError):
+        activity.filter(value__regex="1")
+
+
+def test_in_filter_of_chunks(client):
+    molecule_chembl_ids = [f"CHEMBL{molregno}" for molregno in range(1, 6)]
+    chunks = [molecule_chembl_ids[index : index + 2] for index in range(0, 5, 2)]
+    drug_ids = [
+        d["molecule_chembl_id"]
+        for chunk in chunks
+        for d in client.drug.filter(molecule_chembl_id__in=chunk, max_phase=4)
+    ]
+    assert drug_ids == ["CHEMBL1", "CHEMBL3", "CHEMBL5"]
+    assert list(client.drug.filter(molecule_chembl_id__in=[])) == []
+
+    # More values than the SQLite limit of parameters
+    many_ids = [f"CHEMBL{index}" for index in range(40000)]
+    assert len(list(client.molecule.filter(molecule_chembl_id__in=many_ids))) == 5
+
+
+def test_only_and_indexing(client):
+    target = client.target.filter(target_synonym__icontains="adrb").only(
+        ["organism", "target_chembl_id"]
+    )
+    assert target[0] == {"organism": "Homo sapiens", "target_chembl_id": "CHEMBL210"}
+    assert target[1]["target_chembl_id"] == "CHEMBL211"
+    with pytest.raises(IndexError):
+        target[2]
+    with pytest.raises(TypeError):
+        target[-1]
+
+    molecule = client.molecule.only(["molecule_chembl_id", "molecule_structures"])
+    assert molecule[4] == {
+        "molecule_chembl_id": "CHEMBL5",
+        "molecule_structures": {
+            "canonical_smiles": "CCCCC",
+            "standard_inchi": None,
+            "standard_inchi_key": None,
+        },
+    }
+
+
+@pytest.mark.parametrize("resource", list(RESOURCES))
+def test_fields_match_the_web_client(client, resource):
+    row = next(iter(getattr(client, resource)))
+    assert set(row) <= WEB_FIELDS[resource]
+    for field, value in row.items():
+        if isinstance(value, dict):
+            assert set(value) <= WEB_FIELDS[f"{resource}.{field}"]
+
+
+def test_json_fields_are_decoded(client):
+    drug = client.drug.filter(molecule_chembl_id="CHEMBL1")[0]
+    assert drug["synonyms"] == ["S (T)"]
+    assert drug["atc_classification"] == []
+    drug_indication = client.drug_indication[0]
+    assert drug_indication["indication_refs"] == [
+        {"ref_id": "R", "ref_type": None, "ref_url": None}
+    ]
@@ -0,0 +1,28 @@
+import pytest
+
+import drug_comparison
+from drug_comparison import find_gene_symbols, read_gene_results
+from output_formats import write_results
+
+CHEMBL_RESULTS = {
+    "gene_symbol": "ADRB2",
+    "drug": [{"molecule_chembl_id": "CHEMBL714"}, {"molecule_chembl_id": "CHEMBL1"}],
+    "drug_indication": [
+        {"molecule_chembl_id": "CHEMBL714", "efo_id": "MONDO:0004979", "mesh_id": "D1"}
+    ],
+}
+
+
+@pytest.mark.parametrize("output_format", ["json", "compact", "ndjson.gz", "parquet"])
+def test_results_are_read_in_any_output_format(tmp_path, monkeypatch, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(drug_comparison, "RESULTS_DIR", str(tmp_path))
+    write_results(CHEMBL_RESULTS, tmp_path / "ADRB2-chembl.json", output_format)
+    write_results({}, tmp_path / "TP53-open-targets-drugs.json", output_format)
+
+    assert find_gene_symbols() == ["ADRB2", "TP53"]
+    rows = read_gene_results("ADRB2")
+    assert rows["chembl_drugs"] == [("ADRB2", "CHEMBL714"), ("ADRB2", "CHEMBL1")]
+    assert rows["chembl_indications"] == [("ADRB2", "CHEMBL714", "MONDO_0004979", "D1")]
+    assert read_gene_results("BRCA1")["chembl_drugs"] == []
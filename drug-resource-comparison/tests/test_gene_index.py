@@ -0,0 +1,57 @@
+import sys
+import threading
+import types
+
+import gene_index
+from gene_index import call_recording_inputs, map_gene_symbol_to_ids, open_gene_index
+
+
+def test_changing_an_input_file_rebuilds_the_index(tmp_path, monkeypatch):
+    input_path = tmp_path / "genes.tsv"
+    input_path.write_text("ADRB2\tENSG00000169252\n")
+
+    def get_gene_name_to_ids_map():
+        with open(input_path, "r") as fp:
+            return dict(line.rstrip("\n").split("\t") for line in fp)
+
+    loader = types.ModuleType("LoaderUtilities")
+    loader.get_gene_name_to_ids_map = get_gene_name_to_ids_map
+    loader.map_gene_name_to_ids = lambda name, gnm2ids: gnm2ids[name]
+    monkeypatch.setitem(sys.modules, "LoaderUtilities", loader)
+    monkeypatch.setattr(gene_index, "LOADER_PATH", tmp_path / "LoaderUtilities.py")
+    monkeypatch.setattr(gene_index, "HGNC_PATH", str(tmp_path / "hgnc.txt"))
+    builds = []
+    build_gene_index = gene_index.build_gene_index
+    monkeypatch.setattr(
+        gene_index,
+        "build_gene_index",
+        lambda index_path: builds.append(index_path) or build_gene_index(index_path),
+    )
+
+    index_path = tmp_path / "gene-index.sqlite"
+    connection = open_gene_index(index_path)
+    assert map_gene_symbol_to_ids("adrb2", connection) == "ENSG00000169252"
+    connection.close()
+    open_gene_index(index_path).close()
+    assert len(builds) == 1
+
+    input_path.write_text("ADRB2\tENSG00000169252\nTP53\tENSG00000141510\n")
+    connection = open_gene_index(index_path)
+    assert map_gene_symbol_to_ids("TP53", connection) == "ENSG00000141510"
+    connection.close()
+    assert len(builds) == 2
+
+
+def test_only_the_recording_thread_records_inputs(tmp_path):
+    own_path = tmp_path / "own.txt"
+    other_path = tmp_path / "other.txt"
+    own_path.write_text("own")
+    other_path.write_text("other")
+
+    def read_files():
+        thread = threading.Thread(target=other_path.read_text)
+        thread.start()
+        thread.join()
+        return own_path.read_text()
+
+    assert call_recording_inputs(read_files) == ("own", [str(own_path.resolve())])
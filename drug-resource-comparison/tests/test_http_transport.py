@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+import http_transport
+from http_transport import (
+    add_send_wrapper,
+    build_response,
+    get_request_key,
+    install_transport,
+)
+
+URL = "https://api.platform.opentargets.org/api/v4/graphql"
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replaces the original send method of the requests transport with
+    one which responds without network access, and records the URL of
+    each request sent upstream.
+    """
+    urls = []
+
+    def send(self, request, *args, **kwargs):
+        urls.append(request.url)
+        return build_response(request, 200, "application/json", b'{"data": {}}')
+
+    monkeypatch.setattr(http_transport, "adapter_send", send)
+    monkeypatch.setattr(http_transport, "send_wrappers", [])
+    yield urls
+    install_transport("passthrough")
+
+
+def test_get_request_key_normalizes_requests():
+    assert get_request_key("get", "HTTPS://Host/p?b=2&a=1#f", None) == (
+        get_request_key("GET", "https://host/p?a=1&b=2", "")
+    )
+    assert get_request_key(
+        "POST", URL, b'{"variables": {}, "query": "query  {\\n a }"}'
+    ) == get_request_key("POST", URL, b'{"query": "query { a }", "variables": {}}')
+
+
+def test_record_then_replay(tmp_path, upstream):
+    cassette_path = tmp_path / "cassette.sqlite"
+    install_transport("record", cassette_path)
+    assert requests.post(URL, json={"query": "query { a }"}).json() == {"data": {}}
+    assert requests.post(URL, json={"query": "query { a }"}).reason == "Replayed"
+    assert len(upstream) == 1
+
+    install_transport("replay", cassette_path)
+    assert requests.post(URL, json={"query": "query { a }"}).json() == {"data": {}}
+    with pytest.raises(requests.exceptions.ConnectionError):
+        requests.post(URL, json={"query": "query { b }"})
+    assert len(upstream) == 1
+
+
+def test_send_wrappers_are_beneath_the_cassette(tmp_path, upstream):
+    wrapped = []
+
+    def redirect(send):
+        def redirect_send(self, request, *args, **kwargs):
+            wrapped.append(request.url)
+            request.url = "http://127.0.0.1/opentargets"
+            return send(self, request, *args, **kwargs)
+
+        return redirect_send
+
+    # The wrapper applies whether added before or after the transport
+    # is installed
+    install_transport("record", tmp_path / "cassette.sqlite")
+    add_send_wrapper(redirect)
+    requests.post(URL, json={"query": "query { a }"})
+    requests.post(URL, json={"query": "query { a }"})
+    install_transport("passthrough")
+    requests.post(URL, json={"query": "query { a }"})
+
+    assert wrapped == [URL, URL]
+    assert upstream == ["http://127.0.0.1/opentargets"] * 2
@@ -0,0 +1,30 @@
+import requests
+
+import http_transport
+import metrics
+from http_transport import build_response, install_transport
+from metrics import Metrics, install_request_metrics
+
+
+def test_requests_of_every_upstream_are_recorded(monkeypatch):
+    def send(self, request, *args, **kwargs):
+        return build_response(request, 200, "application/json", b'{"data": {}}')
+
+    monkeypatch.setattr(http_transport, "adapter_send", send)
+    monkeypatch.setattr(http_transport, "send_wrappers", [])
+    monkeypatch.setattr(metrics, "metrics", Metrics())
+    try:
+        install_request_metrics()
+        install_request_metrics()
+        requests.get("https://www.ebi.ac.uk/chembl/api/data/target.json")
+        requests.get("https://rest.ensembl.org/lookup/id/ENSG1", stream=True)
+        requests.get("https://WWW.EBI.AC.UK/chembl/api/data/drug.json")
+
+    finally:
+        install_transport("passthrough")
+
+    summary = metrics.metrics.get_summary()["requests"]
+    assert summary["chembl"]["count"] == 2
+    assert summary["chembl"]["bytes"] == 2 * len(b'{"data": {}}')
+    assert summary["chembl"]["statuses"] == {"200": 2}
+    assert summary["rest.ensembl.org"]["count"] == 1
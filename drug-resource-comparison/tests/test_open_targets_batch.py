@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+
+import pytest
+
+import open_targets_batch
+from open_targets_batch import (
+    build_batched_query,
+    find_closing_brace,
+    parse_query,
+    post_batched_queries,
+    split_batched_data,
+)
+
+QUERY_STRING = """
+query target($ensemblId: String!) {
+  target(ensemblId: $ensemblId) {
+    id
+    approvedSymbol
+  }
+}
+"""
+
+
+def test_find_closing_brace():
+    assert find_closing_brace("{a{b}c}d", 0) == 6
+    with pytest.raises(ValueError):
+        find_closing_brace("{a{b}", 0)
+
+
+def test_parse_query():
+    name, definitions, field, arguments, selection = parse_query(QUERY_STRING)
+    assert name == "target"
+    assert definitions == "$ensemblId: String!"
+    assert field == "target"
+    assert arguments == "(ensemblId: $ensemblId)"
+    assert " ".join(selection.split()) == "{ id approvedSymbol }"
+
+
+def test_parse_query_rejects_many_root_fields():
+    with pytest.raises(ValueError):
+        parse_query("query q { a { id } b { id } }")
+
+
+def test_build_batched_query():
+    query_string, variables, aliases = build_batched_query(
+        QUERY_STRING, [{"ensemblId": "ENSG1"}, {"ensemblId": "ENSG2"}]
+    )
+    assert aliases == ["t0", "t1"]
+    assert variables == {"ensemblId0": "ENSG1", "ensemblId1": "ENSG2"}
+    assert query_string.startswith(
+        "query targetBatch($ensemblId0: String!, $ensemblId1: String!) {"
+    )
+    assert "t0: target(ensemblId: $ensemblId0)" in query_string
+    assert "t1: target(ensemblId: $ensemblId1)" in query_string
+
+
+def test_split_batched_data():
+    data = {"t0": {"id": "ENSG1"}, "t1": None, "t2": {"id": "ENSG3"}}
+    errors = [{"message": "failed", "path": ["t2", "id"]}]
+    assert split_batched_data(data, "target", ["t0", "t1", "t2", "t3"], errors) == [
+        {"target": {"id": "ENSG1"}},
+        None,
+        None,
+        None,
+    ]
+    assert split_batched_data(None, "target", ["t0"]) == [None]
+
+
+def test_post_batched_queries_sizes_batches(monkeypatch):
+    batch_sizes = []
+
+    def post_request(query_string, variables, session=None):
+        batch_sizes.append(len(variables))
+        data = {
+            f"t{index}": {"id": variables[f"ensemblId{index}"]}
+            for index in range(len(variables))
+        }
+        return json.dumps({"data": data})
+
+    monkeypatch.setattr(open_targets_batch, "post_request", post_request)
+    variables_list = [{"ensemblId": f"ENSG{index}"} for index in range(25)]
+    results = list(
+        post_batched_queries(
+            QUERY_STRING,
+            variables_list,
+            initial_batch_size=4,
+            max_batch_size=8,
+            max_response_bytes=1000,
+        )
+    )
+    assert [index for index, _ in results] == list(range(25))
+    assert [result["target"]["id"] for _, result in results] == [
+        f"ENSG{index}" for index in range(25)
+    ]
+    assert batch_sizes[0] == 4
+    assert max(batch_sizes) == 8
+    assert sum(batch_sizes) == 25
+
+
+def test_post_batched_queries_posts_batches_concurrently(monkeypatch):
+    lock = threading.Lock()
+    in_flight = [0]
+    max_in_flight = [0]
+
+    def post_request(query_string, variables, session=None):
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        data = {f"t{index}": {"id": "x"} for index in range(len(variables))}
+        return json.dumps({"data": data})
+
+    monkeypatch.setattr(open_targets_batch, "post_request", post_request)
+    variables_list = [{"ensemblId": f"ENSG{index}"} for index in range(40)]
+    results = list(
+        post_batched_queries(
+            QUERY_STRING,
+            variables_list,
+            initial_batch_size=2,
+            max_batch_size=2,
+            max_workers=4,
+        )
+    )
+    assert [index for index, _ in results] == list(range(40))
+    assert 1 < max_in_flight[0] <= 4
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+import open_targets_pager
+from open_targets_pager import build_page_query, stream_connection
+
+QUERY_STRING = """
+query target($ensemblId: String!) {
+  target(ensemblId: $ensemblId) {
+    id
+    knownDrugs {
+      count
+      rows {
+        drugId
+      }
+    }
+  }
+}
+"""
+
+ROW_COUNT = 7
+
+
+class Interrupted(Exception):
+    pass
+
+
+def fake_post_query(fail_on_call=None):
+    """Returns a fake post_query serving ROW_COUNT rows by cursor, and
+    the list of cursors requested, raising once on the given call.
+    """
+    cursors = []
+
+    def post_query(query_string, variables, session=None):
+        cursors.append(variables["cursor"])
+        if len(cursors) == fail_on_call:
+            raise Interrupted()
+        start = int(variables["cursor"] or 0)
+        stop = min(start + variables["size"], ROW_COUNT)
+        rows = [{"drugId": f"CHEMBL{index}"} for index in range(start, stop)]
+        cursor = str(stop) if stop < ROW_COUNT else None
+        return {
+            "target": {
+                "knownDrugs": {"count": ROW_COUNT, "cursor": cursor, "rows": rows}
+            }
+        }
+
+    return post_query, cursors
+
+
+def read_drug_ids(ndjson_path):
+    with open(ndjson_path, "r") as fp:
+        return [json.loads(line)["drugId"] for line in fp]
+
+
+def test_build_page_query():
+    page_query_string = build_page_query(QUERY_STRING, "knownDrugs", "cursor")
+    assert page_query_string.lstrip().startswith(
+        "query targetKnownDrugsPage($ensemblId: String!, $cursor: String, $size: Int)"
+    )
+    assert "knownDrugs(cursor: $cursor, size: $size)" in page_query_string
+    assert " ".join(page_query_string.split()).endswith(
+        "count cursor rows { drugId } } } }"
+    )
+
+    page_query_string = build_page_query(QUERY_STRING, "knownDrugs", "page")
+    assert "knownDrugs(page: {index: $index, size: $size})" in page_query_string
+
+
+def test_stream_connection(tmp_path, monkeypatch):
+    post_query, cursors = fake_post_query()
+    monkeypatch.setattr(open_targets_pager, "post_query", post_query)
+    ndjson_path = tmp_path / "knownDrugs.ndjson"
+
+    rows = stream_connection(
+        QUERY_STRING, "knownDrugs", "cursor", {}, ndjson_path, page_size=3
+    )
+
+    assert rows == ROW_COUNT
+    assert cursors == [None, "3", "6"]
+    assert read_drug_ids(ndjson_path) == [f"CHEMBL{i}" for i in range(ROW_COUNT)]
+
+
+def test_stream_connection_resumes(tmp_path, monkeypatch):
+    ndjson_path = tmp_path / "knownDrugs.ndjson"
+    post_query, cursors = fake_post_query(fail_on_call=3)
+    monkeypatch.setattr(open_targets_pager, "post_query", post_query)
+    with pytest.raises(Interrupted):
+        stream_connection(
+            QUERY_STRING, "knownDrugs", "cursor", {}, ndjson_path, page_size=3
+        )
+
+    # Rows of a page written after the last saved state are discarded
+    with open(ndjson_path, "a") as fp:
+        fp.write('{"drugId": "partial"}\n')
+
+    post_query, cursors = fake_post_query()
+    monkeypatch.setattr(open_targets_pager, "post_query", post_query)
+    rows = stream_connection(
+        QUERY_STRING, "knownDrugs", "cursor", {}, ndjson_path, page_size=3
+    )
+
+    assert rows == ROW_COUNT
+    assert cursors == ["6"]
+    assert read_drug_ids(ndjson_path) == [f"CHEMBL{i}" for i in range(ROW_COUNT)]
+
+    # A completed connection is not paged again
+    assert (
+        stream_connection(
+            QUERY_STRING, "knownDrugs", "cursor", {}, ndjson_path, page_size=3
+        )
+        == ROW_COUNT
+    )
+    assert cursors == ["6"]
@@ -0,0 +1,99 @@
+import pytest
+
+import open_targets
+from open_targets import (
+    TARGET_CONNECTIONS,
+    fetch_targets,
+    get_results_stem,
+    get_target_path,
+)
+from open_targets_query import (
+    build_query,
+    build_tree,
+    format_selection,
+    get_profile_connections,
+    get_profile_query,
+)
+from run_manifest import RunManifest
+
+PROJECTION = ["id", "knownDrugs.count", "knownDrugs.rows.drugId", "approvedSymbol"]
+
+
+def test_build_tree():
+    assert build_tree(PROJECTION) == {
+        "id": {},
+        "knownDrugs": {"count": {}, "rows": {"drugId": {}}},
+        "approvedSymbol": {},
+    }
+
+
+def test_format_selection():
+    assert format_selection(build_tree(PROJECTION), 1) == [
+        "  id",
+        "  knownDrugs {",
+        "    count",
+        "    rows {",
+        "      drugId",
+        "    }",
+        "  }",
+        "  approvedSymbol",
+    ]
+
+
+def test_build_query():
+    query_string = build_query("drug", ["id", "name"], name="drugIds")
+    assert query_string == (
+        "\nquery drugIds($chemblId: String!) {\n"
+        "  drug(chemblId: $chemblId) {\n"
+        "    id\n"
+        "    name\n"
+        "  }\n"
+        "}\n"
+    )
+
+
+def test_get_profile_query():
+    query_string = get_profile_query("target", "ids")
+    assert query_string.startswith("\nquery target($ensemblId: String!) {")
+    assert "literatureOcurrences" not in query_string
+    with pytest.raises(ValueError):
+        get_profile_query("target", "unknown")
+
+
+def test_get_profile_connections():
+    assert get_profile_connections(TARGET_CONNECTIONS, "target", "full") == (
+        TARGET_CONNECTIONS
+    )
+    assert get_profile_connections(TARGET_CONNECTIONS, "target", "gget-drugs") == {
+        "knownDrugs": "cursor"
+    }
+
+
+def test_results_of_each_profile_are_kept_apart(tmp_path, monkeypatch):
+    (tmp_path / "results").mkdir()
+    (tmp_path / "scripts").mkdir()
+    monkeypatch.chdir(tmp_path / "scripts")
+    assert get_results_stem("A", "disease") == "../results/A-open-targets-disease"
+    assert get_target_path("A").name == "A-open-targets-target.json"
+    assert get_target_path("A", "ndjson", "ids").name == (
+        "A-open-targets-target-ids.ndjson"
+    )
+
+    profiles = []
+
+    def fetch_target(
+        gene_symbol, gene_id, force, session=None, output_format="json", profile="full"
+    ):
+        profiles.append(profile)
+        results_path = get_target_path(gene_symbol, output_format, profile)
+        results_path.write_text(profile)
+        return results_path
+
+    monkeypatch.setattr(open_targets, "fetch_target", fetch_target)
+    manifest = RunManifest(tmp_path / "manifest.ndjson")
+    fetch_targets({"A": "ENSG1"}, False, manifest=manifest)
+    fetch_targets({"A": "ENSG1"}, False, manifest=manifest, profile="ids")
+    fetch_targets({"A": "ENSG1"}, False, manifest=manifest, profile="ids")
+    manifest.close()
+    assert profiles == ["full", "ids"]
+    assert set(manifest.units) == {("A", "target"), ("A", "target-ids")}
@@ -0,0 +1,81 @@
+import json
+import sys
+
+import pytest
+
+from open_targets_tables import (
+    find_target_results,
+    load_target_tables,
+    normalize_targets,
+)
+from optional_imports import import_optional
+from output_formats import write_results
+
+
+def get_target(ensembl_id, drug_ids):
+    return {
+        "target": {
+            "id": ensembl_id,
+            "approvedSymbol": ensembl_id,
+            "knownDrugs": {
+                "count": len(drug_ids),
+                "rows": [{"drugId": drug_id, "phase": 4} for drug_id in drug_ids],
+            },
+        }
+    }
+
+
+def test_import_optional_names_the_package(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        import_optional("pyarrow.parquet", "Testing")
+
+
+def test_normalize_targets_in_any_format(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    (tmp_path / "work").mkdir()
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    monkeypatch.chdir(tmp_path / "work")
+
+    write_results(
+        get_target("ENSG1", ["CHEMBL1"]), "../results/A-open-targets-target.json"
+    )
+    write_results(
+        get_target("ENSG2", ["CHEMBL2"]),
+        "../results/B-open-targets-target.json",
+        "ndjson.gz",
+    )
+    write_results(
+        get_target("ENSG3", ["CHEMBL3"]),
+        "../results/C-open-targets-target.json",
+        "parquet",
+    )
+
+    # Every row of a completely paged connection replaces its first page
+    with open(results_dir / "A-open-targets-target-knownDrugs.ndjson", "w") as fp:
+        for drug_id in ["CHEMBL1", "CHEMBL4"]:
+            fp.write(json.dumps({"drugId": drug_id, "phase": 4}) + "\n")
+    with open(results_dir / "A-open-targets-target-knownDrugs.ndjson.state", "w") as fp:
+        json.dump({"done": True}, fp)
+
+    target_results = find_target_results(results_dir)
+    assert [output_format for _, output_format in target_results] == [
+        "json",
+        "ndjson.gz",
+        "parquet",
+    ]
+
+    tables_dir = tmp_path / "tables"
+    row_counts = normalize_targets(target_results, tables_dir)
+    assert row_counts["targets"] == 3
+    assert row_counts["known_drugs"] == 4
+
+    known_drugs = load_target_tables(tables_dir)["known_drugs"].to_pylist()
+    assert [(row["target_id"], row["drugId"]) for row in known_drugs] == [
+        ("ENSG1", "CHEMBL1"),
+        ("ENSG1", "CHEMBL4"),
+        ("ENSG2", "CHEMBL2"),
+        ("ENSG3", "CHEMBL3"),
+    ]
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+from output_formats import (
+    OUTPUT_FORMATS,
+    count_rows,
+    get_results_path,
+    join_rows,
+    read_results,
+    split_rows,
+    write_results,
+)
+
+RESULTS = {
+    "target": {
+        "id": "ENSG00000169252",
+        "approvedSymbol": "ADRB2",
+        "knownDrugs": {
+            "count": 3,
+            "rows": [
+                {
+                    "drugId": "CHEMBL714",
+                    "phase": 4,
+                    "score": 0.5,
+                    "approved": True,
+                    "urls": [{"name": "ChEMBL", "url": None}],
+                    "mixed": 1,
+                },
+                {
+                    "drugId": "CHEMBL1",
+                    "phase": 2,
+                    "score": 1.0,
+                    "approved": False,
+                    "urls": [],
+                    "mixed": "one",
+                },
+                {
+                    "drugId": "CHEMBL2",
+                    "phase": None,
+                    "score": 0.25,
+                    "approved": None,
+                    "urls": None,
+                    "mixed": None,
+                },
+            ],
+        },
+    }
+}
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    """Runs the test in a working directory beside a results directory,
+    as the utilities are run.
+    """
+    (tmp_path / "work").mkdir()
+    (tmp_path / "results").mkdir()
+    monkeypatch.chdir(tmp_path / "work")
+    return tmp_path
+
+
+def test_split_and_join_rows():
+    remainder, sections = split_rows(RESULTS)
+    assert remainder["target"]["knownDrugs"] == {"count": 3, "rows": None}
+    assert [section for section, _ in sections] == ["target.knownDrugs.rows"]
+    assert count_rows(RESULTS) == 3
+    assert join_rows(remainder, dict(sections)) == RESULTS
+
+
+def test_get_results_path():
+    assert get_results_path("a.json", "json").name == "a.json"
+    assert get_results_path("a.json", "compact").name == "a.compact.json"
+    assert get_results_path("a.json", "ndjson.gz").name == "a.ndjson.gz"
+    assert len(set(OUTPUT_FORMATS.values())) == len(OUTPUT_FORMATS)
+
+
+@pytest.mark.parametrize("output_format", list(OUTPUT_FORMATS))
+def test_round_trip(work_dir, output_format):
+    if output_format == "ndjson.zst":
+        pytest.importorskip("zstandard")
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+
+    results_path = write_results(RESULTS, "../results/a.json", output_format)
+
+    assert results_path == get_results_path("../results/a.json", output_format)
+    assert read_results("../results/a.json", output_format) == RESULTS
+
+
+def test_parquet_columns_are_typed(work_dir):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    results_path = write_results(RESULTS, "../results/a.json", "parquet")
+    schema = pq.read_schema(results_path / "target.knownDrugs.rows.parquet")
+
+    assert schema.field("drugId").type == pa.string()
+    assert schema.field("phase").type == pa.int64()
+    assert schema.field("score").type == pa.float64()
+    assert schema.field("approved").type == pa.bool_()
+    assert schema.field("urls").type == pa.string()
+
+
+def test_build_table_of_a_large_section():
+    pytest.importorskip("pyarrow")
+    from output_formats import build_table
+
+    rows = [
+        {f"field{column}": row * column for column in range(20)} for row in range(20000)
+    ]
+    rows[-1]["extra"] = "last"
+    start_time = time.time()
+    table = build_table(rows)
+    assert time.time() - start_time < 5
+    assert table.num_rows == 20000
+    assert table.num_columns == 21
+    assert table.column("extra").null_count == 19999
@@ -0,0 +1,63 @@
+import os
+import time
+
+from response_cache import ResponseCache, hash_key
+
+
+def test_hash_key_ignores_key_order():
+    assert hash_key({"a": 1, "b": 2}) == hash_key({"b": 2, "a": 1})
+    assert hash_key("query", {"a": 1}) != hash_key("query", {"a": 2})
+
+
+def test_get_and_put(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1024)
+    key = hash_key("query")
+
+    assert cache.get(key) is None
+    cache.put(key, "text")
+    assert cache.get(key) == "text"
+    assert cache.get_stats() == {
+        "hits": 1,
+        "misses": 1,
+        "expirations": 0,
+        "evictions": 0,
+        "total_bytes": 4,
+    }
+
+    # The total size is read from the entries when reopened
+    assert ResponseCache(tmp_path).get_stats()["total_bytes"] == 4
+
+
+def test_entries_expire(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1024)
+    key = hash_key("query")
+    cache.put(key, "text")
+    path = cache.get_path(key)
+    written_time = time.time() - 120
+    os.utime(path, (written_time, written_time))
+
+    assert cache.get(key) is None
+    assert not path.exists()
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1
+    assert stats["total_bytes"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=1000, max_bytes=40)
+    keys = [hash_key(index) for index in range(4)]
+    for index, key in enumerate(keys):
+        cache.put(key, "x" * 10)
+        access_time = time.time() - 100 + index
+        os.utime(cache.get_path(key), (access_time, access_time))
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+    cache.put(hash_key(4), "x" * 10)
+
+    assert cache.get_stats()["evictions"] == 2
+    assert cache.get_path(keys[0]).exists()
+    assert not cache.get_path(keys[1]).exists()
+    assert not cache.get_path(keys[2]).exists()
+    assert cache.get_path(keys[3]).exists()
+    assert cache.get_stats()["total_bytes"] == 30
@@ -0,0 +1,49 @@
+import json
+import os
+import stat
+
+from results_store import (
+    get_object_paths,
+    prune_store,
+    store_bytes,
+    store_file,
+    store_json,
+)
+
+
+def test_store_json(tmp_path):
+    store_dir = tmp_path / "store"
+    results = {"target": {"id": "ENSG00000169252", "rows": [1, 2, 3]}}
+
+    assert store_json(results, tmp_path / "a.json", store_dir)
+    assert store_json(results, tmp_path / "b.json", store_dir)
+    assert not store_json(results, tmp_path / "a.json", store_dir)
+
+    assert (tmp_path / "a.json").read_text() == json.dumps(results, indent=4)
+    assert os.path.samefile(tmp_path / "a.json", tmp_path / "b.json")
+    (object_path,) = get_object_paths(store_dir)
+    assert object_path.suffix == ".json"
+    assert not object_path.stat().st_mode & stat.S_IWUSR
+
+
+def test_objects_keep_the_suffix_of_their_results(tmp_path):
+    store_dir = tmp_path / "store"
+    store_bytes(b"<svg/>", tmp_path / "a.svg", store_dir)
+    temp_path = tmp_path / "a.tmp"
+    temp_path.write_bytes(b"<svg/>")
+    store_file(temp_path, tmp_path / "a.ndjson.gz", store_dir)
+
+    assert sorted(path.suffix for path in get_object_paths(store_dir)) == [
+        ".gz",
+        ".svg",
+    ]
+    assert not temp_path.exists()
+
+
+def test_prune_store(tmp_path):
+    store_dir = tmp_path / "store"
+    store_bytes(b"first", tmp_path / "a.json", store_dir)
+    store_bytes(b"second", tmp_path / "a.json", store_dir)
+
+    assert prune_store(store_dir) == 1
+    assert [path.read_bytes() for path in get_object_paths(store_dir)] == [b"second"]
@@ -0,0 +1,81 @@
+import json
+
+from run_manifest import RunManifest, hash_results
+
+
+def test_hash_results_of_file_and_directory(tmp_path):
+    (tmp_path / "a.json").write_text("a")
+    (tmp_path / "table").mkdir()
+    (tmp_path / "table" / "b.parquet").write_text("b")
+    assert hash_results(tmp_path / "a.json") != hash_results(tmp_path / "table")
+    digest = hash_results(tmp_path / "table")
+    (tmp_path / "table" / "b.parquet").write_text("c")
+    assert hash_results(tmp_path / "table") != digest
+
+
+def test_needs_run(tmp_path):
+    results_path = tmp_path / "A.json"
+    manifest = RunManifest(tmp_path / "manifest.ndjson")
+    assert manifest.needs_run("A", "target", results_path)
+
+    manifest.mark_pending("A", "target")
+    results_path.write_text("{}")
+    assert manifest.needs_run("A", "target", results_path)
+
+    manifest.mark_failed("A", "target", RuntimeError("throttled"))
+    assert manifest.needs_run("A", "target", results_path)
+    assert manifest.units[("A", "target")]["error"] == "throttled"
+
+    manifest.mark_done("A", "target", results_path)
+    assert not manifest.needs_run("A", "target", results_path)
+
+    # Changed or missing results are run again
+    results_path.write_text('{"changed": true}')
+    assert manifest.needs_run("A", "target", results_path)
+    results_path.unlink()
+    assert manifest.needs_run("A", "target", results_path)
+    manifest.close()
+
+
+def test_existing_results_are_recorded_as_done(tmp_path):
+    results_path = tmp_path / "A.json"
+    results_path.write_text("{}")
+    manifest = RunManifest(tmp_path / "manifest.ndjson")
+    assert not manifest.needs_run("A", "target", results_path)
+    assert manifest.units[("A", "target")]["status"] == "done"
+    manifest.close()
+
+
+def test_reopen_compacts_and_skips_truncated_lines(tmp_path):
+    manifest_path = tmp_path / "manifest.ndjson"
+    results_path = tmp_path / "A.json"
+    results_path.write_text("{}")
+    manifest = RunManifest(manifest_path)
+    manifest.mark_pending("A", "target")
+    manifest.mark_done("A", "target", results_path)
+    manifest.mark_pending("B", "target")
+    manifest.close()
+    with open(manifest_path, "a") as fp:
+        fp.write('{"entity": "C", "query": "tar')
+
+    manifest = RunManifest(manifest_path)
+    assert manifest.get_counts() == {"pending": 1, "done": 1, "failed": 0}
+    manifest.close()
+    with open(manifest_path, "r") as fp:
+        records = [json.loads(line) for line in fp]
+    assert [(r["entity"], r["status"]) for r in records] == [
+        ("A", "done"),
+        ("B", "pending"),
+    ]
+
+
+def test_reset(tmp_path):
+    manifest_path = tmp_path / "manifest.ndjson"
+    manifest = RunManifest(manifest_path)
+    manifest.mark_failed("A", "target", "error")
+    manifest.close()
+
+    manifest = RunManifest(manifest_path, reset=True)
+    assert manifest.units == {}
+    assert manifest.get_counts() == {"pending": 0, "done": 0, "failed": 0}
+    manifest.close()